@@ -0,0 +1,231 @@
+# Batch analytics over the data-donation corpus
+# Usage: python analytics.py [data-donation] [-o donations.npz] [--workers N]
+# Writes one row per map and one row per edge, either to a single .npz
+# (columns prefixed map_ / edge_) or, with pyarrow installed, to
+# <output>.maps.parquet & <output>.edges.parquet.
+
+# Imports
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import json
+import math
+import os
+import sys
+import numpy as np
+from mapdata import normalize_map, map_elements
+from metrics import get_metric
+
+# Columns per map & per edge (name, type code: d = float, i = int, s = string)
+map_columns = [('file', 's'), ('date', 's'), ('n_nodes', 'i'), ('n_edges', 'i'), ('density', 'd'),
+               ('reciprocity', 'd'), ('self_loops', 'i'), ('mean_severity', 'd'), ('max_severity', 'd'),
+               ('mean_strength', 'd'), ('max_out_degree', 'i'), ('max_in_degree', 'i'),
+               ('max_betweenness', 'd'), ('n_annotations', 'i')]
+edge_columns = [('map', 'i'), ('source', 's'), ('target', 's'), ('strength', 'd'),
+                ('source_severity', 'd'), ('target_severity', 'd'),
+                ('source_out_degree', 'i'), ('target_in_degree', 'i')]
+
+# Function: Stream donation files (any depth) without listing the whole tree at once
+def iter_donations(root):
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in sorted(entries, key=lambda e: e.name):
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name.endswith('.json'):
+                    yield entry.path
+
+# Function: Group an iterable into lists of at most size items
+def batched(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+# Function: executor.map with at most window tasks in flight (results in order)
+def bounded_map(executor, func, items, window):
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(func, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+# Function: Map row & edge rows for one donation file
+def summarize_file(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        normalized = normalize_map(json.load(f), path)
+
+    nodes, edges = normalized['nodes'], normalized['edges']
+    severity = normalized['severity']
+    elements = map_elements(normalized)
+    out_degree = get_metric(elements, 'out-degree')
+    in_degree = get_metric(elements, 'in-degree')
+    betweenness = get_metric(elements, 'betweenness')
+
+    strengths = [float(normalized['edge-data'].get(edge_id, {}).get('strength', math.nan)) if edge_id else math.nan
+                 for edge_id in normalized['edge-ids']]
+    edge_set = set(edges)
+    links = [(s, t) for s, t in edges if s != t]
+    severities = [severity[node] for node in nodes if node in severity]
+    n = len(nodes)
+
+    map_row = {
+        'file': path,
+        'date': normalized['date'] or '',
+        'n_nodes': n,
+        'n_edges': len(edges),
+        'density': len(links) / (n * (n - 1)) if n > 1 else 0.0,
+        'reciprocity': sum((t, s) in edge_set for s, t in links) / len(links) if links else 0.0,
+        'self_loops': len(edges) - len(links),
+        'mean_severity': float(np.mean(severities)) if severities else math.nan,
+        'max_severity': float(max(severities)) if severities else math.nan,
+        'mean_strength': float(np.nanmean(strengths)) if any(not math.isnan(x) for x in strengths) else math.nan,
+        'max_out_degree': max(out_degree.values(), default=0),
+        'max_in_degree': max(in_degree.values(), default=0),
+        'max_betweenness': max(betweenness.values(), default=0.0),
+        'n_annotations': sum(1 for note in normalized['annotations'].values() if note)
+    }
+    edge_rows = [{
+        'source': s,
+        'target': t,
+        'strength': strength,
+        'source_severity': float(severity.get(s, math.nan)),
+        'target_severity': float(severity.get(t, math.nan)),
+        'source_out_degree': out_degree[s],
+        'target_in_degree': in_degree[t]
+    } for (s, t), strength in zip(edges, strengths)]
+    return map_row, edge_rows
+
+# Function: Summaries for a batch of files (runs in a worker process)
+def summarize_batch(paths):
+    results = []
+    for path in paths:
+        try:
+            results.append(summarize_file(path))
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as error:
+            results.append((None, f"{path}: {error}"))
+    return results
+
+# Class: Column buffers written to a single .npz at the end
+# Numbers live in compact typed arrays and strings as codes into a vocabulary,
+# so memory grows with the number of rows, not with the size of the donations.
+class NpzWriter:
+
+    def __init__(self, path):
+        self.path = path
+        self.columns = {}
+        self.vocabularies = {}
+        self.map_count = 0
+
+    def _append(self, table, columns, row):
+        for name, kind in columns:
+            key = f'{table}_{name}'
+            if kind == 's':
+                vocabulary = self.vocabularies.setdefault(key, {})
+                code = vocabulary.setdefault(row[name], len(vocabulary))
+                self.columns.setdefault(key, array('i')).append(code)
+            else:
+                self.columns.setdefault(key, array(kind)).append(row[name])
+
+    def write(self, map_row, edge_rows):
+        self._append('map', map_columns, map_row)
+        for edge_row in edge_rows:
+            self._append('edge', edge_columns, dict(edge_row, map=self.map_count))
+        self.map_count += 1
+
+    def close(self):
+        arrays = {}
+        for table, columns in [('map', map_columns), ('edge', edge_columns)]:
+            for name, kind in columns:
+                key = f'{table}_{name}'
+                values = np.frombuffer(self.columns.get(key, array('i' if kind == 's' else kind)),
+                                       dtype=np.int32 if kind in 'si' else np.float64)
+                if kind == 's':
+                    arrays[key] = np.array(list(self.vocabularies.get(key, {})), dtype=str)[values] if values.size else np.array([], dtype=str)
+                else:
+                    arrays[key] = values
+        np.savez_compressed(self.path, **arrays)
+
+# Class: Streaming Parquet writer (one row group per batch)
+class ParquetWriter:
+
+    def __init__(self, path, batch_rows=50000):
+        import pyarrow
+        import pyarrow.parquet
+        self.pa, self.pq = pyarrow, pyarrow.parquet
+        stem = path[:-len('.parquet')]
+        self.paths = {'map': f'{stem}.maps.parquet', 'edge': f'{stem}.edges.parquet'}
+        self.batch_rows = batch_rows
+        self.rows = {'map': [], 'edge': []}
+        self.writers = {}
+        self.map_count = 0
+
+    def _flush(self, table):
+        if not self.rows[table]:
+            return
+        batch = self.pa.Table.from_pylist(self.rows[table])
+        if table not in self.writers:
+            self.writers[table] = self.pq.ParquetWriter(self.paths[table], batch.schema)
+        self.writers[table].write_table(batch)
+        self.rows[table] = []
+
+    def write(self, map_row, edge_rows):
+        self.rows['map'].append(map_row)
+        self.rows['edge'].extend(dict(edge_row, map=self.map_count) for edge_row in edge_rows)
+        self.map_count += 1
+        for table in self.rows:
+            if len(self.rows[table]) >= self.batch_rows:
+                self._flush(table)
+
+    def close(self):
+        for table in self.rows:
+            self._flush(table)
+        for writer in self.writers.values():
+            writer.close()
+
+# Function: Summarize every donation under root into output
+def run(root, output, workers=None, batch_size=64):
+    writer = ParquetWriter(output) if output.endswith('.parquet') else NpzWriter(output)
+    batches = batched(iter_donations(root), batch_size)
+    workers = workers or os.cpu_count() or 1
+    maps, failed = 0, 0
+
+    def consume(results):
+        nonlocal maps, failed
+        for map_row, edge_rows in results:
+            if map_row is None:
+                failed += 1
+                print(f"Skipped {edge_rows}", file=sys.stderr)
+                continue
+            writer.write(map_row, edge_rows)
+            maps += 1
+
+    if workers == 1:
+        for batch in batches:
+            consume(summarize_batch(batch))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for results in bounded_map(executor, summarize_batch, batches, window=2 * workers):
+                consume(results)
+
+    writer.close()
+    return maps, failed
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Summarize donated maps into per-map and per-edge tables.")
+    parser.add_argument('root', nargs='?', default='data-donation', help="directory with donated graph_*.json files")
+    parser.add_argument('-o', '--output', default='donations.npz', help="output file (.npz, or .parquet with pyarrow)")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: number of CPUs)")
+    parser.add_argument('--batch-size', type=int, default=64, help="files per worker task")
+    args = parser.parse_args()
+
+    maps, failed = run(args.root, args.output, args.workers, args.batch_size)
+    print(f"Summarized {maps} maps ({failed} skipped) into {args.output}")
@@ -0,0 +1,53 @@
+// Clientside callbacks (pure UI toggles & copies, no round trip to the server)
+
+// Color scheme explanations (modal-color-scheme-body)
+var colorSchemeInfo = {
+    'Uniform': 'All the factors in your map have the same color.',
+    'Severity': 'The factors in your map are colored based on their relative severity. The darkest factor has the highest indicated severity and the lightest factor has lowest indicated severity.',
+    'Severity (abs)': 'The factors in your map are colored based on their absolute severity. The darkest factor has the highest possible severity score (10) and the lightest factor has the lowest possible severity score (0).',
+    'Out-degree': 'The factors in your map are colored based on their out-degree, which refers to the number of out-going connections. The darkest factor has the most out-going connections and the lightest factor has the least out-going connections. Factors with a lot of out-going connections can be seen as main causes in your map.',
+    'In-degree': 'The factors in your map are colored based on their in-degree, which refers to the number of incoming connections. The darkest factor has the most incoming connections and the lightest factor has the least incoming connections. Factors with a lot of incoming connections can be seen as main effects in your map.',
+    'Out-/In-degree ratio': 'The factors in your map are colored based on their out-/in-degree ratio, which is calculated by dividing the number of out-going by the number of incoming connections. The darkest factor has many out-going and few incoming connections (active), and the lightest factor has few out-going and many incoming connections (passive).'
+};
+
+// Sizing scheme explanations (modal-sizing-scheme-body)
+var sizingSchemeInfo = {
+    'Uniform': 'All factors in your map have the same size.',
+    'Severity': 'The size of the factors in your map corresponds to their relative severity. The largest factor has the highest indicated severity and the smallest factor has lowest indicated severity.',
+    'Severity (abs)': 'The size of the factors in your map corresponds to their absolute severity. The largest factor has the highest possible severity score (10) and the smallest factor has the lowest possible severity score (0).',
+    'Out-degree': 'The size of the factors in your map corresponds to their out-degree, which refers to the number of out-going connections. The largest factor has the most out-going connections and the smallest factor has the least out-going connections. Factors with a lot of out-going connections can be seen as main causes in your map.',
+    'In-degree': 'The size of the factors in your map corresponds to their in-degree, which refers to the number of incoming connections. The largest factor has the most incoming connections and the smallest factor has the least incoming connections. Factors with a lot of incoming connections can be seen as main effects in your map.',
+    'Out-/In-degree ratio': 'The size of the factors in your map corresponds to their out-/in-degree ratio, which is calculated by dividing the number of out-going by the number of incoming connections. The largest factor has many out-going and few incoming connections (active), and the smallest factor has few out-going and many incoming connections (passive).'
+};
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    psysys: {
+        // Open/close a modal
+        toggle: function(n_clicks, is_open) {
+            return n_clicks ? !is_open : is_open;
+        },
+
+        // Copy a value into a store
+        copy: function(value) {
+            return value;
+        },
+
+        // Keep at most two selected factors (edit-edge)
+        firstTwo: function(value) {
+            return value && value.length > 2 ? value.slice(0, 2) : value;
+        },
+
+        // Wizard dropdown values as JSON (hidden-div)
+        toJson: function(values) {
+            return JSON.stringify(values);
+        },
+
+        colorSchemeInfo: function(scheme) {
+            return colorSchemeInfo[scheme] || 'As a default the factors in your map are uniformly colored.';
+        },
+
+        sizingSchemeInfo: function(scheme) {
+            return sizingSchemeInfo[scheme] || 'As a default the size of the factors in your map corresponds to their relative severity. The largest factor has the highest indicated severity and the smallest factor has lowest indicated severity.';
+        }
+    }
+});
@@ -0,0 +1,60 @@
+# Imports
+import contextlib
+import contextvars
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# set_progress of the background job running in this context (None inline)
+_job = contextvars.ContextVar('job', default=None)
+
+# Function: Background callback manager selected by PSYSYS_BACKGROUND (1 by default)
+# Jobs run in subprocesses with their results in a local diskcache folder
+# (PSYSYS_BACKGROUND_CACHE), so no broker is needed. Their store updates must
+# reach the other processes, so an in-memory state backend keeps callbacks
+# inline, as does a missing diskcache (pip install "dash[diskcache]").
+def manager_from_env(backend=None):
+    from state import MemoryBackend
+    if os.environ.get('PSYSYS_BACKGROUND', '1') != '1' or isinstance(backend, MemoryBackend):
+        return None
+    try:
+        import diskcache
+        from dash import DiskcacheManager
+        cache = diskcache.Cache(os.environ.get('PSYSYS_BACKGROUND_CACHE', os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), 'state', 'background')))
+        return DiskcacheManager(cache, expire=3600)
+    except ImportError as error:
+        logger.warning("Background callbacks run inline: %s", error)
+        return None
+
+# Function: Callback arguments running it in the background (if there is a manager)
+# running applies either way; progress & cancel only exist for background callbacks.
+def background_options(manager, running=None, progress=None, cancel=None):
+    options = {'running': running} if running else {}
+    if manager is not None:
+        options.update(background=True, manager=manager)
+        if progress:
+            options.update(progress=progress, progress_default=[0, ''])
+        if cancel:
+            options['cancel'] = cancel
+    return options
+
+# Function: Run a background job's callback, with set_progress available through report_progress
+@contextlib.contextmanager
+def background_job(set_progress=None):
+    token = _job.set(set_progress or (lambda value: None))
+    try:
+        yield
+    finally:
+        _job.reset(token)
+
+# Function: Report progress (percent & label) of the running background job; no-op inline
+def report_progress(percent, label=''):
+    set_progress = _job.get()
+    if set_progress is not None:
+        set_progress([percent, label])
+
+# Function: Check if the callback runs in a background job (a subprocess)
+def in_background():
+    return _job.get() is not None
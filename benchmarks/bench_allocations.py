@@ -0,0 +1,113 @@
+# Allocation check: repeats the style builders & map building steps on the same session data,
+# as the callbacks do with their State, and fails (exit code 1) if a stylesheet keeps growing,
+# a module-level default is mutated or traced memory grows after the first rounds.
+# Usage: python benchmarks/bench_allocations.py [--factors 200] [--rounds 20] [--threshold-kb 64]
+# tests/test_allocations.py runs the same checks (on a smaller map) as assertions.
+
+# Imports
+import argparse
+import copy
+import gc
+import os
+import sys
+import tracemalloc
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bench_hotpaths import synthetic_session
+from functions import (map_add_factors, map_add_chains, map_add_cycles, color_scheme, node_sizing, graph_color,
+                       update_edge_opacity, apply_severity_size_styles)
+from highlight import highlight_stylesheet
+import styles
+import app_ver02
+
+# Function: Steps as {name: step(session_data, severity) -> stylesheet}, each updating the session in place
+def allocation_steps():
+    def scheme(func, name):
+        return lambda session_data, severity: func(name, session_data, severity)['stylesheet']
+
+    def opacity(session_data, severity):
+        edge_id = next(e['data']['id'] for e in session_data['elements'] if 'source' in e['data'])
+        session_data['stylesheet'] = update_edge_opacity(edge_id, 3, session_data['stylesheet'])
+        return session_data['stylesheet']
+
+    def factors(session_data, severity):
+        map_add_factors(session_data, session_data['dropdowns']['initial-selection']['value'], severity)
+        return session_data['stylesheet']
+
+    def chains(session_data, severity):
+        names = session_data['dropdowns']['initial-selection']['value']
+        return map_add_chains(session_data, names[:10], names[10:20])['stylesheet']
+
+    def cycles(session_data, severity):
+        names = session_data['dropdowns']['initial-selection']['value']
+        return map_add_cycles(session_data, names[:5], names[5:10])['stylesheet']
+
+    steps = {f'color_scheme[{name}]': scheme(color_scheme, name)
+             for name in ['Uniform', 'Severity', 'Severity (abs)', 'Out-degree', 'In-degree', 'Out-/In-degree ratio']}
+    steps.update({f'node_sizing[{name}]': scheme(node_sizing, name)
+                  for name in ['Uniform', 'Severity', 'Severity (abs)', 'Out-degree', 'In-degree', 'Out-/In-degree ratio']})
+    steps.update({
+        'graph_color': lambda session_data, severity: graph_color(session_data, severity)['stylesheet'],
+        'apply_severity_size_styles': lambda session_data, severity: apply_severity_size_styles(
+            'Severity', app_ver02.stylesheet, severity, app_ver02.stylesheet),
+        'highlight_stylesheet': lambda session_data, severity: highlight_stylesheet(
+            styles.default_stylesheet, session_data['elements'], session_data['elements'][0]['data']['id']),
+        'update_edge_opacity': opacity,
+        'map_add_factors': factors,
+        'map_add_chains': chains,
+        'map_add_cycles': cycles
+    })
+    return steps
+
+# Function: Problems found for one step (empty if none)
+# The first two rounds fill the memoized metrics & regex caches; growth is measured after them.
+def check_step(step, n, rounds, threshold):
+    session_data, severity = synthetic_session(n)
+    problems = []
+    lengths = []
+    for _ in range(2):
+        lengths.append(len(step(session_data, severity)))
+    gc.collect()
+    start = tracemalloc.get_traced_memory()[0]
+    for _ in range(rounds - 2):
+        lengths.append(len(step(session_data, severity)))
+    gc.collect()
+    growth = tracemalloc.get_traced_memory()[0] - start
+    if lengths[-1] > lengths[1]:
+        problems.append(f'stylesheet grew from {lengths[1]} to {lengths[-1]} rules')
+    if growth > threshold:
+        problems.append(f'traced memory grew {growth / 1024:.1f} KB over {rounds - 2} rounds')
+    return problems, lengths[-1], growth
+
+# Function: Module-level stylesheets the steps must never change
+def module_defaults():
+    return {'styles.default_stylesheet': styles.default_stylesheet, 'app_ver02.stylesheet': app_ver02.stylesheet}
+
+# Function: Defaults changed since a deep copy was taken (['name (n -> m rules)', ...])
+def mutated_defaults(before):
+    return [f"{name} ({len(before[name])} -> {len(value)} rules)" for name, value in module_defaults().items()
+            if value != before[name]]
+
+def run(n, rounds, threshold):
+    before = copy.deepcopy(module_defaults())
+    failed = 0
+    tracemalloc.start()
+    print(f"{'step':<36}{'rules':>8}{'growth':>12}")
+    for name, step in allocation_steps().items():
+        problems, length, growth = check_step(step, n, rounds, threshold)
+        print(f"{name:<36}{length:>8}{growth / 1024:>10.1f}KB  {'; '.join(problems) or 'ok'}")
+        failed += bool(problems)
+    tracemalloc.stop()
+    for problem in mutated_defaults(before):
+        print(f"Mutated: {problem}")
+        failed += 1
+    return failed
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Check style builders & map steps for growing stylesheets and retained memory.")
+    parser.add_argument('--factors', type=int, default=200, help="factors of the synthetic map")
+    parser.add_argument('--rounds', type=int, default=20, help="times each step is repeated on the same session data")
+    parser.add_argument('--threshold-kb', type=float, default=64, help="traced memory growth reported as a leak")
+    args = parser.parse_args()
+    failed = run(args.factors, args.rounds, args.threshold_kb * 1024)
+    print(f"{failed} problems found" if failed else "No growth found")
+    sys.exit(1 if failed else 0)
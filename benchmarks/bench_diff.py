@@ -0,0 +1,76 @@
+# Diff benchmark: per-pair set/dict comparison vs. diff.timeline_diffs on synthetic timelines
+# Every snapshot edits a few factors, links & severity scores of the previous one,
+# as when a user re-uploads their map over several weeks.
+# Usage: python benchmarks/bench_diff.py [--sizes 50 500 2000] [--snapshots 100] [--repeat 3]
+
+# Imports
+import argparse
+import os
+import random
+import sys
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from diff import timeline_diffs
+from metrics import compute_metrics, map_structure
+
+# Function: Timeline of snapshots [(elements, severity scores)] of a map with about n factors
+def synthetic_timeline(n, snapshots, seed=0):
+    rng = random.Random(seed)
+    nodes = [f'Factor {i}' for i in range(n)]
+    edges = {(rng.choice(nodes), rng.choice(nodes)) for _ in range(3 * n)}
+    severity = {node: rng.randint(0, 10) for node in nodes}
+    timeline = []
+    for step in range(snapshots):
+        elements = [{'data': {'id': node, 'label': node}} for node in nodes]
+        elements += [{'data': {'source': s, 'target': t}} for s, t in edges]
+        timeline.append((elements, dict(severity)))
+        # Edit a few factors, links & scores for the next snapshot
+        removed = {nodes.pop(rng.randrange(len(nodes))) for _ in range(max(1, n // 50))}
+        edges = {(s, t) for s, t in edges if s not in removed and t not in removed}
+        for i, node in enumerate(sorted(removed)):
+            severity.pop(node, None)
+            nodes.append(f'Factor {n}-{step}-{i}')
+            edges.add((rng.choice(nodes), rng.choice(nodes)))
+            severity[rng.choice(nodes)] = rng.randint(0, 10)
+    return timeline
+
+# Function: Diff of two maps with sets & dicts (one metric computation per map)
+def naive_diff(a, b):
+    (nodes_a, edges_a), (nodes_b, edges_b) = map_structure(a[0]), map_structure(b[0])
+    metrics_a, metrics_b = compute_metrics(a[0]), compute_metrics(b[0])
+    known_a, known_b = set(nodes_a), set(nodes_b)
+    both = known_a & known_b
+    return {
+        'added-nodes': [node for node in nodes_b if node not in known_a],
+        'removed-nodes': [node for node in nodes_a if node not in known_b],
+        'added-edges': set(edges_b) - set(edges_a),
+        'removed-edges': set(edges_a) - set(edges_b),
+        'severity': {node: b[1][node] - a[1][node] for node in both if node in a[1] and node in b[1] and a[1][node] != b[1][node]},
+        'centrality': {name: {node: metrics_b[name][node] - metrics_a[name][node] for node in both
+                              if metrics_b[name][node] != metrics_a[name][node]} for name in metrics_a}
+    }
+
+# Function: Best time of repeat runs (ms)
+def best(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+def run(sizes, snapshots, repeat):
+    print(f"{'factors':>8}{'snapshots':>11}{'per pair (sets)':>17}{'timeline_diffs':>16}{'per pair':>10}")
+    for n in sizes:
+        timeline = synthetic_timeline(n, snapshots)
+        naive = best(lambda: [naive_diff(a, b) for a, b in zip(timeline, timeline[1:])], repeat)
+        new = best(lambda: timeline_diffs(timeline), repeat)
+        print(f"{n:>8}{snapshots:>11}{naive:>15.1f}ms{new:>14.1f}ms{new / (snapshots - 1):>8.2f}ms")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Time structural diffs over a timeline of maps.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[50, 500, 2000], help="factors per synthetic map")
+    parser.add_argument('--snapshots', type=int, default=100, help="maps per timeline")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per size (best is reported)")
+    args = parser.parse_args()
+    run(args.sizes, args.snapshots, args.repeat)
@@ -0,0 +1,69 @@
+# Layout fragment benchmark: page build & serialization with and without cached fragments
+# Usage: python benchmarks/bench_fragments.py [--repeat 200] [--nodes 30]
+# "uncached" clears the layout fragments before every build (the behaviour
+# before they were cached), "cached" reuses them as the running app does.
+
+# Imports
+import argparse
+import os
+import sys
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import dash
+from dash._utils import to_json
+from constants import factors
+from functions import (generate_step_content, create_mental_health_map_tab, create_tracking_tab, create_about,
+                       layout_fragments)
+from styles import StyleSheet, default_stylesheet
+
+# Function: Session, edit-map & tracking data for a map with n factors
+def sample_data(n):
+    names = [factors[i % len(factors)] + ('' if i < len(factors) else f' {i}') for i in range(n)]
+    elements = [{'data': {'id': name, 'label': name}} for name in names]
+    elements += [{'data': {'id': f'{a}->{b}', 'source': a, 'target': b}} for a, b in zip(names, names[1:])]
+    stylesheet = StyleSheet(default_stylesheet).to_list()
+    dropdowns = {key: {'options': [], 'value': None} for key in ['chain1', 'chain2', 'cycle1', 'cycle2', 'target']}
+    dropdowns['initial-selection'] = {'options': [{'label': f, 'value': f} for f in factors], 'value': names[:6]}
+    session_data = {'dropdowns': dropdowns, 'elements': elements, 'edges': [], 'add-nodes': names,
+                    'add-edges': [], 'stylesheet': stylesheet, 'annotations': []}
+    track_data = {'elements': elements, 'stylesheet': stylesheet, 'timeline-marks': {0: 'PsySys map'},
+                  'timeline-min': 0, 'timeline-max': 0, 'timeline-value': 0}
+    return session_data, track_data
+
+# Function: Mean build time, mean build + serialize time (ms) & payload size (bytes)
+def measure(build, repeat, cached):
+    build_time, render_time, size = 0.0, 0.0, 0
+    for _ in range(repeat):
+        if not cached:
+            for fragment in layout_fragments:
+                fragment.cache_clear()
+        start = time.perf_counter()
+        content = build()
+        built = time.perf_counter()
+        size = len(to_json(content))
+        render_time += time.perf_counter() - start
+        build_time += built - start
+    return build_time / repeat * 1000, render_time / repeat * 1000, size
+
+def run(repeat, nodes):
+    app = dash.Dash(__name__)
+    session_data, track_data = sample_data(nodes)
+    pages = [(f'wizard step {step}', lambda step=step: generate_step_content(step, session_data)) for step in range(6)]
+    pages += [('my-mental-health-map', lambda: create_mental_health_map_tab(session_data, None, None)),
+              ('track-my-mental-health-map', lambda: create_tracking_tab(track_data)),
+              ('about', lambda: create_about(app))]
+
+    print(f"{'page':<28}{'bytes':>8}{'build uncached':>16}{'build cached':>14}{'render uncached':>17}{'render cached':>15}")
+    for name, build in pages:
+        measure(build, 5, True)  # warm up
+        cold_build, cold_render, size = measure(build, repeat, False)
+        warm_build, warm_render, warm_size = measure(build, repeat, True)
+        assert size == warm_size
+        print(f"{name:<28}{size:>8}{cold_build:>14.3f}ms{warm_build:>12.3f}ms{cold_render:>15.3f}ms{warm_render:>13.3f}ms")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Time page layouts with and without cached fragments.")
+    parser.add_argument('--repeat', type=int, default=200, help="builds per page and mode")
+    parser.add_argument('--nodes', type=int, default=30, help="factors in the sample map")
+    args = parser.parse_args()
+    run(args.repeat, args.nodes)
@@ -0,0 +1,199 @@
+# Hot-path benchmark suite: map building, styling & export on synthetic maps of 10 to 10,000 factors
+# Records median & best time, peak memory (tracemalloc, in a separate run) and output size per
+# case and map size, and saves them as JSON so runs on different commits can be compared.
+# Usage: python benchmarks/bench_hotpaths.py [--sizes 10 100 1000 10000] [--cases color_scheme ...]
+#        [--repeat 5] [-o results.json] [--compare baseline.json] [--threshold 1.25]
+# With --compare, cases slower than threshold x the baseline are listed and the exit code is 1.
+
+# Imports
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('PSYSYS_STATE_BACKEND', 'memory')  # no Redis or disk needed to import the app
+from functions import (map_add_factors, map_add_chains, map_add_cycles, color_scheme, node_sizing,
+                       update_edge_opacity, calculate_degree_centrality)
+from styles import StyleSheet, default_stylesheet, edge_selector
+
+# Function: Session data of a wizard map with n factors (about 2 links per factor)
+def synthetic_session(n, seed=0):
+    rng = random.Random(seed)
+    names = [f'Factor {i}' for i in range(n)]
+    elements = [{'data': {'id': name, 'label': name}} for name in names]
+    edges = dict.fromkeys((rng.choice(names), rng.choice(names)) for _ in range(2 * n))
+    elements += [{'data': {'id': f'{s}->{t}', 'source': s, 'target': t}} for s, t in edges]
+    dropdowns = {key: {'options': [], 'value': None} for key in ['chain1', 'chain2', 'cycle1', 'cycle2', 'target']}
+    dropdowns['initial-selection'] = {'options': [], 'value': names}
+    dropdowns['chain1']['value'] = names[1:n // 2 + 1]
+    dropdowns['cycle1']['value'] = names[1:n // 4 + 1]
+    dropdowns['target']['value'] = names[:1]
+    session_data = {'dropdowns': dropdowns, 'elements': elements, 'edges': [f'{s}->{t}' for s, t in edges],
+                    'add-nodes': [], 'add-edges': [], 'stylesheet': StyleSheet(default_stylesheet).to_list(),
+                    'annotations': {}}
+    severity = {name: rng.randint(0, 10) for name in names}
+    return session_data, severity
+
+# Function: Benchmark cases as {name: setup(n) -> zero-argument call}
+# Setups build fresh inputs, since most hot paths update the session data in place.
+def benchmark_cases():
+    def factors(n):
+        session_data, severity = synthetic_session(n)
+        names = session_data['dropdowns']['initial-selection']['value']
+        # Deselect a tenth of the factors & select as many new ones
+        selection = names[n // 10:] + [f'New factor {i}' for i in range(n // 10)]
+        return lambda: map_add_factors(session_data, selection, severity)
+
+    def chains(n):
+        session_data, _ = synthetic_session(n)
+        names = session_data['dropdowns']['initial-selection']['value']
+        return lambda: map_add_chains(session_data, names[:n // 2], names[n // 2:])
+
+    def cycles(n):
+        session_data, _ = synthetic_session(n)
+        names = session_data['dropdowns']['initial-selection']['value']
+        return lambda: map_add_cycles(session_data, names[:n // 4], names[n // 4:n // 2])
+
+    def colors(scheme):
+        def setup(n):
+            session_data, severity = synthetic_session(n)
+            return lambda: color_scheme(scheme, session_data, severity)
+        return setup
+
+    def sizes(scheme):
+        def setup(n):
+            session_data, severity = synthetic_session(n)
+            return lambda: node_sizing(scheme, session_data, severity)
+        return setup
+
+    def opacity(n):
+        session_data, _ = synthetic_session(n)
+        edge_ids = [e['data']['id'] for e in session_data['elements'] if 'source' in e['data']]
+        # Stylesheet with one opacity rule per edge, as after rating every link
+        stylesheet = StyleSheet(session_data['stylesheet'])
+        for edge_id in edge_ids:
+            stylesheet.set(edge_selector(edge_id), {'opacity': 0.6})
+        stylesheet = stylesheet.to_list()
+        return lambda: update_edge_opacity(edge_ids[len(edge_ids) // 2], 3, stylesheet)
+
+    def degrees(n):
+        session_data, _ = synthetic_session(n)
+        elements = session_data['elements']
+        return lambda: calculate_degree_centrality(elements, {e['data']['id']: {} for e in elements if 'source' not in e['data']})
+
+    def export(n):
+        from app_ver02 import format_export_data
+        session_data, severity = synthetic_session(n)
+        edge_data = {e['data']['id']: {'strength': 3, 'annotation': ''} for e in session_data['elements'] if 'source' in e['data']}
+        annotations = {name: 'note' for name in list(severity)[:n // 10]}
+        return lambda: format_export_data(session_data, session_data['stylesheet'], severity, edge_data, annotations)
+
+    return {
+        'map_add_factors': factors,
+        'map_add_chains': chains,
+        'map_add_cycles': cycles,
+        'color_scheme[Severity]': colors('Severity'),
+        'color_scheme[Out-degree]': colors('Out-degree'),
+        'node_sizing[Severity]': sizes('Severity'),
+        'node_sizing[In-degree]': sizes('In-degree'),
+        'update_edge_opacity': opacity,
+        'calculate_degree_centrality': degrees,
+        'format_export_data': export
+    }
+
+# Function: Time, peak memory & output size of one case on one map size
+def measure(setup, n, repeat):
+    times = []
+    for _ in range(repeat):
+        call = setup(n)
+        start = time.perf_counter()
+        result = call()
+        times.append(time.perf_counter() - start)
+
+    # Peak memory in its own run (tracing slows the call down)
+    call = setup(n)
+    tracemalloc.start()
+    call()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        'median_ms': round(statistics.median(times) * 1000, 4),
+        'best_ms': round(min(times) * 1000, 4),
+        'peak_kb': round(peak / 1024, 1),
+        'output_bytes': len(json.dumps(result, default=str))
+    }
+
+# Function: Commit the benchmark runs on (None outside a git checkout)
+def current_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(sizes, names, repeat):
+    cases = benchmark_cases()
+    results = []
+    print(f"{'case':<30}{'factors':>8}{'median':>12}{'best':>12}{'peak':>12}{'output':>12}")
+    for name in names:
+        for n in sizes:
+            result = dict(case=name, factors=n, **measure(cases[name], n, repeat))
+            results.append(result)
+            print(f"{name:<30}{n:>8}{result['median_ms']:>10.2f}ms{result['best_ms']:>10.2f}ms"
+                  f"{result['peak_kb']:>10.0f}KB{result['output_bytes'] / 1024:>10.1f}KB")
+    return {
+        'commit': current_commit(),
+        'date': datetime.now().strftime("%Y-%m-%d_%H-%M-%S"),
+        'python': platform.python_version(),
+        'machine': platform.platform(),
+        'repeat': repeat,
+        'results': results
+    }
+
+# Function: Cases slower than threshold x a baseline run (matched by case & size)
+def compare(report, baseline, threshold):
+    before = {(r['case'], r['factors']): r for r in baseline['results']}
+    regressions = []
+    print(f"\nCompared with {baseline.get('commit') or 'baseline'} ({baseline.get('date')}):")
+    for result in report['results']:
+        old = before.get((result['case'], result['factors']))
+        if old is None or not old['median_ms']:
+            continue
+        ratio = result['median_ms'] / old['median_ms']
+        flag = '  REGRESSION' if ratio > threshold else ''
+        print(f"{result['case']:<30}{result['factors']:>8}{old['median_ms']:>10.2f}ms ->{result['median_ms']:>10.2f}ms{ratio:>8.2f}x{flag}")
+        if ratio > threshold:
+            regressions.append(result)
+    return regressions
+
+if __name__ == '__main__':
+    names = list(benchmark_cases())
+    parser = argparse.ArgumentParser(description="Time the map building, styling & export hot paths.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 10000], help="factors per synthetic map")
+    parser.add_argument('--cases', nargs='+', default=names, choices=names, metavar='CASE', help=f"cases to run (default: all of {', '.join(names)})")
+    parser.add_argument('--repeat', type=int, default=5, help="timed runs per case & size")
+    parser.add_argument('-o', '--output', default=None, help="results file (default: benchmarks/results/hotpaths-<commit>.json)")
+    parser.add_argument('--compare', default=None, help="earlier results file to compare against")
+    parser.add_argument('--threshold', type=float, default=1.25, help="slowdown (median) reported as a regression")
+    args = parser.parse_args()
+
+    report = run(args.sizes, args.cases, args.repeat)
+    output = args.output or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results',
+                                         f"hotpaths-{report['commit'] or report['date']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=1)
+    print(f"Saved {len(report['results'])} results to {output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,53 @@
+# Layout benchmark: server-side force-directed positions (layouts.py) on synthetic maps
+# "fresh" is a layout without earlier positions, "cached" a repeat of the same map
+# structure, "warm start" the layout after adding one factor to a laid-out map.
+# Usage: python benchmarks/bench_layouts.py [--sizes 10 50 200 1000] [--repeat 3]
+
+# Imports
+import argparse
+import os
+import random
+import sys
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import layouts
+from layouts import map_positions
+
+# Function: Elements of a map with n factors (about 2 links per factor)
+def synthetic_elements(n, seed=0):
+    rng = random.Random(seed)
+    nodes = [f'Factor {i}' for i in range(n)]
+    elements = [{'data': {'id': node, 'label': node}} for node in nodes]
+    edges = dict.fromkeys((rng.choice(nodes), rng.choice(nodes)) for _ in range(2 * n))
+    return elements + [{'data': {'source': s, 'target': t}} for s, t in edges]
+
+# Function: Best time of repeat runs (ms); clear empties the layout cache before each run
+def best(func, repeat, clear=False):
+    times = []
+    for _ in range(repeat):
+        if clear:
+            layouts._cache.clear()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+def run(sizes, repeat):
+    print(f"{'factors':>8}{'fresh':>11}{'cached':>11}{'warm start':>13}{'payload':>11}")
+    for n in sizes:
+        elements = synthetic_elements(n)
+        fresh = best(lambda: map_positions(elements), repeat, clear=True)
+        positions = map_positions(elements)
+        cached = best(lambda: map_positions(elements), repeat)
+        edited = elements + [{'data': {'id': 'New factor', 'label': 'New factor'}},
+                             {'data': {'source': 'New factor', 'target': 'Factor 0'}}]
+        warm = best(lambda: map_positions(edited, positions), repeat, clear=True)
+        payload = len(str(positions))
+        print(f"{n:>8}{fresh:>9.1f}ms{cached:>9.2f}ms{warm:>11.1f}ms{payload / 1024:>9.1f}KB")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Time server-side map layouts.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 50, 200, 1000], help="factors per synthetic map")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per size (best is reported)")
+    args = parser.parse_args()
+    run(args.sizes, args.repeat)
@@ -0,0 +1,98 @@
+# Startup profile: import time & resident memory of app_ver02 and every module it pulls in
+# Runs the import in a fresh interpreter (a cold worker boot) and attributes time & RSS to each
+# module imported for the first time, including the modules it imports itself.
+# Usage: python benchmarks/bench_startup.py [--module app_ver02] [--top 25] [--repeat 3]
+#        [--budget-seconds 4.5] [--budget-mb 100]
+# The exit code is 1 when the (best) cold start exceeds the budget (tests/test_startup.py checks it too).
+
+# Imports
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Cold start budget of a worker (2.6-3.3 s & 82 MB on a single CPU when it was set;
+# numpy & scipy alone added 0.6 s & 22 MB)
+budget_seconds = 4.5
+budget_mb = 100.0
+
+# Packages only the paths that need them import (never at start)
+deferred_modules = ['numpy', 'scipy', 'matplotlib', 'networkx', 'pandas']
+
+# Code run in the fresh interpreter: wraps __import__ & prints a JSON profile
+child = r'''
+import builtins, json, os, sys, time
+page = os.sysconf('SC_PAGE_SIZE')
+
+def rss():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * page
+
+profile = {}
+original_import = builtins.__import__
+
+def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    if level or name in sys.modules:
+        return original_import(name, globals, locals, fromlist, level)
+    start, memory = time.perf_counter(), rss()
+    try:
+        return original_import(name, globals, locals, fromlist, level)
+    finally:
+        if name not in profile:
+            profile[name] = [time.perf_counter() - start, rss() - memory]
+
+start, memory = time.perf_counter(), rss()
+builtins.__import__ = timed_import
+__import__(sys.argv[1])
+builtins.__import__ = original_import
+print(json.dumps({'seconds': time.perf_counter() - start, 'rss': rss(), 'rss_imports': rss() - memory,
+                  'modules': profile}))
+'''
+
+# Function: Profile of one cold import of a module (in a subprocess)
+def cold_start(module, root):
+    env = dict(os.environ, PSYSYS_STATE_BACKEND=os.environ.get('PSYSYS_STATE_BACKEND', 'memory'))
+    result = subprocess.run([sys.executable, '-c', child, module], cwd=root, env=env,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def run(module, top, repeat):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    profiles = sorted((cold_start(module, root) for _ in range(repeat)), key=lambda p: p['seconds'])
+    profile = profiles[0]
+    print(f"{'module':<40}{'import':>12}{'rss':>12}")
+    # Modules are cumulative (they include what they import), so only the slowest are listed
+    modules = sorted(profile['modules'].items(), key=lambda item: -item[1][0])[:top]
+    for name, (seconds, memory) in modules:
+        print(f"{name:<40}{seconds * 1000:>10.0f}ms{memory / 2 ** 20:>10.1f}MB")
+    print(f"\nImport of {module}: {profile['seconds']:.2f}s (best of {repeat}), "
+          f"RSS {profile['rss'] / 2 ** 20:.0f} MB ({profile['rss_imports'] / 2 ** 20:.0f} MB from imports)")
+    return profile
+
+# Function: Problems of a cold start profile over the budget (empty if none)
+def over_budget(profile, seconds=budget_seconds, mb=budget_mb, deferred=deferred_modules):
+    over = []
+    loaded = sorted({name.split('.')[0] for name in profile['modules']} & set(deferred))
+    if loaded:
+        over.append(f"imported at start: {', '.join(loaded)}")
+    if seconds is not None and profile['seconds'] > seconds:
+        over.append(f"import took {profile['seconds']:.2f}s (budget {seconds:.2f}s)")
+    if mb is not None and profile['rss'] / 2 ** 20 > mb:
+        over.append(f"RSS is {profile['rss'] / 2 ** 20:.0f} MB (budget {mb:.0f} MB)")
+    return over
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Profile import time & memory of a cold app start.")
+    parser.add_argument('--module', default='app_ver02', help="module to import")
+    parser.add_argument('--top', type=int, default=25, help="slowest modules listed")
+    parser.add_argument('--repeat', type=int, default=3, help="cold starts (the fastest is reported)")
+    parser.add_argument('--budget-seconds', type=float, default=budget_seconds, help="fail if the import takes longer")
+    parser.add_argument('--budget-mb', type=float, default=budget_mb, help="fail if the worker's RSS is larger")
+    args = parser.parse_args()
+
+    profile = run(args.module, args.top, args.repeat)
+    over = over_budget(profile, args.budget_seconds, args.budget_mb)
+    for problem in over:
+        print(f"Over budget: {problem}")
+    sys.exit(1 if over else 0)
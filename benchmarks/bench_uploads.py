@@ -0,0 +1,75 @@
+# Upload benchmark: old decode + json.loads path vs. uploads.py on synthetic map files
+# "decode + parse" is the size-capped decode with the fast JSON backend,
+# "parse_upload" adds schema validation & normalization.
+# Usage: python benchmarks/bench_uploads.py [--sizes 100 1000 5000] [--repeat 5]
+
+# Imports
+import argparse
+import base64
+import json
+import os
+import random
+import sys
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from uploads import decode_upload, json_backend, parse_json, parse_upload
+
+# Function: dcc.Upload contents of an exported map with n factors (about 3 links per factor)
+def synthetic_upload(n, seed=0):
+    rng = random.Random(seed)
+    nodes = [f'Factor {i}' for i in range(n)]
+    elements = [{'data': {'id': node, 'label': node}} for node in nodes]
+    edge_data = {}
+    for i in range(3 * n):
+        edge_id = f'edge-{i}'
+        elements.append({'data': {'id': edge_id, 'source': rng.choice(nodes), 'target': rng.choice(nodes)}})
+        edge_data[edge_id] = {'strength': rng.randint(1, 5), 'annotation': ''}
+    data = {
+        'elements': elements,
+        'stylesheet': [{'selector': f'node[id="{node}"]', 'style': {'background-color': '#8B0000'}} for node in nodes],
+        'severity-scores': {node: rng.randint(0, 10) for node in nodes},
+        'edge-data': edge_data,
+        'annotations': {},
+        'date': '2024-01-05_13-59-56'
+    }
+    raw = json.dumps(data).encode('utf-8')
+    return 'data:application/json;base64,' + base64.b64encode(raw).decode('ascii'), len(raw)
+
+# Function: The previous upload path (no size limit, no validation)
+def old_parse(contents):
+    content_type, content_string = contents.split(',')
+    return json.loads(base64.b64decode(content_string).decode('utf-8'))
+
+# Function: Best time of repeat runs (ms)
+def best(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+def run(sizes, repeat):
+    print(f"JSON backend: {json_backend}")
+    print(f"{'factors':>8}{'file size':>12}{'old (json.loads)':>18}{'decode + parse':>16}{'parse_upload':>14}")
+    for n in sizes:
+        contents, size = synthetic_upload(n)
+        old = best(lambda: old_parse(contents), repeat)
+        parsed = best(lambda: parse_json(decode_upload(contents, max_bytes=len(contents))), repeat)
+        new = best(lambda: parse_upload(contents, max_bytes=len(contents)), repeat)
+        print(f"{n:>8}{size / 1024:>10.0f}KB{old:>16.1f}ms{parsed:>14.1f}ms{new:>12.1f}ms")
+
+    # An oversized upload is rejected before it is decoded
+    contents, size = synthetic_upload(max(sizes))
+    start = time.perf_counter()
+    try:
+        parse_upload(contents, max_bytes=size // 2)
+    except ValueError as error:
+        print(f"Rejected {size / 1024:.0f}KB upload in {(time.perf_counter() - start) * 1000:.3f}ms: {error}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Time parsing of uploaded map files.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 5000], help="factors per synthetic map")
+    parser.add_argument('--repeat', type=int, default=5, help="runs per size (best is reported)")
+    args = parser.parse_args()
+    run(args.sizes, args.repeat)
@@ -0,0 +1,153 @@
+# Imports
+from metrics import map_structure, degree_metrics, get_metric
+
+# Colors of the diff overlay
+added_color = '#2ca02c'
+removed_color = '#d62728'
+worse_color = '#ff7f0e'
+better_color = '#1f77b4'
+
+# Stylesheet rules of the diff overlay (appended after the map's stylesheet)
+diff_rules = [
+    {'selector': 'node.diff-added', 'style': {'border-width': 4, 'border-color': added_color}},
+    {'selector': 'edge.diff-added', 'style': {'line-color': added_color, 'target-arrow-color': added_color}},
+    {'selector': 'node.diff-removed', 'style': {'opacity': 0.4, 'border-width': 2, 'border-style': 'dashed', 'border-color': removed_color}},
+    {'selector': 'edge.diff-removed', 'style': {'opacity': 0.4, 'line-style': 'dashed', 'line-color': removed_color, 'target-arrow-color': removed_color}},
+    {'selector': 'node.diff-worse', 'style': {'border-width': 4, 'border-color': worse_color}},
+    {'selector': 'node.diff-better', 'style': {'border-width': 4, 'border-color': better_color}}
+]
+
+# Function: Shared node index over several map structures (node id -> position, first seen first)
+def shared_index(structures):
+    index = {}
+    for nodes, _ in structures:
+        for node in nodes:
+            index.setdefault(node, len(index))
+    return index
+
+# Function: Aligned arrays of a timeline of maps over a shared node index (one row per map)
+# Edges are encoded as source position * n + target position, so edge sets
+# can be compared with sorted-array set operations.
+def timeline_arrays(snapshots, structures, index, metrics=degree_metrics):
+    import numpy as np
+    T, n = len(snapshots), len(index)
+    present = np.zeros((T, n), dtype=bool)
+    severity = np.full((T, n), np.nan)
+    columns = {name: np.zeros((T, n)) for name in metrics if name not in degree_metrics}
+    codes = []
+    for row, ((elements, scores), (nodes, edges)) in enumerate(zip(snapshots, structures)):
+        positions = np.fromiter((index[node] for node in nodes), dtype=np.int64, count=len(nodes))
+        present[row, positions] = True
+        scored = [(index[node], score) for node, score in (scores or {}).items()
+                  if node in index and isinstance(score, (int, float))]
+        if scored:
+            nodes_scored, values = zip(*scored)
+            severity[row, list(nodes_scored)] = values
+        sources = np.fromiter((index[s] for s, _ in edges), dtype=np.int64, count=len(edges))
+        targets = np.fromiter((index[t] for _, t in edges), dtype=np.int64, count=len(edges))
+        codes.append(np.unique(sources * n + targets))
+        for name, column in columns.items():  # path metrics are memoized per map structure in metrics.py
+            values = get_metric(elements, name)
+            column[row, positions] = [values[node] for node in nodes]
+    severity[~present] = np.nan
+
+    # Degrees of all maps at once: count (row, node) pairs
+    rows = np.repeat(np.arange(T), [len(c) for c in codes])
+    flat = np.concatenate(codes) if codes else np.zeros(0, dtype=np.int64)
+    out_degree = np.bincount(rows * n + flat // max(n, 1), minlength=T * n).reshape(T, n)
+    in_degree = np.bincount(rows * n + flat % max(n, 1), minlength=T * n).reshape(T, n)
+    for name in metrics:
+        if name == 'out-degree':
+            columns[name] = out_degree
+        elif name == 'in-degree':
+            columns[name] = in_degree
+        elif name == 'out-in-ratio':
+            columns[name] = np.divide(out_degree, in_degree, out=np.zeros((T, n)), where=in_degree != 0)
+    return {'present': present, 'severity': severity, 'edges': codes, 'metrics': columns}
+
+# Function: Diffs between every consecutive pair of maps in a timeline, in one pass
+# snapshots: [(elements, severity scores)]. All maps share one node index, so
+# node changes, severity & centrality deltas are row differences of (maps x nodes)
+# matrices, and edge changes one set difference over edge codes tagged with their pair.
+def timeline_diffs(snapshots, metrics=degree_metrics):
+    import numpy as np  # loaded with the first diff
+    structures = [map_structure(elements) for elements, _ in snapshots]
+    index = shared_index(structures)
+    names = list(index)
+    n, pairs = len(index), len(snapshots) - 1
+    diffs = [{'added-nodes': [], 'removed-nodes': [], 'added-edges': [], 'removed-edges': [],
+              'severity': {}, 'centrality': {name: {} for name in metrics}} for _ in range(max(pairs, 0))]
+    if pairs < 1:
+        return diffs
+    arrays = timeline_arrays(snapshots, structures, index, metrics)
+
+    present = arrays['present']
+    before, after = present[:-1], present[1:]
+    both = before & after
+    for key, mask in [('added-nodes', after & ~before), ('removed-nodes', before & ~after)]:
+        for pair, node in zip(*(axis.tolist() for axis in np.nonzero(mask))):
+            diffs[pair][key].append(names[node])
+
+    codes, size = arrays['edges'], n * n
+    earlier = np.concatenate([pair * size + c for pair, c in enumerate(codes[:-1])])
+    later = np.concatenate([pair * size + c for pair, c in enumerate(codes[1:])])
+    for key, tagged in [('added-edges', np.setdiff1d(later, earlier, assume_unique=True)),
+                        ('removed-edges', np.setdiff1d(earlier, later, assume_unique=True))]:
+        for pair, code in zip((tagged // size).tolist(), (tagged % size).tolist()):
+            diffs[pair][key].append([names[code // n], names[code % n]])
+
+    def deltas(matrix, target):
+        delta = np.diff(matrix, axis=0)
+        changed = both & (delta != 0)
+        if delta.dtype.kind == 'f':
+            changed &= ~np.isnan(delta)
+        pair_ids, node_ids = np.nonzero(changed)
+        for pair, node, value in zip(pair_ids.tolist(), node_ids.tolist(), delta[changed].tolist()):
+            target(pair)[names[node]] = value
+
+    deltas(arrays['severity'], lambda pair: diffs[pair]['severity'])
+    for name in metrics:
+        deltas(arrays['metrics'][name], lambda pair: diffs[pair]['centrality'][name])
+    return diffs
+
+# Function: Diff between two maps (added/removed factors & links, severity & centrality deltas)
+def map_diff(elements_a, severity_a, elements_b, severity_b, metrics=degree_metrics):
+    return timeline_diffs([(elements_a, severity_a), (elements_b, severity_b)], metrics)[0]
+
+# Function: Elements of the later map marked with a diff (use with diff_rules)
+# Removed factors & links are kept as faded elements taken from the earlier map.
+def diff_elements(elements, previous_elements, diff):
+    added_nodes, removed_nodes = set(diff['added-nodes']), set(diff['removed-nodes'])
+    added_edges = {tuple(edge) for edge in diff['added-edges']}
+    removed_edges = {tuple(edge) for edge in diff['removed-edges']}
+    severity = diff['severity']
+
+    def marked(element, mark):
+        classes = ' '.join(filter(None, [element.get('classes', ''), mark]))
+        return dict(element, classes=classes) if mark else element
+
+    result = []
+    for element in elements:
+        data = element.get('data', {})
+        if 'source' in data:
+            mark = 'diff-added' if (data['source'], data.get('target')) in added_edges else None
+        elif data.get('id') in added_nodes:
+            mark = 'diff-added'
+        elif severity.get(data.get('id'), 0) != 0:
+            mark = 'diff-worse' if severity[data['id']] > 0 else 'diff-better'
+        else:
+            mark = None
+        result.append(marked(element, mark))
+
+    # Removed factors first, so the removed links find their endpoints
+    ghost_nodes, ghost_edges = [], []
+    for element in previous_elements:
+        data = element.get('data', {})
+        if 'source' in data:
+            if (data['source'], data.get('target')) in removed_edges:
+                removed_edges.discard((data['source'], data.get('target')))
+                ghost_edges.append(marked(element, 'diff-removed'))
+        elif data.get('id') in removed_nodes:
+            removed_nodes.discard(data['id'])
+            ghost_nodes.append(marked(element, 'diff-removed'))
+    return result + ghost_nodes + ghost_edges
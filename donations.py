@@ -0,0 +1,215 @@
+# Imports
+import base64
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Default spool & local donation folders sit next to the app, whatever the working directory
+root = os.path.dirname(os.path.abspath(__file__))
+
+# Function: Content-hash key of a donation (same map -> same key, so resubmits are no-ops)
+def donation_key(data):
+    content = json.dumps(data, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    return hashlib.sha256(content).hexdigest()[:20]
+
+# Function: File name a donation is stored under
+def donation_filename(key, data):
+    return f"graph_{data.get('date') or time.strftime('%Y-%m-%d_%H-%M-%S')}_{key[:8]}.json"
+
+# Function: Write a file atomically (readers never see half a donation)
+def write_atomic(path, text):
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+# Class: Sink writing donations into a local directory (testing & self-hosting)
+class LocalSink:
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def send(self, key, data):
+        path = os.path.join(self.directory, donation_filename(key, data))
+        if not os.path.exists(path):
+            write_atomic(path, json.dumps(data))
+
+# Class: Sink committing donations to a GitHub repository via the contents API
+class GitHubSink:
+
+    def __init__(self, owner, repo, token, directory='data-donation', timeout=20):
+        self.url = f'https://api.github.com/repos/{owner}/{repo}/contents/{directory}'
+        self.headers = {'Authorization': f'token {token}'}
+        self.timeout = timeout
+
+    def send(self, key, data):
+        import requests
+
+        content = base64.b64encode(json.dumps(data).encode('utf-8')).decode('utf-8')
+        payload = {'message': 'Graph donation', 'content': content}
+        response = requests.put(f'{self.url}/{donation_filename(key, data)}', headers=self.headers,
+                                json=payload, timeout=self.timeout)
+        # 422: the file already exists, i.e. this donation was delivered before
+        if response.status_code not in (200, 201, 422):
+            raise IOError(f"GitHub upload failed ({response.status_code}): {response.text[:200]}")
+
+# Function: Sink selected by PSYSYS_DONATION_SINK (github or local)
+# The github sink needs PSYSYS_GITHUB_TOKEN; without it donations are kept locally.
+def sink_from_env():
+    token = os.environ.get('PSYSYS_GITHUB_TOKEN')
+    kind = os.environ.get('PSYSYS_DONATION_SINK', 'github' if token else 'local')
+    if kind == 'github' and not token:
+        logger.warning("PSYSYS_DONATION_SINK=github needs PSYSYS_GITHUB_TOKEN; donations are saved locally instead")
+    elif kind == 'github':
+        return GitHubSink(os.environ.get('PSYSYS_GITHUB_OWNER', 'emilycampossindermann'),
+                          os.environ.get('PSYSYS_GITHUB_REPO', 'PsySys_2.0'), token)
+    return LocalSink(os.environ.get('PSYSYS_DONATION_DIR', os.path.join(root, 'data-donation')))
+
+# Function: Name of a pending donation: key.json, or key.<attempts>.<next attempt time>.json after failures
+# The retry state lives in the name, so every process sharing the spool backs off alike.
+def pending_name(key, attempts=0, due=0):
+    return f'{key}.json' if not attempts else f'{key}.{attempts}.{int(due)}.json'
+
+# Function: (key, attempts, next attempt time) of a pending or in-flight (key.<attempts>.<pid>.json) name
+def parse_name(name):
+    parts = name[:-len('.json')].split('.')
+    attempts = int(parts[1]) if len(parts) > 1 else 0
+    due = int(parts[2]) if len(parts) > 2 else 0
+    return parts[0], attempts, due
+
+# Class: Durable donation queue
+# Donations are written to <spool>/pending and the callback returns right away.
+# A background thread claims files by renaming them into <spool>/inflight (so
+# several gunicorn workers can drain the same spool), hands them to the sink in
+# batches and retries failures with exponential backoff. After max_attempts
+# failures a donation is moved to <spool>/failed.
+class DonationQueue:
+
+    def __init__(self, spool, sink, batch_size=10, interval=2.0, base_delay=5.0, max_delay=3600.0, max_attempts=10):
+        self.spool = spool
+        self.sink = sink
+        self.batch_size = batch_size
+        self.interval = interval
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self.wakeup = threading.Event()
+        self.thread = None
+        self.pid = None
+        for folder in ['pending', 'inflight', 'failed']:
+            os.makedirs(os.path.join(spool, folder), exist_ok=True)
+
+    def _path(self, folder, name):
+        return os.path.join(self.spool, folder, name)
+
+    # Whether a donation is already spooled: pending (under any retry name), in flight or failed
+    def spooled(self, key):
+        for folder in ['pending', 'inflight', 'failed']:
+            for name in os.listdir(os.path.join(self.spool, folder)):
+                if name.endswith('.json') and parse_name(name)[0] == key:
+                    return True
+        return False
+
+    # Spool a donation & return its key
+    # Short-lived processes (background callback jobs) only spool; a worker's thread sends it.
+    def submit(self, data, send=True):
+        key = donation_key(data)
+        if not self.spooled(key):
+            write_atomic(self._path('pending', f'{key}.json'), json.dumps(data))
+        if send:
+            self.start()
+            self.wakeup.set()
+        return key
+
+    def start(self):
+        # Threads do not survive a fork, so every (gunicorn) process starts its own
+        if self.thread is not None and self.thread.is_alive() and self.pid == os.getpid():
+            return
+        self.pid = os.getpid()
+        self.recover()
+        self.thread = threading.Thread(target=self.run, name='donation-queue', daemon=True)
+        self.thread.start()
+
+    # Return donations left in flight by a crashed process to the queue
+    def recover(self, max_age=600):
+        for name in os.listdir(os.path.join(self.spool, 'inflight')):
+            path = self._path('inflight', name)
+            try:
+                if time.time() - os.path.getmtime(path) > max_age:
+                    key, attempts, _ = parse_name(name)
+                    os.replace(path, self._path('pending', pending_name(key, attempts)))
+            except FileNotFoundError:
+                pass
+
+    # Claim up to batch_size due donations
+    def claim(self):
+        claimed = []
+        now = time.time()
+        for name in sorted(os.listdir(os.path.join(self.spool, 'pending'))):
+            if not name.endswith('.json'):
+                continue
+            key, attempts, due = parse_name(name)
+            if due > now:
+                continue
+            inflight = self._path('inflight', f'{key}.{attempts}.{os.getpid()}.json')
+            try:
+                os.replace(self._path('pending', name), inflight)
+            except FileNotFoundError:
+                continue  # claimed by another process
+            os.utime(inflight)
+            claimed.append((key, attempts, inflight))
+            if len(claimed) == self.batch_size:
+                break
+        return claimed
+
+    # Send one batch; returns the number of donations delivered
+    def drain_once(self):
+        delivered = 0
+        for key, attempts, path in self.claim():
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except ValueError:
+                logger.error("Donation %s is not valid JSON; moved to failed/", key)
+                os.replace(path, self._path('failed', f'{key}.json'))
+                continue
+            try:
+                self.sink.send(key, data)
+            except Exception as error:
+                attempts += 1
+                if attempts >= self.max_attempts:
+                    logger.error("Donation %s failed %d times, moved to failed/: %s", key, attempts, error)
+                    os.replace(path, self._path('failed', f'{key}.json'))
+                    continue
+                delay = min(self.base_delay * 2 ** (attempts - 1), self.max_delay)
+                os.replace(path, self._path('pending', pending_name(key, attempts, time.time() + delay)))
+                logger.warning("Donation %s failed (attempt %d, retrying in %.0fs): %s", key, attempts, delay, error)
+                continue
+            os.remove(path)
+            delivered += 1
+        return delivered
+
+    def run(self):
+        while True:
+            try:
+                if self.drain_once() == self.batch_size:
+                    continue  # more waiting, no need to sleep
+            except OSError as error:
+                logger.error("Donation queue error: %s", error)
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+
+    def pending(self):
+        return len([name for name in os.listdir(os.path.join(self.spool, 'pending')) if name.endswith('.json')])
+
+# Function: Donation queue spooling into PSYSYS_DONATION_SPOOL (donation-spool next to the app)
+def queue_from_env():
+    return DonationQueue(os.environ.get('PSYSYS_DONATION_SPOOL', os.path.join(root, 'donation-spool')), sink_from_env())
@@ -1,10 +1,18 @@
 # Imports 
 from constants import factors, node_color, node_size
+import functools
+import os
 import dash
 from dash import dcc, html
 from dash.dependencies import Input, Output, State, MATCH, ALL
 import dash_bootstrap_components as dbc
 import dash_cytoscape as cyto
+from graph import MapGraph
+from metrics import get_metric, DegreeCounter
+from styles import StyleSheet, default_stylesheet, node_selector, edge_selector
+from uploads import max_upload_bytes
+from layouts import map_layout
+from images import responsive_image
 
 # Function: Embed YouTube video 
 def create_iframe(src):
@@ -43,18 +51,48 @@ def create_likert_scale(factor, initial_value=0):
         )
     ])
 
+# Wizard steps: progress, video & instructions (None: no video)
+step_intro = {
+    0: (0, "https://www.youtube.com/embed/d8ZZyuESXcU?si=CYvKNlf17wnzt4iG",
+        [("Please watch this video and begin with the PsySys session.", None)]),
+    1: (0, "https://www.youtube.com/embed/ttLzT4U2F2I?si=xv1ETjdc1uGROZTo",
+        [("Please watch the video. Below choose the factors you are currently dealing with.", None)]),
+    2: (25, "https://www.youtube.com/embed/stqJRtjIPrI?si=1MI5daW_ldY3aQz3",
+        [("Please watch the video. Below indicate two causal relations you recognize.", None),
+         ("Example: If you feel that normally worrying causes you to become less concentrated, select these factors below in this order.", {'width': '70%', 'font-style': 'italic', 'color': 'grey'})]),
+    3: (50, 'https://www.youtube.com/embed/EdwiSp3BdKk?si=TcqeWxAlGl-_NUfx',
+        [("Please watch the video. Below indicate your vicious cycles. You can choose one containing two factors and another one containing three.", {'width': '70%'})]),
+    4: (75, 'https://www.youtube.com/embed/hwisVnJ0y88?si=OpCWAMaDwTThocO6',
+        [("Please watch the video. Below indicate the factor you feel is the most influential one in your mental-health map.", {'width': '70%'})]),
+    5: (100, None, [])
+}
+
+# Function: Static top of a wizard step (progress bar, video & text), built once per process
+@functools.lru_cache(maxsize=None)
+def step_scaffold(step):
+    progress, video, text = step_intro[step]
+    if video is None:
+        return (
+            html.Br(), html.Br(), html.Br(),
+            html.Div([
+                dbc.Progress(value=progress, striped=True, color="primary", style={"width": "66.5%", "position": "relative"}),
+                html.Span("🎉", style={"font-size": "20px", "margin-left": "10px", "margin-top": "-5px"})
+            ], style={"display": "flex"})
+        )
+    return (
+        html.Br(), html.Br(), html.Br(),
+        dbc.Progress(value=progress, striped=True, color="primary", style={"width": "66.5%"}),
+        html.Br(),
+        create_iframe(video),
+        html.Br(), html.Br(),
+        *[html.P(paragraph, style=style) if style else html.P(paragraph) for paragraph, style in text]
+    )
+
 # Function: Generate step content based on session data
 def generate_step_content(step, session_data):
 
     if step == 0:
-        return html.Div([
-            html.Br(), html.Br(), html.Br(),
-            dbc.Progress(value=0, striped=True, color="primary", style={"width": "66.5%"}),
-            html.Br(),
-            create_iframe("https://www.youtube.com/embed/d8ZZyuESXcU?si=CYvKNlf17wnzt4iG"),
-            html.Br(), html.Br(),
-            html.P("Please watch this video and begin with the PsySys session.")
-        ])
+        return html.Div(list(step_scaffold(0)))
     
     if step == 1:
         options = session_data['dropdowns']['initial-selection']['options']
@@ -62,12 +100,7 @@ def generate_step_content(step, session_data):
         id = {'type': 'dynamic-dropdown', 'step': 1}
         text = 'Select factors'
         return html.Div([
-            html.Br(), html.Br(), html.Br(),
-            dbc.Progress(value=0, striped=True, color="primary", style={"width": "66.5%"}),
-            html.Br(),
-            create_iframe("https://www.youtube.com/embed/ttLzT4U2F2I?si=xv1ETjdc1uGROZTo"),
-            html.Br(), html.Br(),
-            html.P("Please watch the video. Below choose the factors you are currently dealing with."),
+            *step_scaffold(1),
             create_dropdown(id=id, options=options, value=value, placeholder=text),
             html.Br(),
             html.Div(id='likert-scales-container'),
@@ -83,13 +116,7 @@ def generate_step_content(step, session_data):
         id_chain2 = {'type': 'dynamic-dropdown', 'step': 3}
         text = 'Select two factors'
         return html.Div([
-            html.Br(), html.Br(), html.Br(),
-            dbc.Progress(value=25, striped=True, color="primary", style={"width": "66.5%"}),
-            html.Br(),
-            create_iframe("https://www.youtube.com/embed/stqJRtjIPrI?si=1MI5daW_ldY3aQz3"),
-            html.Br(), html.Br(),
-            html.P("Please watch the video. Below indicate two causal relations you recognize."),
-            html.P("Example: If you feel that normally worrying causes you to become less concentrated, select these factors below in this order.", style={'width': '70%', 'font-style': 'italic', 'color': 'grey'}),
+            *step_scaffold(2),
             create_dropdown(id=id_chain1, options=options, value=value_chain1, placeholder=text),
             html.Br(),
             create_dropdown(id=id_chain2, options=options, value=value_chain2, placeholder=text),
@@ -106,12 +133,7 @@ def generate_step_content(step, session_data):
         text1 = 'Select two factors that reinforce each other'
         text2 = 'Select three factors that reiforce each other'
         return html.Div([
-            html.Br(), html.Br(), html.Br(),
-            dbc.Progress(value=50, striped=True, color="primary", style={"width": "66.5%"}),
-            html.Br(),
-            create_iframe('https://www.youtube.com/embed/EdwiSp3BdKk?si=TcqeWxAlGl-_NUfx'),
-            html.Br(), html.Br(),
-            html.P("Please watch the video. Below indicate your vicious cycles. You can choose one containing two factors and another one containing three.", style={'width': '70%'}),
+            *step_scaffold(3),
             create_dropdown(id=id_cycle1, options=options, value=value_cycle1, placeholder=text1),
             html.Br(),
             create_dropdown(id=id_cycle2, options=options, value=value_cycle2, placeholder=text2),
@@ -125,33 +147,21 @@ def generate_step_content(step, session_data):
         id = {'type': 'dynamic-dropdown', 'step': 6}
         text = 'Select one factor'
         return html.Div([
-            html.Br(), html.Br(), html.Br(),
-            dbc.Progress(value=75, striped=True, color="primary", style={"width": "66.5%"}),
-            html.Br(),
-            create_iframe('https://www.youtube.com/embed/hwisVnJ0y88?si=OpCWAMaDwTThocO6'),
-            html.Br(), html.Br(),
-            html.P("Please watch the video. Below indicate the factor you feel is the most influential one in your mental-health map.", style={'width': '70%'}),
+            *step_scaffold(4),
             create_dropdown(id=id, options=options, value=value_target, placeholder=text),
             html.Br()
         ])
 
     if step == 5:
-        elements = session_data.get('elements', [])
-        selected_factors = session_data['add-nodes'] or []
-        options = [{'label': factor, 'value': factor} for factor in selected_factors]
         return html.Div([
-            html.Br(), html.Br(), html.Br(),
-            html.Div([
-                dbc.Progress(value=100, striped=True, color="primary", style={"width": "66.5%", "position": "relative"}),
-                html.Span("🎉", style={"font-size": "20px", "margin-left": "10px", "margin-top": "-5px"})
-            ], style={"display": "flex"}), 
+            *step_scaffold(5),
             html.Div([
                 # Graph Container
                 html.Div([
                     cyto.Cytoscape(
                         id='graph-output',
                         elements=session_data['elements'],
-                        layout={'name': 'cose', 'fit': True, 'padding': 10},
+                        layout=map_layout(session_data['elements']),
                         zoom=1,
                         pan={'x': 200, 'y': 200},
                         stylesheet = session_data['stylesheet'],
@@ -165,14 +175,133 @@ def generate_step_content(step, session_data):
     else:
         return None
 
+# Function: Map buttons below the editing canvas, built once per process
+@functools.lru_cache(maxsize=None)
+def map_tab_buttons():
+    return (
+        html.Div([
+            dbc.Button("Load PsySys Map", id='load-map-btn', className="me-2"),
+            # Style the dcc.Upload component to look like a button
+            dcc.Upload(
+                id='upload-data',
+                children=dbc.Button("Upload Map", id='upload-map-btn'),
+                max_size=max_upload_bytes,
+                style={
+                    'display': 'inline-block',
+                },
+            ),
+        ], style={'display': 'flex', 'flexWrap': 'wrap', 'gap': '5px'}),
+        # Why an upload was rejected
+        dbc.Alert(id='upload-error', color='danger', is_open=False, dismissable=True, duration=10000,
+                  style={'marginTop': '10px', 'marginBottom': '0'}),
+        
+        html.Div([
+            dbc.Button("Download as File ", id='download-file-btn'),
+            dbc.Button("Download as Image", id='download-image-btn'),
+            dbc.Button("Donate", id="donate-btn", color="success")
+        ], style={'display': 'flex', 'marginTop': '10px', 'gap': '10px'})
+    )
+
+# Function: Node, edge & donation modals of the editing tab, built once per process
+@functools.lru_cache(maxsize=None)
+def map_tab_modals():
+    return (
+        # Modal for node name & severity edit
+        dbc.Modal([dbc.ModalHeader(dbc.ModalTitle("Factor Information")),
+                   dbc.ModalBody([
+                       html.Div("Name:"),
+                       dbc.Input(id='modal-node-name', type='text'),
+                       html.Br(),
+                       html.Div("Severity Score:"),
+                       dcc.Slider(id='modal-severity-score', min=0, max=10, step=1),
+                       html.Br(),
+                       html.Div("Notes:"),
+                       dcc.Textarea(
+                           id='note-input',
+                           value='',
+                           className='custom-textarea',
+                           style={
+                               'flex': '1',  # Flex for input to take available space 
+                               'fontSize': '0.9em',  # Adjust font size to make textbox smaller
+                               'resize': 'none',
+                               'width': '32em',
+                               'height': '10em'
+                            }
+                        )
+                       ]),
+                    dbc.ModalFooter(
+                        dbc.Button("Save Changes", id="modal-save-btn", className="ms-auto", n_clicks=0))    
+                        ],
+                        id='node-edit-modal',
+                        is_open=False),
+
+        # Modal for edge info
+        dbc.Modal([dbc.ModalHeader(dbc.ModalTitle("Connection Information")),
+                   dbc.ModalBody([
+                       html.Div(id='edge-explanation'),
+                       html.Br(),
+                       html.Div("Strength of the relationship:"),
+                       dcc.Slider(id='edge-strength', min=1, max=5, step=1),
+                       html.Br(),
+                       html.Div("Notes:"),
+                       dcc.Textarea(
+                           id='edge-annotation',
+                           value='',
+                           className='custom-textarea',
+                           style={
+                               'flex': '1',  # Flex for input to take available space 
+                               'fontSize': '0.9em',  # Adjust font size to make textbox smaller
+                               'resize': 'none',
+                               'width': '32em',
+                               'height': '10em'
+                            }
+                        )
+                       ]),
+                    dbc.ModalFooter(
+                        dbc.Button("Save Changes", id="edge-save-btn", className="ms-auto", n_clicks=0))    
+                        ],
+                        id='edge-edit-modal',
+                        is_open=False),
+
+        # Modal for Donation info
+        dbc.Modal([dbc.ModalHeader(dbc.ModalTitle("Data Donation")),
+                   dbc.ModalBody("Here you can anonymously donate your map. Our aim is to continuously improve PsySys to provide scientifically backed content for our users. Therefore, we believe it is imporant to analyze PsySys results to better understand its clinical value and potential use. By choosing to donate your map, you agree that your anonymized data can be used for research purposes.", id = 'donation-info'),
+                   dbc.ModalFooter(
+                       dbc.Button("Yes, I want to donate", id="donation-agree", className="ms-auto", n_clicks=0))    
+                        ],id='donation-modal', is_open=False)
+    )
+
+# Function: Factor input & inspect switch of the editing tab, built once per process
+@functools.lru_cache(maxsize=None)
+def map_tab_controls():
+    node_controls = html.Div([
+        dbc.Input(id='edit-node', type='text', placeholder='Enter factor', style={'marginRight': '10px', 'borderRadius': '10px'}),
+        dbc.Button("➕", id='btn-plus-node', color="primary", style={'marginRight': '5px'}),
+        dbc.Button("➖", id='btn-minus-node', color="danger")
+    ], style={'display': 'flex', 'alignItems': 'right', 'marginBottom': '10px'})
+
+    inspect_controls = html.Div([
+        dbc.Checklist(options=[{"label": "Inspect", "value": 0}],
+                     value=[1],
+                     id="inspect-switch",
+                     switch=True),
+        dbc.Button("❔", id='help-inspect', color="light", style={'marginLeft': '10px'}),
+        dbc.Modal([dbc.ModalHeader(dbc.ModalTitle("Inspection Mode")),
+                   dbc.ModalBody("Within this mode you can further inspect the consequences of a given factor. Just click on a factor to see its direct effects.", id='modal-inspect-body')
+                   ], id="modal-inspect"),
+                   ], style={'display': 'flex', 'alignItems': 'center', 'marginBottom': '10px'})
+    return node_controls, inspect_controls
+
 # Function: Create my-mental-health-map editing tab
 def create_mental_health_map_tab(edit_map_data, color_scheme_data, sizing_scheme_data):
     # Assuming 'edit_map_data' contains the Cytoscape elements
     cytoscape_elements = edit_map_data.get('elements', [])
-    options_1 = [{'label': element['data'].get('label', element['data'].get('id')), 'value': element['data'].get('id')} for element in cytoscape_elements if 'data' in element and 'label' in element['data'] and 'id' in element['data']]
+    # One option per node, in MapGraph order (edits patch them by MapGraph.node_index)
+    options_1 = [{'label': label, 'value': node_id} for node_id, label in MapGraph.from_elements(cytoscape_elements).labels.items()]
     # options = [{'label': factor, 'value': factor} for factor in factors]
     color_schemes = [{'label': color, 'value': color} for color in node_color]
     sizing_schemes = [{'label': size, 'value': size} for size in node_size]
+    node_controls, inspect_controls = map_tab_controls()
     return html.Div([
         html.Br(),
         html.Br(),
@@ -181,103 +310,21 @@ def create_mental_health_map_tab(edit_map_data, color_scheme_data, sizing_scheme
                 cyto.Cytoscape(
                     id='my-mental-health-map',
                     elements=edit_map_data['elements'],
-                    layout={'name': 'cose', 'fit': True, 'padding': 10},
+                    layout=map_layout(edit_map_data['elements'], edit_map_data.get('positions')),
                     zoom=1,
                     pan={'x': 200, 'y': 200},
                     stylesheet=edit_map_data['stylesheet'],
                     style={'width': '90%', 'height': '480px'}
                 ),
                 html.Br(),
-                html.Div([
-                    dbc.Button("Load PsySys Map", id='load-map-btn', className="me-2"),
-                    # Style the dcc.Upload component to look like a button
-                    dcc.Upload(
-                        id='upload-data',
-                        children=dbc.Button("Upload Map", id='upload-map-btn'),
-                        style={
-                            'display': 'inline-block',
-                        },
-                    ),
-                ], style={'display': 'flex', 'flexWrap': 'wrap', 'gap': '5px'}),
-                
-                html.Div([
-                    dbc.Button("Download as File ", id='download-file-btn'),
-                    dbc.Button("Download as Image", id='download-image-btn'),
-                    dbc.Button("Donate", id="donate-btn", color="success")
-                ], style={'display': 'flex', 'marginTop': '10px', 'gap': '10px'})
+                *map_tab_buttons()
             ], style={'flex': '1'}),
 
-            # Modal for node name & severity edit
-            dbc.Modal([dbc.ModalHeader(dbc.ModalTitle("Factor Information")),
-                       dbc.ModalBody([
-                           html.Div("Name:"),
-                           dbc.Input(id='modal-node-name', type='text'),
-                           html.Br(),
-                           html.Div("Severity Score:"),
-                           dcc.Slider(id='modal-severity-score', min=0, max=10, step=1),
-                           html.Br(),
-                           html.Div("Notes:"),
-                           dcc.Textarea(
-                               id='note-input',
-                               value='',
-                               className='custom-textarea',
-                               style={
-                                   'flex': '1',  # Flex for input to take available space 
-                                   'fontSize': '0.9em',  # Adjust font size to make textbox smaller
-                                   'resize': 'none',
-                                   'width': '32em',
-                                   'height': '10em'
-                                }
-                            )
-                           ]),
-                        dbc.ModalFooter(
-                            dbc.Button("Save Changes", id="modal-save-btn", className="ms-auto", n_clicks=0))    
-                            ],
-                            id='node-edit-modal',
-                            is_open=False),
-
-            # Modal for edge info
-            dbc.Modal([dbc.ModalHeader(dbc.ModalTitle("Connection Information")),
-                       dbc.ModalBody([
-                           html.Div(id='edge-explanation'),
-                           html.Br(),
-                           html.Div("Strength of the relationship:"),
-                           dcc.Slider(id='edge-strength', min=1, max=5, step=1),
-                           html.Br(),
-                           html.Div("Notes:"),
-                           dcc.Textarea(
-                               id='edge-annotation',
-                               value='',
-                               className='custom-textarea',
-                               style={
-                                   'flex': '1',  # Flex for input to take available space 
-                                   'fontSize': '0.9em',  # Adjust font size to make textbox smaller
-                                   'resize': 'none',
-                                   'width': '32em',
-                                   'height': '10em'
-                                }
-                            )
-                           ]),
-                        dbc.ModalFooter(
-                            dbc.Button("Save Changes", id="edge-save-btn", className="ms-auto", n_clicks=0))    
-                            ],
-                            id='edge-edit-modal',
-                            is_open=False),
-
-            # Modal for Donation info
-            dbc.Modal([dbc.ModalHeader(dbc.ModalTitle("Data Donation")),
-                       dbc.ModalBody("Here you can anonymously donate your map. Our aim is to continuously improve PsySys to provide scientifically backed content for our users. Therefore, we believe it is imporant to analyze PsySys results to better understand its clinical value and potential use. By choosing to donate your map, you agree that your anonymized data can be used for research purposes.", id = 'donation-info'),
-                       dbc.ModalFooter(
-                           dbc.Button("Yes, I want to donate", id="donation-agree", className="ms-auto", n_clicks=0))    
-                            ],id='donation-modal', is_open=False),
+            *map_tab_modals(),
 
             # Editing features
             html.Div([
-                html.Div([
-                    dbc.Input(id='edit-node', type='text', placeholder='Enter factor', style={'marginRight': '10px', 'borderRadius': '10px'}),
-                    dbc.Button("➕", id='btn-plus-node', color="primary", style={'marginRight': '5px'}),
-                    dbc.Button("➖", id='btn-minus-node', color="danger")
-                ], style={'display': 'flex', 'alignItems': 'right', 'marginBottom': '10px'}),
+                node_controls,
 
                 html.Div([
                     dcc.Dropdown(id='edit-edge', options=options_1, placeholder='Enter connection', multi=True, style={'width': '96%', 'borderRadius': '10px'}),
@@ -302,22 +349,32 @@ def create_mental_health_map_tab(edit_map_data, color_scheme_data, sizing_scheme
                 ], style={'display': 'flex', 'alignItems': 'center', 'marginBottom': '10px'}),
                 html.Br(),
 
-                html.Div([
-                    dbc.Checklist(options=[{"label": "Inspect", "value": 0}],
-                                 value=[1],
-                                 id="inspect-switch",
-                                 switch=True),
-                    dbc.Button("❔", id='help-inspect', color="light", style={'marginLeft': '10px'}),
-                    dbc.Modal([dbc.ModalHeader(dbc.ModalTitle("Inspection Mode")),
-                               dbc.ModalBody("Within this mode you can further inspect the consequences of a given factor. Just click on a factor to see its direct effects.", id='modal-inspect-body')
-                               ], id="modal-inspect"),
-                               ], style={'display': 'flex', 'alignItems': 'center', 'marginBottom': '10px'}), 
+                inspect_controls,
 
             ], style={'width': '300px', 'padding': '10px', 'marginTop': '80px'})
         
         ], style={'display': 'flex', 'height': '470px', 'alignItems': 'flex-start'}),
     ])
 
+# Function: Upload & delete buttons of the tracking tab, built once per process
+@functools.lru_cache(maxsize=None)
+def tracking_controls():
+    return html.Div([
+        dcc.Upload(id='upload-graph-tracking', children = dbc.Button("Upload Map", id='upload-map-btn'), max_size=max_upload_bytes,
+               style={'display': 'inline-block'}),
+        dbc.Button("🗑️", id='delete-tracking-map', color="danger", style={'marginLeft': '10px'}),
+        dbc.Checklist(options=[{"label": "Show changes", "value": 1}],
+                      value=[],
+                      id='track-diff-switch',
+                      switch=True,
+                      style={'marginLeft': '20px'}),
+        # Shown while an upload is processed in the background
+        dbc.Progress(id='track-upload-progress', value=0, label='', style={'display': 'none'}),
+        dbc.Button("Cancel", id='track-upload-cancel', color="secondary", size="sm", style={'display': 'none'}),
+        dbc.Alert(id='track-upload-error', color='danger', is_open=False, dismissable=True, duration=10000,
+                  style={'marginLeft': '10px', 'marginBottom': '0', 'padding': '6px 12px'}),
+               ], style={'display': 'flex', 'alignItems': 'center', 'marginBottom': '10px'})
+
 # Function: Create tracking tab
 def create_tracking_tab(track_data, ):
     return html.Div([
@@ -325,7 +382,7 @@ def create_tracking_tab(track_data, ):
         html.Div([cyto.Cytoscape(id='track-graph',
                                  elements=track_data['elements'],
                                  #layout={'name': 'cose', 'fit': True, 'padding': 10},
-                                 layout={'name': 'circle'},
+                                 layout=map_layout(track_data['elements']),
                                  zoom=1,
                                  pan={'x': 200, 'y': 200},
                                  stylesheet =track_data['stylesheet'],
@@ -343,14 +400,11 @@ def create_tracking_tab(track_data, ):
 
         html.Br(),
 
-        html.Div([
-            dcc.Upload(id='upload-graph-tracking', children = dbc.Button("Upload Map", id='upload-map-btn'),
-                   style={'display': 'inline-block'}),
-            dbc.Button("🗑️", id='delete-tracking-map', color="danger", style={'marginLeft': '10px'}),
-                   ], style={'display': 'flex', 'alignItems': 'center', 'marginBottom': '10px'})
+        tracking_controls()
     ])
 
-# Function: Create About us tab
+# Function: Create About us tab (static, built once per process, after the images are derived)
+@functools.lru_cache(maxsize=None)
 def create_about(app):
     return html.Div([
             html.Br(), html.Br(), html.Br(),
@@ -367,14 +421,14 @@ def create_about(app):
             html.Div([
             html.Div([
                 html.Div([
-                    html.Img(src=app.get_asset_url('DSC_4984.JPG'), style={'width': '160px', 'height': '160px', 'borderRadius': '50%', 'marginRight': '70px', 'marginLeft': '70px'}),
+                    responsive_image(app, 'DSC_4984.JPG', 160, style={'width': '160px', 'height': '160px', 'borderRadius': '50%', 'marginRight': '70px', 'marginLeft': '70px'}),
                     html.P("Emily Campos Sindermann", style={'textAlign': 'center', 'marginTop': '10px', 'marginRight': '70px', 'marginLeft': '70px'}),
                     html.P("Research Assistant (MSc)", style={'marginTop': '-15px', 'marginRight': '70px', 'fontStyle': 'italic', 'marginLeft': '70px'}),
                     html.P("Developer", style={'marginTop': '-15px', 'color': 'grey', 'marginRight': '70px', 'fontStyle': 'italic', 'marginLeft': '70px'}),
                 ], style={'display': 'inline-block', 'margin': '10px'}),
 
                 html.Div([
-                    html.Img(src=app.get_asset_url('profile_dennyborsboom.jpeg'), style={'width': '160px', 'height': '160px', 'borderRadius': '50%', 'marginRight': '90px'}),
+                    responsive_image(app, 'profile_dennyborsboom.jpeg', 160, style={'width': '160px', 'height': '160px', 'borderRadius': '50%', 'marginRight': '90px'}),
                     html.P("Denny Borsboom", style={'textAlign': 'center', 'marginTop': '10px', 'marginRight': '90px'}),
                     html.P("Professor at UvA", style={'marginTop': '-15px', 'marginRight': '90px', 'fontStyle': 'italic'}),
                     html.P("Supervisor", style={'marginTop': '-15px', 'color': 'grey', 'marginRight': '90px', 'fontStyle': 'italic'}),
@@ -383,21 +437,21 @@ def create_about(app):
 
             html.Div([
                 html.Div([
-                    html.Img(src=app.get_asset_url('profile_tessablanken.jpeg'), style={'width': '160px', 'height': '160px', 'borderRadius': '50%', 'marginRight': '70px'}),
+                    responsive_image(app, 'profile_tessablanken.jpeg', 160, style={'width': '160px', 'height': '160px', 'borderRadius': '50%', 'marginRight': '70px'}),
                     html.P("Tessa Blanken", style={'textAlign': 'center', 'marginTop': '10px', 'marginRight': '70px'}),
                     html.P("Assistant Professor at UvA", style={'marginTop': '-15px', 'marginRight': '70px', 'fontStyle': 'italic'}),
                     html.P("Collaborator", style={'marginTop': '-15px', 'color': 'grey', 'marginRight': '70px', 'fontStyle': 'italic'}),
                 ], style={'display': 'inline-block', 'margin': '10px'}),
 
                 html.Div([
-                    html.Img(src=app.get_asset_url('profile_larsklintwall.jpeg'), style={'width': '160px', 'height': '160px', 'borderRadius': '50%', 'marginRight': '70px'}),
+                    responsive_image(app, 'profile_larsklintwall.jpeg', 160, style={'width': '160px', 'height': '160px', 'borderRadius': '50%', 'marginRight': '70px'}),
                     html.P("Lars Klintwall", style={'textAlign': 'center', 'marginTop': '10px', 'marginRight': '70px'}),
                     html.P("Professor at Karolinska Institute", style={'marginTop': '-15px', 'marginRight': '70px', 'fontStyle': 'italic'}),
                     html.P("Collaborator", style={'marginTop': '-15px', 'color': 'grey', 'marginRight': '70px', 'fontStyle': 'italic'}),
                 ], style={'display': 'inline-block', 'margin': '10px'}),
 
                 html.Div([
-                    html.Img(src=app.get_asset_url('profile_julianburger.jpeg'), style={'width': '160px', 'height': '160px', 'borderRadius': '50%'}),
+                    responsive_image(app, 'profile_julianburger.jpeg', 160, style={'width': '160px', 'height': '160px', 'borderRadius': '50%'}),
                     html.P("Julian Burger", style={'textAlign': 'center', 'marginTop': '10px'}),
                     html.P("Postdoctorial Researcher at Yale", style={'marginTop': '-15px', 'fontStyle': 'italic'}),
                     html.P("Collaborator", style={'marginTop': '-15px', 'color': 'grey', 'fontStyle': 'italic'}),
@@ -407,6 +461,8 @@ def create_about(app):
             ])
             ])
 
+# Layout fragments cached per process (cleared by benchmarks/bench_fragments.py)
+layout_fragments = [step_scaffold, map_tab_buttons, map_tab_modals, map_tab_controls, tracking_controls, create_about]
 
 # Function: Initiate graph with elements
 def map_add_factors(session_data, value, severity_score):
@@ -415,132 +471,90 @@ def map_add_factors(session_data, value, severity_score):
 
     current_selection = value
     previous_selection = session_data['dropdowns']['initial-selection']['value'] or []
+    selected = set(current_selection)
+
+    graph = MapGraph.from_elements(session_data.get('elements', []))
 
-    # Initialize or clear elements list
-    session_data['elements'] = []
-
-    if current_selection:
-        # Add factor nodes
-        for factor in current_selection:
-            session_data['elements'].append({'data': {'id': factor, 'label': factor}})
-
-        # Identify factors that are no longer selected
-        removed_factors = [factor for factor in previous_selection if factor not in current_selection]
-
-        # Remove these factors from severity data (dictionary)
-        for factor in removed_factors:
-            if factor in severity_score:
-                del severity_score[factor]
-
-        # Update the edges
-        if 'edges' in session_data:
-            updated_edges = []
-            for edge in session_data['edges']:
-                source, target = edge.split('->')
-                if source in current_selection and target in current_selection:
-                    updated_edges.append(edge)
-                    # Adding edge elements
-                    session_data['elements'].append({'data': {'source': source, 'target': target, 'id': edge}})
-            session_data['edges'] = updated_edges
+    # Drop factors that are no longer selected (together with their edges)
+    for factor in list(graph.nodes):
+        if factor not in selected:
+            graph.remove_node(factor)
+
+    # Remove these factors from severity data (dictionary)
+    for factor in previous_selection:
+        if factor not in selected and factor in severity_score:
+            del severity_score[factor]
+
+    # Add factor nodes, keeping the order of the current selection
+    nodes = graph.nodes
+    graph.nodes = {}
+    for factor in current_selection:
+        graph.nodes[factor] = nodes.get(factor) or {'data': {'id': factor, 'label': factor}}
+
+    session_data['elements'] = graph.to_elements()
+    session_data['edges'] = graph.edge_keys()
 
     # Update the previous selection
     session_data['dropdowns']['initial-selection']['value'] = current_selection
 
     return session_data
 
-# Function: Add an edge 
-def add_edge(source, target, elements, existing_edges):
-        edge_key = f"{source}->{target}"
-        if edge_key not in existing_edges:
-            elements.append({'data': {'source': source, 'target': target}})
-            existing_edges.add(edge_key)
-            return elements, existing_edges
-        
-# Function: Delete an edge
-def delete_edge(source, target, elements, existing_edges):
-    # Remove the edge from elements
-    elements[:] = [element for element in elements if not ('source' in element.get('data', {}) and element['data']['source'] == source and 'target' in element.get('data', {}) and element['data']['target'] == target)]
-    
-    # Remove the edge from existing_edges if it's stored as a tuple (source, target)
-    existing_edges.discard((source, target))
+# Function: Edges along a chain (a -> b -> c)
+def chain_edges(chain):
+    chain = chain or []
+    return [(chain[i], chain[i + 1]) for i in range(len(chain) - 1)]
 
-# Function: Check if a factor exists in elements
-def factor_exists(factor, elements):
-    return any(element.get('data', {}).get('id') == factor for element in elements)
+# Function: Edges around a cycle (a -> b -> c -> a, or a self-loop for one factor)
+def cycle_edges(cycle):
+    cycle = cycle or []
+    return [(cycle[i], cycle[(i + 1) % len(cycle)]) for i in range(len(cycle))]
 
 # Function: Remove chain edges    
-def remove_chain_edges(chain, elements, existing_edges, cycles):
-    cycle_edges = set()
-    for cycle in cycles:
-        for i in range(len(cycle) - 1):
-            cycle_edges.add((cycle[i], cycle[i + 1]))
-
-    for i in range(len(chain) - 1):
-        edge = (chain[i], chain[i + 1])
-        # Only remove edge if it's not in any of the cycles
-        if edge not in cycle_edges:
-            elements[:] = [e for e in elements if not ('source' in e.get('data', {}) and e['data']['source'] == edge[0] and 'target' in e.get('data', {}) and e['data']['target'] == edge[1])]
-            existing_edges[:] = [e for e in existing_edges if not ('source' in e.get('data', {}) and e['data']['source'] == edge[0] and e['data']['target'] == edge[1])]
-
-# Function: Add an edge to the elements
-def add_edge_new(source, target, elements):
-    edge_data = {'data': {'source': source, 'target': target}}
-    if not any(e.get('data') == edge_data['data'] for e in elements):
-        elements.append(edge_data)
+def remove_chain_edges(chain, graph, cycles):
+    protected = {edge for cycle in cycles for edge in cycle_edges(cycle)}
+
+    # Only remove edge if it's not in any of the cycles
+    for source, target in chain_edges(chain):
+        if (source, target) not in protected:
+            graph.remove_edge(source, target)
 
 # Function: Add chain elements
 def map_add_chains(session_data, chain1, chain2):
-    map_elements = session_data['elements']
+    graph = MapGraph.from_elements(session_data['elements'])
     previous_chain1 = session_data['dropdowns']['chain1']['value'] or []
     previous_chain2 = session_data['dropdowns']['chain2']['value'] or []
     cycle1 = session_data['dropdowns']['cycle1']['value'] or []
     cycle2 = session_data['dropdowns']['cycle2']['value'] or []
 
-    existing_edges = session_data['edges']
-
     # Remove previous selections from elements
     for selection in [previous_chain1, previous_chain2]:
-        remove_chain_edges(selection, map_elements, existing_edges, [cycle1, cycle2])
+        remove_chain_edges(selection, graph, [cycle1, cycle2])
 
     # Process chain1 and chain2
     for chain in [chain1, chain2]:
-        if chain is not None:
-            for i in range(len(chain) - 1):
-                source, target = chain[i], chain[i + 1]
-                if factor_exists(source, map_elements) and factor_exists(target, map_elements):
-                    add_edge_new(source, target, map_elements)
+        for source, target in chain_edges(chain):
+            if graph.has_node(source) and graph.has_node(target):
+                graph.add_edge(source, target)
 
-    session_data['elements'] = map_elements
+    session_data['elements'] = graph.to_elements()
     session_data['dropdowns']['chain1']['value'] = chain1
     session_data['dropdowns']['chain2']['value'] = chain2
-    session_data['edges'] = existing_edges
+    session_data['edges'] = graph.edge_keys()
 
     return session_data
 
 # Function: Remove cycle edges
-def remove_cycle_edges(cycle, elements, existing_edges, chains):
-    # Gather all edges from chain1 and chain2
-    chain_edges = set()
-    for chain in chains:
-        if chain:
-            for i in range(len(chain) - 1):
-                chain_edges.add((chain[i], chain[i + 1]))
-
-    # Remove edges from the cycle if they are not in the chains
-    for i in range(len(cycle)):
-        source = cycle[i]
-        target = cycle[0] if i == len(cycle) - 1 else cycle[i + 1]
-        edge = (source, target)
-
-        # Only remove edge if it's not in chain1 or chain2
-        if edge not in chain_edges:
-            elements[:] = [e for e in elements if not ('source' in e.get('data', {}) and e['data']['source'] == source and 'target' in e.get('data', {}) and e['data']['target'] == target)]
-            existing_edges.discard(edge)
+def remove_cycle_edges(cycle, graph, chains):
+    protected = {edge for chain in chains for edge in chain_edges(chain)}
+
+    # Only remove edge if it's not in chain1 or chain2
+    for source, target in cycle_edges(cycle):
+        if (source, target) not in protected:
+            graph.remove_edge(source, target)
 
 # Function: Add cycles
 def map_add_cycles(session_data, cycle1, cycle2):
-    map_elements = session_data['elements']
-    existing_edges = set(session_data['edges'])
+    graph = MapGraph.from_elements(session_data['elements'])
 
     # Get previous cycles
     previous_cycle1 = session_data['dropdowns']['cycle1']['value'] or []
@@ -551,25 +565,16 @@ def map_add_cycles(session_data, cycle1, cycle2):
 
     # Remove previous cycles
     for cycle in [previous_cycle1, previous_cycle2]:
-        #remove_cycle_edges(cycle, map_elements, existing_edges)
-        remove_cycle_edges(cycle, map_elements, existing_edges, [chain1, chain2])
+        remove_cycle_edges(cycle, graph, [chain1, chain2])
 
     # Add new cycles
     for cycle in [cycle1, cycle2]:
-        if cycle is not None:
-            if len(cycle) == 1:
-                element = cycle[0]
-                if factor_exists(element, map_elements):
-                    add_edge_new(element, element, map_elements)
-            elif len(cycle) > 1:
-                for i in range(len(cycle)):
-                    source = cycle[i]
-                    target = cycle[0] if i == len(cycle) - 1 else cycle[i + 1]
-                    if factor_exists(source, map_elements) and factor_exists(target, map_elements):
-                        add_edge_new(source, target, map_elements)
-
-    session_data['elements'] = map_elements
-    session_data['edges'] = list(existing_edges)
+        for source, target in cycle_edges(cycle):
+            if graph.has_node(source) and graph.has_node(target):
+                graph.add_edge(source, target)
+
+    session_data['elements'] = graph.to_elements()
+    session_data['edges'] = graph.edge_keys()
     session_data['dropdowns']['cycle1']['value'] = cycle1
     session_data['dropdowns']['cycle2']['value'] = cycle2
     
@@ -589,6 +594,19 @@ def get_color(value):
     g = int(216 * (1 - value))
     return r, g, b
 
+# Centrality schemes & the metric they are based on
+centrality_metrics = {"Out-degree": 'out-degree', "In-degree": 'in-degree', "Out-/In-degree ratio": 'out-in-ratio'}
+
+# Function: Values of a centrality scheme & their range ({node: value}, low, high)
+# A map being edited carries degree counters (edit-map-data['degrees']), so nothing is recounted.
+def centrality_values(chosen_scheme, elements, degrees=None):
+    metric = centrality_metrics[chosen_scheme]
+    if degrees:
+        counter = DegreeCounter.from_store(degrees)
+        return (counter.values(metric), *counter.range(metric))
+    values = get_metric(elements, metric)
+    return values, min(values.values(), default=0), max(values.values(), default=1)
+
 # Function: Calculate degree centrality
 def calculate_degree_centrality(elements, degrees):
     for element in elements:
@@ -602,19 +620,11 @@ def calculate_degree_centrality(elements, degrees):
 
 # Function: Apply uniform color
 def apply_uniform_color_styles(stylesheet):
-    # Define the uniform color style for nodes
-    uniform_color_style = {
-        'selector': 'node',
-        'style': {
-            'background-color': 'blue',
-            'label': 'data(label)'  # Ensure labels are maintained
-        }
-    }
-    # Remove any existing node color styles
-    stylesheet = [style for style in stylesheet if 'background-color' not in style.get('style', {})]
-    # Append the uniform color style
-    stylesheet.append(uniform_color_style)
-    return stylesheet
+    sheet = StyleSheet(stylesheet)
+    # Remove any existing node color styles & set the uniform color
+    sheet.drop('background-color', kind='node')
+    sheet.set('node', {'background-color': 'blue', 'label': 'data(label)'})  # Ensure labels are maintained
+    return sheet.to_list()
 
 # Function: Apply severity color
 def apply_severity_color_styles(type, stylesheet, severity_scores, default_style):
@@ -627,19 +637,15 @@ def apply_severity_color_styles(type, stylesheet, severity_scores, default_style
             max_severity = 10
             min_severity = 1
 
+        sheet = StyleSheet(stylesheet).drop('background-color', kind='node')
+
         # Normalize and apply color based on severity
         for node_id, severity in severity_scores.items():
-            normalized_severity = (severity - min_severity) / (max_severity - min_severity)
-            r, g, b = get_color(normalized_severity)  # Assuming get_color is defined as before
-
-            severity_style = {
-                'selector': f'node[id="{node_id}"]',
-                'style': {
-                    'background-color': f'rgb({r},{g},{b})'
-                }
-            }
-            # Append the style for this node
-            stylesheet.append(severity_style)
+            normalized_severity = normalize(severity, max_severity, min_severity)
+            r, g, b = get_color(normalized_severity)
+            sheet.set(node_selector(node_id), {'background-color': f'rgb({r},{g},{b})'})
+
+        stylesheet = sheet.to_list()
 
     elif severity_scores == {}:
         stylesheet = default_style
@@ -647,64 +653,32 @@ def apply_severity_color_styles(type, stylesheet, severity_scores, default_style
     return stylesheet
 
 # Function: Apply degree centrality color
-def apply_centrality_color_styles(type, stylesheet, elements):
-    degrees = {element['data']['id']: {'out': 0, 'in': 0} for element in elements 
-               if 'id' in element['data']}
-    
-    # Calculate in-degree and out-degree
-    elements, degrees = calculate_degree_centrality(elements, degrees)
-
-    # Compute centrality based on the selected type
-    computed_degrees = {}
-    for id, degree_counts in degrees.items():
-        if type == "Out-degree":
-            computed_degrees[id] = degree_counts['out']
-        elif type == "In-degree":
-            computed_degrees[id] = degree_counts['in']
-        elif type == "Out-/In-degree ratio":
-            if degree_counts['in'] != 0:
-                computed_degrees[id] = degree_counts['out'] / degree_counts['in']
-            else:
-                computed_degrees[id] = 0  # or some other default value you deem appropriate
-    if computed_degrees:
-        min_degree = min(computed_degrees.values())
-        max_degree = max(computed_degrees.values())
-    else:
-        min_degree = 0
-        max_degree = 1
+def apply_centrality_color_styles(type, stylesheet, elements, degrees=None):
+    # Centrality based on the selected type (shared, memoized per map version)
+    computed_degrees, min_degree, max_degree = centrality_values(type, elements, degrees)
 
-    for node_id, degree in computed_degrees.items():
-        if max_degree != min_degree:
-            # Normalized degree value when max and min degrees are different
-            normalized_degree = (degree - min_degree) / (max_degree - min_degree)
-        else:
-            normalized_degree = 0.5 
+    sheet = StyleSheet(stylesheet).drop('background-color', kind='node')
 
+    for node_id, degree in computed_degrees.items():
+        normalized_degree = normalize(degree, max_degree, min_degree)
         r, g, b = get_color(normalized_degree) 
+        sheet.set(node_selector(node_id), {'background-color': f'rgb({r},{g},{b})'})
 
-        degree_style = {
-            'selector': f'node[id="{node_id}"]',
-            'style': {
-                'background-color': f'rgb({r},{g},{b})'
-            }
-        }
-        stylesheet.append(degree_style)
-
-    return stylesheet
+    return sheet.to_list()
 
 # Function: Set color scheme
 def color_scheme(chosen_scheme, graph_data, severity_scores):
+    if quantized_styles:
+        return quantized_scheme('color', chosen_scheme, graph_data, severity_scores)
+
     elements = graph_data['elements']
-    stylesheet = graph_data['stylesheet']
-    default_style = [{'selector': 'node','style': {'background-color': 'blue', 'label': 'data(label)'}},
-                     {'selector': 'edge','style': {'curve-style': 'bezier', 'target-arrow-shape': 'triangle'}}]
-    
+    default_style = StyleSheet(default_stylesheet).to_list()
     if chosen_scheme == "Uniform":
         graph_data['stylesheet'] = apply_uniform_color_styles(graph_data['stylesheet'])
     elif chosen_scheme in ["Severity", "Severity (abs)"]:
         graph_data['stylesheet'] = apply_severity_color_styles(chosen_scheme, graph_data['stylesheet'], severity_scores, default_style)
     elif chosen_scheme in ["Out-degree", "In-degree", "Out-/In-degree ratio"]:
-        graph_data['stylesheet'] = apply_centrality_color_styles(chosen_scheme, graph_data['stylesheet'], elements)
+        graph_data['stylesheet'] = apply_centrality_color_styles(chosen_scheme, graph_data['stylesheet'], elements, graph_data.get('degrees'))
     
     return graph_data
 
@@ -718,18 +692,137 @@ def normalize_size(value, max_value, min_value, min_size, max_size):
     normalized = (value - min_value) / (max_value - min_value)
     return normalized * (max_size - min_size) + min_size
 
+# Quantized schemes (PSYSYS_QUANTIZED_STYLES=1): values are binned into a fixed palette and
+# each node carries a 'color-k' / 'size-k' class, so the stylesheet holds the same 20 class
+# rules whatever the size of the map and a scheme switch only changes element classes.
+quantized_styles = os.environ.get('PSYSYS_QUANTIZED_STYLES', '0') == '1'
+color_bins = 10
+size_bins = 10
+min_node_size, max_node_size = 10, 50
+
+# Lookup tables: color & size at the middle of each bin
+color_table = [get_color((k + 0.5) / color_bins) for k in range(color_bins)]
+size_table = [round(min_node_size + (k + 0.5) / size_bins * (max_node_size - min_node_size), 1) for k in range(size_bins)]
+quantized_rules = ([{'selector': f'node.color-{k}', 'style': {'background-color': f'rgb({r},{g},{b})'}}
+                    for k, (r, g, b) in enumerate(color_table)] +
+                   [{'selector': f'node.size-{k}', 'style': {'width': float(size), 'height': float(size)}}
+                    for k, size in enumerate(size_table)])
+
+# Function: Bin (0 to bins - 1) of each value between low & high (the middle bin if they are equal)
+def value_bins(values, low, high, bins):
+    import numpy as np  # loaded with the first quantized scheme
+    values = np.asarray(values, dtype=float)
+    scaled = np.full(values.shape, 0.5) if high == low else (values - low) / (high - low)
+    return np.clip((scaled * bins).astype(int), 0, bins - 1)
+
+# Function: Classes of an element with its bin class of one kind replaced (removed if k is None)
+def with_bin_class(classes, kind, k):
+    names = [c for c in (classes or '').split() if not c.startswith(f'{kind}-')]
+    if k is not None:
+        names.append(f'{kind}-{k}')
+    return ' '.join(names)
+
+# Function: Set the bin classes of one kind ('color' or 'size') on the nodes with a value
+# Nodes without a value lose their class of that kind; other classes are kept.
+def apply_bin_classes(kind, elements, values, low, high, bins):
+    nodes = [e['data']['id'] for e in elements if 'source' not in e['data'] and e['data'].get('id') in values]
+    binned = dict(zip(nodes, value_bins([values[node] for node in nodes], low, high, bins).tolist()))
+    updated = []
+    for element in elements:
+        if 'source' in element['data']:
+            updated.append(element)
+            continue
+        classes = with_bin_class(element.get('classes'), kind, binned.get(element['data'].get('id')))
+        if classes != element.get('classes', ''):
+            element = dict(element, classes=classes)
+        updated.append(element)
+    return updated
+
+# Function: Stylesheet with the class rules (kept after the base rules) & no per-node rules of a kind
+def quantized_stylesheet(stylesheet, *props):
+    sheet = StyleSheet(stylesheet).drop(*props, kind='node')
+    for rule in quantized_rules:
+        sheet.set(rule['selector'], rule['style'])
+    return sheet.to_list()
+
+# Function: Scheme values & their range ({node: value}, low, high), or None to reset the map
+def scheme_values(chosen_scheme, elements, severity_scores, degrees=None):
+    if chosen_scheme in ["Severity", "Severity (abs)"]:
+        if not severity_scores or not all(isinstance(score, (int, float)) for score in severity_scores.values()):
+            return None
+        if chosen_scheme == "Severity":
+            return severity_scores, min(severity_scores.values()), max(severity_scores.values())
+        return severity_scores, 1, 10
+    return centrality_values(chosen_scheme, elements, degrees)
+
+# Function: Quantized color or sizing scheme (elements get bin classes)
+def quantized_scheme(kind, chosen_scheme, graph_data, severity_scores):
+    props = ('background-color',) if kind == 'color' else ('width', 'height')
+    bins = color_bins if kind == 'color' else size_bins
+    if chosen_scheme == "Uniform":
+        graph_data['elements'] = apply_bin_classes(kind, graph_data['elements'], {}, 0, 1, bins)
+        uniform = apply_uniform_color_styles if kind == 'color' else apply_uniform_size_styles
+        graph_data['stylesheet'] = quantized_stylesheet(uniform(graph_data['stylesheet']))
+        return graph_data
+    if chosen_scheme not in ["Severity", "Severity (abs)"] + list(centrality_metrics):
+        return graph_data
+    scheme = scheme_values(chosen_scheme, graph_data['elements'], severity_scores, graph_data.get('degrees'))
+    if scheme is None:
+        if severity_scores == {}:
+            graph_data['elements'] = apply_bin_classes(kind, graph_data['elements'], {}, 0, 1, bins)
+        return graph_data
+    graph_data['elements'] = apply_bin_classes(kind, graph_data['elements'], *scheme, bins)
+    graph_data['stylesheet'] = quantized_stylesheet(graph_data['stylesheet'], *props)
+    return graph_data
+
+# Function: Styles of some nodes under a centrality scheme, from the degree counters
+# Returns {node: style}, or {node: bin} for quantized schemes; used to restyle only the
+# nodes an edit changed (while the metric's range stays the same).
+def centrality_node_styles(kind, chosen_scheme, counter, nodes):
+    metric = centrality_metrics[chosen_scheme]
+    low, high = counter.range(metric)
+    nodes = [node for node in nodes if node in counter]
+    values = [counter.value(metric, node) for node in nodes]
+    if quantized_styles:
+        return dict(zip(nodes, value_bins(values, low, high, color_bins if kind == 'color' else size_bins).tolist()))
+    if kind == 'color':
+        return {node: {'background-color': 'rgb({},{},{})'.format(*get_color(normalize(value, high, low)))}
+                for node, value in zip(nodes, values)}
+    return {node: {'width': size, 'height': size} for node, size in
+            ((node, normalize_size(value, high, low, min_node_size, max_node_size)) for node, value in zip(nodes, values))}
+
+# Function: Restyle the nodes an edit changed under the centrality schemes shown
+# schemes is {'color': scheme, 'size': scheme}, ranges the counter's ranges before the edit;
+# every node is restyled if the range of a shown metric changed. Returns the new stylesheet
+# (None if unchanged) & the new classes of nodes ({node: classes}, quantized schemes).
+def refresh_centrality(schemes, counter, ranges, stylesheet, nodes):
+    shown = {kind: scheme for kind, scheme in schemes.items() if scheme in centrality_metrics}
+    if not shown:
+        return None, {}
+    changed = counter.changed
+    if any(counter.range(centrality_metrics[scheme]) != ranges[centrality_metrics[scheme]] for scheme in shown.values()):
+        changed = counter.nodes
+    if quantized_styles:
+        classes = {node: nodes[node].get('classes', '') for node in changed if node in nodes}
+        for kind, scheme in shown.items():
+            for node, k in centrality_node_styles(kind, scheme, counter, classes).items():
+                classes[node] = with_bin_class(classes[node], kind, k)
+        return None, {node: value for node, value in classes.items() if value != nodes[node].get('classes', '')}
+    sheet = StyleSheet(stylesheet)
+    for kind, scheme in shown.items():
+        for node in counter.removed - set(counter.nodes):
+            sheet.drop(*(('background-color',) if kind == 'color' else ('width', 'height')), selector=node_selector(node))
+        for node, style in centrality_node_styles(kind, scheme, counter, changed).items():
+            sheet.set(node_selector(node), style)
+    return sheet.to_list(), {}
+
 # Function: Apply uniform node sizing 
 def apply_uniform_size_styles(stylesheet):
-    # Define the uniform size style
-    uniform_size_style = {
-        'selector': 'node',
-        'style': {'width': 25, 'height': 25}  # Example sizes
-    }
-    # Apply this style to the stylesheet
-    stylesheet = [style for style in stylesheet if 'width' not in style.get('style', {})]
-    stylesheet.append(uniform_size_style)
-
-    return stylesheet
+    sheet = StyleSheet(stylesheet)
+    # Remove any existing node sizes & set the uniform size
+    sheet.drop('width', 'height', kind='node')
+    sheet.set('node', {'width': 25, 'height': 25})
+    return sheet.to_list()
 
 # Function: Apply severity node sizing
 def apply_severity_size_styles(type, stylesheet, severity_scores, default_style):
@@ -737,7 +830,6 @@ def apply_severity_size_styles(type, stylesheet, severity_scores, default_style)
     max_size = 50
     min_size = 10
 
-    #print(severity_scores.items())
     if severity_scores and all(isinstance(score, (int, float)) for score in severity_scores.values()):
         if type == "Severity":
             max_severity = max(severity_scores.values())
@@ -746,102 +838,67 @@ def apply_severity_size_styles(type, stylesheet, severity_scores, default_style)
             max_severity = 10
             min_severity = 1
 
-        # Normalize and apply color based on severity
+        sheet = StyleSheet(stylesheet).drop('width', 'height', kind='node')
+
+        # Normalize and apply size based on severity
         for node_id, severity in severity_scores.items():
             size = normalize_size(severity, max_severity, min_severity, min_size, max_size)
+            sheet.set(node_selector(node_id), {'width': size, 'height': size})
 
-            severity_style = {
-                'selector': f'node[id="{node_id}"]',
-                'style': {'width': size,'height': size}
-                }
-            
-            # Append the style for this node
-            stylesheet.append(severity_style)
+        stylesheet = sheet.to_list()
 
     elif severity_scores == {}:
         stylesheet = default_style
-        #return dash.no_update
 
     return stylesheet
 
 # Function: Apply degree centraliy node sizing
-def apply_centrality_size_styles(type, stylesheet, elements):
+def apply_centrality_size_styles(type, stylesheet, elements, degrees=None):
     max_size = 50
     min_size = 10
 
-    degrees = {element['data']['id']: {'out': 0, 'in': 0} for element in elements 
-               if 'id' in element['data']}
-    
-    # Calculate in-degree and out-degree
-    elements, degrees = calculate_degree_centrality(elements, degrees)
-
-    # Compute centrality based on the selected type
-    computed_degrees = {}
-    for id, degree_counts in degrees.items():
-        if type == "Out-degree":
-            computed_degrees[id] = degree_counts['out']
-        elif type == "In-degree":
-            computed_degrees[id] = degree_counts['in']
-        elif type == "Out-/In-degree ratio":
-            if degree_counts['in'] != 0:
-                computed_degrees[id] = degree_counts['out'] / degree_counts['in']
-            else:
-                computed_degrees[id] = 0  # or some other default value you deem appropriate
-
-    if computed_degrees:
-        min_degree = min(computed_degrees.values())
-        max_degree = max(computed_degrees.values())
-    else:
-        min_degree = 0
-        max_degree = 1
+    # Centrality based on the selected type (shared, memoized per map version)
+    computed_degrees, min_degree, max_degree = centrality_values(type, elements, degrees)
+
+    sheet = StyleSheet(stylesheet).drop('width', 'height', kind='node')
 
     for node_id, degree in computed_degrees.items():
         size = normalize_size(degree, max_degree, min_degree, min_size, max_size)
+        sheet.set(node_selector(node_id), {'width': size, 'height': size})
 
-        degree_style = {
-            'selector': f'node[id="{node_id}"]',
-            'style': {'width': size, 'height': size}
-        }
-
-        # Append the style for this node
-        stylesheet.append(degree_style)
-
-    return stylesheet
+    return sheet.to_list()
 
 # Function: Set node sizing scheme 
 def node_sizing(chosen_scheme, graph_data, severity_scores):
+    if quantized_styles:
+        return quantized_scheme('size', chosen_scheme, graph_data, severity_scores)
+
     elements = graph_data['elements']
-    stylesheet = graph_data['stylesheet']
-    default_style = [{'selector': 'node','style': {'background-color': 'blue', 'label': 'data(label)'}},
-                     {'selector': 'edge','style': {'curve-style': 'bezier', 'target-arrow-shape': 'triangle'}}]
-    
+    default_style = StyleSheet(default_stylesheet).to_list()
     if chosen_scheme == "Uniform":
         graph_data['stylesheet'] = apply_uniform_size_styles(graph_data['stylesheet'])
     elif chosen_scheme in ["Severity", "Severity (abs)"]:
         graph_data['stylesheet'] = apply_severity_size_styles(chosen_scheme, graph_data['stylesheet'], severity_scores, default_style)
     elif chosen_scheme in ["Out-degree", "In-degree", "Out-/In-degree ratio"]:
-        graph_data['stylesheet'] = apply_centrality_size_styles(chosen_scheme, graph_data['stylesheet'], elements)
+        graph_data['stylesheet'] = apply_centrality_size_styles(chosen_scheme, graph_data['stylesheet'], elements, graph_data.get('degrees'))
     
     return graph_data
 
 # Function: Color most influential fator in graph 
 def color_target(graph_data):
     influential_factor = graph_data['dropdowns']['target']['value']
-    stylesheet = graph_data['stylesheet']
+    sheet = StyleSheet(graph_data['stylesheet']).drop('border-color', 'border-width', kind='node')
 
     if influential_factor:
-        stylesheet.append({'selector': f'node[id = "{influential_factor[0]}"]',
-                           'style': {'border-color': 'red','border-width': '2px'}})
+        sheet.set(node_selector(influential_factor[0]), {'border-color': 'red', 'border-width': '2px'})
         
-    graph_data['stylesheet'] = stylesheet
+    graph_data['stylesheet'] = sheet.to_list()
     return graph_data
 
 # Function: Reset target color
 def reset_target(graph_data):
-    stylesheet = graph_data['stylesheet']
-    new_stylesheet = [style for style in stylesheet 
-                      if not (style.get('style', {}).get('border-color') == 'red')]
-    graph_data['stylesheet'] = new_stylesheet
+    sheet = StyleSheet(graph_data['stylesheet']).drop_value('border-color', 'red')
+    graph_data['stylesheet'] = sheet.drop('border-width', kind='node').to_list()
     return graph_data
 
 # Function: Color graph (out-degree centrality, target node)
@@ -857,11 +914,4 @@ def graph_color(session_data, severity_scores):
 # Function: Updates edge styles based on strength
 def update_edge_opacity(edge_id, strength, stylesheet):
     opacity = strength / 5  # Adjust opacity based on strength
-    tapped_edge_style = {
-        'selector': f'edge[id="{edge_id}"]',
-        'style': {'opacity': opacity}
-    }
-    # Create a new stylesheet with updated style for the edge
-    new_stylesheet = [rule for rule in stylesheet if rule['selector'] != f'edge[id="{edge_id}"]']
-    new_stylesheet.append(tapped_edge_style)
-    return new_stylesheet
+    return StyleSheet(stylesheet).set(edge_selector(edge_id), {'opacity': opacity}).to_list()
@@ -0,0 +1,118 @@
+# Function: Stable id of the edge from source to target (same form as session-data['edges'])
+def edge_id(source, target):
+    return f"{source}->{target}"
+
+# Class: Indexed mental-health map
+# Holds the nodes and edges of a Cytoscape element list in dictionaries, with
+# successor/predecessor sets per node, so membership checks are O(1) and node
+# or edge edits touch only the affected adjacency instead of the whole list.
+class MapGraph:
+
+    def __init__(self):
+        self.nodes = {}         # node id -> Cytoscape element
+        self.edges = {}         # (source, target) -> Cytoscape element
+        self.successors = {}    # node id -> set of targets
+        self.predecessors = {}  # node id -> set of sources
+        self.labels = {}        # node id -> label shown (ids never change, renames only touch this)
+        self.index = {}         # node id -> position in the element list it was loaded from
+        self.node_index = {}    # node id -> position among the nodes (the edge dropdown's options)
+
+    # Load from a Cytoscape element list
+    @classmethod
+    def from_elements(cls, elements):
+        graph = cls()
+        for i, element in enumerate(elements or []):
+            data = element.get('data', {})
+            if 'source' in data and 'target' in data:
+                graph.edges.setdefault((data['source'], data['target']), element)
+                graph.successors.setdefault(data['source'], set()).add(data['target'])
+                graph.predecessors.setdefault(data['target'], set()).add(data['source'])
+            elif 'id' in data and data['id'] not in graph.nodes:
+                graph.nodes[data['id']] = element
+                graph.labels[data['id']] = data.get('label', data['id'])
+                graph.index[data['id']] = i
+                graph.node_index[data['id']] = len(graph.node_index)
+        return graph
+
+    # Save to a Cytoscape element list (nodes first, then edges)
+    def to_elements(self):
+        return list(self.nodes.values()) + list(self.edges.values())
+
+    # Edge keys in the 'source->target' form stored in session-data['edges']
+    def edge_keys(self):
+        return [edge_id(source, target) for source, target in self.edges]
+
+    # Edge list in the {'data': {'source', 'target'}} form stored in edit-map-data['edges']
+    def edge_list(self):
+        return [{'data': {'source': source, 'target': target}} for source, target in self.edges]
+
+    def __contains__(self, node_id):
+        return node_id in self.nodes
+
+    def has_node(self, node_id):
+        return node_id in self.nodes
+
+    def has_edge(self, source, target):
+        return (source, target) in self.edges
+
+    def add_node(self, node_id, label=None):
+        if node_id not in self.nodes:
+            label = node_id if label is None else label
+            self.nodes[node_id] = {'data': {'id': node_id, 'label': label}}
+            self.labels[node_id] = label
+            self.node_index[node_id] = len(self.nodes) - 1
+            return True
+        return False
+
+    # Id for a new node named name: the name, or 'name #2', 'name #3', ... if a node already has it
+    def new_node_id(self, name):
+        node_id, k = name, 1
+        while node_id in self.nodes:
+            k += 1
+            node_id = f"{name} #{k}"
+        return node_id
+
+    # Node id of a factor typed by its label, or else by its id (None if there is none)
+    def find(self, name):
+        node_id = next((node_id for node_id, label in self.labels.items() if label == name), None)
+        return node_id if node_id is not None or name not in self.nodes else name
+
+    # Show a node under a new label; its id (and everything keyed by it) stays the same
+    def rename(self, node_id, label):
+        self.nodes[node_id]['data']['label'] = label
+        self.labels[node_id] = label
+
+    # Remove a node together with its incident edges, O(degree)
+    def remove_node(self, node_id):
+        if self.nodes.pop(node_id, None) is None:
+            return False
+        self.labels.pop(node_id, None)
+        self.node_index.pop(node_id, None)  # later nodes keep their loaded position, like index
+        for target in self.successors.pop(node_id, set()):
+            self.edges.pop((node_id, target), None)
+            self.predecessors.get(target, set()).discard(node_id)
+        for source in self.predecessors.pop(node_id, set()):
+            self.edges.pop((source, node_id), None)
+            self.successors.get(source, set()).discard(node_id)
+        return True
+
+    def add_edge(self, source, target, element=None):
+        if (source, target) in self.edges:
+            return False
+        self.edges[(source, target)] = element or {'data': {'id': edge_id(source, target), 'source': source, 'target': target}}
+        self.successors.setdefault(source, set()).add(target)
+        self.predecessors.setdefault(target, set()).add(source)
+        return True
+
+    def remove_edge(self, source, target):
+        if self.edges.pop((source, target), None) is None:
+            return False
+        self.successors.get(source, set()).discard(target)
+        self.predecessors.get(target, set()).discard(source)
+        return True
+
+    def out_edges(self, node_id):
+        return [(node_id, target) for target in self.successors.get(node_id, ())]
+
+    def in_edges(self, node_id):
+        return [(source, node_id) for source in self.predecessors.get(node_id, ())]
@@ -0,0 +1,79 @@
+# Imports
+from collections import OrderedDict
+from metrics import map_structure, structure_hash
+from styles import node_selector, source_selector, target_selector
+
+# Opacity of everything outside the highlighted neighbourhood
+dim_opacity = '0.2'
+
+# Number of map versions (indexes) & of highlight overlays kept in memory
+index_cache_size = 128
+overlay_cache_size = 1024
+_indexes = OrderedDict()
+_overlays = OrderedDict()
+
+# Function: Insert into an LRU cache
+def _remember(cache, key, value, size):
+    cache[key] = value
+    if len(cache) > size:
+        cache.popitem(last=False)
+    return value
+
+# Function: Neighbourhood index of a map (successors & predecessors per node), memoized per map structure
+# Returns (map version, index); the version is the structure hash shared with metrics.py.
+def neighbourhood_index(elements):
+    nodes, edges = map_structure(elements)
+    version = structure_hash(nodes, edges)
+    index = _indexes.get(version)
+    if index is not None:
+        _indexes.move_to_end(version)
+        return version, index
+    successors = {node: [] for node in nodes}
+    predecessors = {node: [] for node in nodes}
+    for source, target in dict.fromkeys(edges):
+        successors[source].append(target)
+        predecessors[target].append(source)
+    index = {'successors': successors, 'predecessors': predecessors}
+    return version, _remember(_indexes, version, index, index_cache_size)
+
+# Function: Nodes reachable from a node within k hops, layer by layer
+# direction 'successors' follows effects downstream, 'predecessors' causes upstream.
+def neighbourhood(index, node_id, hops=1, direction='successors'):
+    links = index[direction]
+    seen = {node_id}
+    layers = [[node_id]]
+    for _ in range(hops):
+        layer = [n for node in layers[-1] for n in links[node] if n not in seen and not seen.add(n)]
+        if not layer:
+            break
+        layers.append(layer)
+    return layers
+
+# Function: Stylesheet rules highlighting the neighbourhood of a node
+# The rules are appended after the map's stylesheet, so they override it
+# without changing it. Overlays are cached per (map version, node, hops, direction).
+def highlight_overlay(elements, node_id, hops=1, direction='successors'):
+    version, index = neighbourhood_index(elements)
+    if node_id not in index['successors']:
+        return []
+    key = (version, node_id, hops, direction)
+    overlay = _overlays.get(key)
+    if overlay is not None:
+        _overlays.move_to_end(key)
+        return overlay
+
+    layers = neighbourhood(index, node_id, hops, direction)
+    nodes = [node for layer in layers for node in layer]
+    # Edges followed: leaving (downstream) or entering (upstream) every node but the outermost layer
+    selector = source_selector if direction == 'successors' else target_selector
+    links = index[direction]
+    followed = [selector(node) for layer in layers[:hops] for node in layer if links[node]]
+    overlay = [{'selector': 'node, edge', 'style': {'opacity': dim_opacity}},
+               {'selector': ','.join(node_selector(node) for node in nodes), 'style': {'opacity': '1'}}]
+    if followed:
+        overlay.append({'selector': ','.join(followed), 'style': {'opacity': '1'}})
+    return _remember(_overlays, key, overlay, overlay_cache_size)
+
+# Function: Map stylesheet with the neighbourhood of a node highlighted (the base list is not modified)
+def highlight_stylesheet(stylesheet, elements, node_id, hops=1, direction='successors'):
+    return list(stylesheet) + highlight_overlay(elements, node_id, hops, direction)
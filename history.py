@@ -0,0 +1,148 @@
+# Imports
+from mapdata import normalize_map
+
+# Store a full snapshot (checkpoint) after this many deltas
+checkpoint_every = 8
+
+# Function: Snapshot state of a map ({'nodes': {id: label}, 'edges': {(source, target): edge id}, 'severity': {}})
+def snapshot_state(elements, severity_scores=None):
+    normalized = normalize_map({'elements': elements, 'severity-scores': severity_scores or {}})
+    return {
+        'nodes': {node: normalized['labels'][node] for node in normalized['nodes']},
+        'edges': dict(zip(normalized['edges'], normalized['edge-ids'])),
+        'severity': normalized['severity']
+    }
+
+# Function: Cytoscape elements of a snapshot state
+def state_elements(state):
+    elements = [{'data': {'id': node, 'label': label}} for node, label in state['nodes'].items()]
+    for (source, target), edge_id in state['edges'].items():
+        data = {'source': source, 'target': target}
+        if edge_id is not None:
+            data['id'] = edge_id
+        elements.append({'data': data})
+    return elements
+
+# Function: Structural delta turning state a into state b (added/removed nodes & edges, severity changes)
+def state_delta(a, b):
+    delta = {
+        'add-nodes': {node: label for node, label in b['nodes'].items() if a['nodes'].get(node) != label},
+        'remove-nodes': [node for node in a['nodes'] if node not in b['nodes']],
+        'add-edges': [[s, t, edge_id] for (s, t), edge_id in b['edges'].items() if (s, t) not in a['edges'] or a['edges'][(s, t)] != edge_id],
+        'remove-edges': [[s, t] for (s, t) in a['edges'] if (s, t) not in b['edges']],
+        'severity': {node: value for node, value in b['severity'].items() if a['severity'].get(node) != value},
+        'remove-severity': [node for node in a['severity'] if node not in b['severity']]
+    }
+    return {key: value for key, value in delta.items() if value}
+
+# Function: Apply a delta to a state (returns a new state)
+def apply_delta(state, delta):
+    nodes, edges, severity = dict(state['nodes']), dict(state['edges']), dict(state['severity'])
+    for node in delta.get('remove-nodes', []):
+        del nodes[node]
+    for s, t in delta.get('remove-edges', []):
+        del edges[(s, t)]
+    for node in delta.get('remove-severity', []):
+        del severity[node]
+    nodes.update(delta.get('add-nodes', {}))
+    edges.update({(s, t): edge_id for s, t, edge_id in delta.get('add-edges', [])})
+    severity.update(delta.get('severity', {}))
+    return {'nodes': nodes, 'edges': edges, 'severity': severity}
+
+# Function: JSON form of a full state (edge keys are not strings)
+def _dump_state(state):
+    return {'nodes': state['nodes'], 'edges': [[s, t, edge_id] for (s, t), edge_id in state['edges'].items()],
+            'severity': state['severity']}
+
+def _load_state(data):
+    return {'nodes': data['nodes'], 'edges': {(s, t): edge_id for s, t, edge_id in data['edges']},
+            'severity': data['severity']}
+
+# Class: Timeline of uploaded maps kept as one base map plus deltas
+# Every checkpoint_every-th snapshot is stored in full, so rebuilding any
+# point costs at most checkpoint_every - 1 deltas. Live entries (the PsySys
+# map of the session) carry no data; their maps are read from the session.
+class SnapshotHistory:
+
+    def __init__(self, checkpoint_every=checkpoint_every):
+        self.checkpoint_every = checkpoint_every
+        self.labels = []   # snapshot labels in timeline order
+        self.entries = []  # {'checkpoint': state} or {'delta': delta}, aligned with labels
+        self.live = []     # labels of live entries
+
+    # Load from the 'comparison' store (older sessions stored {label: {'elements', 'stylesheet'}})
+    @classmethod
+    def from_store(cls, data):
+        history = cls()
+        data = data or {}
+        if 'entries' not in data:
+            for label, snapshot in data.items():
+                if 'stylesheet' in snapshot:
+                    history.add(label, snapshot.get('elements', []))
+                else:
+                    history.add_live(label)
+            return history
+        history.checkpoint_every = data['checkpoint-every']
+        history.labels = list(data['labels'])
+        history.entries = list(data['entries'])
+        history.live = list(data['live'])
+        return history
+
+    def to_store(self):
+        return {'checkpoint-every': self.checkpoint_every, 'labels': self.labels, 'entries': self.entries, 'live': self.live}
+
+    def __contains__(self, label):
+        return label in self.labels or label in self.live
+
+    def __len__(self):
+        return len(self.labels)
+
+    def is_live(self, label):
+        return label in self.live
+
+    def add_live(self, label):
+        if label not in self.live:
+            self.live.append(label)
+
+    # Snapshot state at a position (from the last checkpoint before it)
+    def state(self, position):
+        start = position
+        while 'checkpoint' not in self.entries[start]:
+            start -= 1
+        state = _load_state(self.entries[start]['checkpoint'])
+        for entry in self.entries[start + 1:position + 1]:
+            state = apply_delta(state, entry['delta'])
+        return state
+
+    def _entry(self, position, state, previous):
+        if previous is None or position % self.checkpoint_every == 0:
+            return {'checkpoint': _dump_state(state)}
+        return {'delta': state_delta(previous, state)}
+
+    # Append a snapshot (replacing an existing one with the same label)
+    def add(self, label, elements, severity_scores=None):
+        if label in self.labels:
+            self.remove(label)
+        state = snapshot_state(elements, severity_scores)
+        previous = self.state(len(self.labels) - 1) if self.labels else None
+        self.entries.append(self._entry(len(self.labels), state, previous))
+        self.labels.append(label)
+
+    # Elements & severity scores of a snapshot
+    def get(self, label):
+        state = self.state(self.labels.index(label))
+        return state_elements(state), dict(state['severity'])
+
+    # Remove a snapshot; the ones after it are re-encoded against their new predecessor
+    def remove(self, label):
+        if label in self.live:
+            self.live.remove(label)
+            return
+        position = self.labels.index(label)
+        following = [self.state(i) for i in range(position + 1, len(self.labels))]
+        previous = self.state(position - 1) if position > 0 else None
+        del self.labels[position]
+        del self.entries[position:]
+        for state in following:
+            self.entries.append(self._entry(len(self.entries), state, previous))
+            previous = state
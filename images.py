@@ -0,0 +1,135 @@
+# Imports
+import hashlib
+import json
+import logging
+import os
+import sys
+import flask
+from dash import html
+
+logger = logging.getLogger(__name__)
+
+# Widths (px) of the derived images & their formats: (PIL format, MIME type, save options)
+image_widths = [160, 320, 640, 1280]
+image_formats = {
+    'webp': ('WEBP', 'image/webp', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', 'image/jpeg', {'quality': 82, 'optimize': True, 'progressive': True})
+}
+image_extensions = ('.jpg', '.jpeg', '.png')
+
+# Browser caching: derived images are named by content hash (never change), assets may be replaced
+derived_max_age = 365 * 24 * 3600
+asset_max_age = 24 * 3600
+
+# Derived images per asset: {asset name: {format: [(width, file name), ...]}}
+_variants = {}
+
+# Function: Content hash of a source image (names its derived images)
+def source_hash(path):
+    digest = hashlib.blake2b(digest_size=8)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# Function: Resized & recompressed copies of one image (only missing files are written)
+# A small index file per source hash lists its copies, so later starts neither
+# decode the image nor import PIL.
+def derive_image(path, cache_dir):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    digest = source_hash(path)
+    index = os.path.join(cache_dir, f'{stem}-{digest}.json')
+    if os.path.exists(index):
+        with open(index, 'r', encoding='utf-8') as f:
+            return {ext: [tuple(file) for file in files] for ext, files in json.load(f).items()}
+
+    from PIL import Image, ImageOps
+    with Image.open(path) as image:
+        width, height = image.size
+        if image.getexif().get(0x0112) in (5, 6, 7, 8):  # rotated by its EXIF orientation
+            width, height = height, width
+        largest = min(width, image_widths[-1])
+        widths = [w for w in image_widths if w < largest] + [largest]
+        variants = {ext: [(w, f'{stem}-{digest}-{w}.{ext}') for w in widths] for ext in image_formats}
+        missing = [(ext, w, name) for ext, files in variants.items() for w, name in files
+                   if not os.path.exists(os.path.join(cache_dir, name))]
+        if missing:
+            # JPEGs decode at a reduced scale (much faster) when far larger than the widest copy
+            scale = min(1.0, 2 * widths[-1] / width)
+            image.draft('RGB', (round(image.size[0] * scale), round(image.size[1] * scale)))
+            image = ImageOps.exif_transpose(image).convert('RGB')
+            for ext, w, name in missing:
+                pil_format, _, options = image_formats[ext]
+                resized = image.resize((w, max(1, round(height * w / width))), Image.LANCZOS)
+                tmp = os.path.join(cache_dir, f'{name}.tmp')
+                resized.save(tmp, pil_format, **options)
+                os.replace(tmp, os.path.join(cache_dir, name))
+    with open(f'{index}.tmp', 'w', encoding='utf-8') as f:
+        json.dump(variants, f)
+    os.replace(f'{index}.tmp', index)
+    return variants
+
+# Function: Derive every image of the assets folder into the cache directory
+# Run at startup (existing files are reused, so only new or changed images are
+# resized) or ahead of a deploy with: python images.py [assets] [cache directory]
+def build_derivatives(asset_dir, cache_dir):
+    os.makedirs(cache_dir, exist_ok=True)
+    for name in sorted(os.listdir(asset_dir)):
+        if not name.lower().endswith(image_extensions):
+            continue
+        try:
+            _variants[name] = derive_image(os.path.join(asset_dir, name), cache_dir)
+        except (OSError, ValueError) as error:
+            logger.warning("Image %s not derived: %s", name, error)
+    return _variants
+
+# Function: Serve derived images (/images/...) & add cache headers to them and the assets
+def serve_derivatives(app, cache_dir):
+    server = app.server
+    prefix = app.config.routes_pathname_prefix
+    assets_path = f"{prefix}{app.config.assets_url_path.strip('/')}/"
+
+    def derived(filename):
+        response = flask.send_from_directory(cache_dir, filename, max_age=derived_max_age)
+        response.cache_control.immutable = True
+        return response
+
+    def cache_headers(response):
+        if flask.request.path.startswith(assets_path) and response.status_code == 200:
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = asset_max_age
+        return response
+
+    server.add_url_rule(f'{prefix}images/<path:filename>', 'derived_images', derived)
+    server.after_request(cache_headers)
+
+# Function: Image of an asset at a display width, with WebP & JPEG copies for each screen density
+# Falls back to the original asset when it was not derived.
+def responsive_image(app, name, display_width, **kwargs):
+    variants = _variants.get(name)
+    if not variants:
+        return html.Img(src=app.get_asset_url(name), **kwargs)
+
+    def srcset(files):
+        return ', '.join(f"{app.get_relative_path(f'/images/{file}')} {w}w" for w, file in files)
+
+    sizes = f'{display_width}px'
+    jpegs = variants['jpg']
+    fallback = next((file for w, file in jpegs if w >= display_width), jpegs[-1][1])
+    return html.Picture([
+        html.Source(type=image_formats['webp'][1], srcSet=srcset(variants['webp']), sizes=sizes),
+        html.Img(src=app.get_relative_path(f'/images/{fallback}'), srcSet=srcset(jpegs), sizes=sizes, **kwargs)
+    ])
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    root = os.path.dirname(os.path.abspath(__file__))
+    asset_dir = sys.argv[1] if len(sys.argv) > 1 else os.path.join(root, 'assets')
+    cache_dir = sys.argv[2] if len(sys.argv) > 2 else os.path.join(root, 'image-cache')
+    variants = build_derivatives(asset_dir, cache_dir)
+    before = sum(os.path.getsize(os.path.join(asset_dir, name)) for name in variants)
+    after = sum(os.path.getsize(os.path.join(cache_dir, file)) for files in variants.values()
+                for file in [files['webp'][0][1], files['jpg'][0][1]])
+    logger.info("Derived %d images into %s: %.0f KB of originals, %.0f KB at the smallest width (WebP & JPEG)",
+                len(variants), cache_dir, before / 1024, after / 1024)
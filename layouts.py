@@ -0,0 +1,124 @@
+# Imports
+from collections import OrderedDict
+import hashlib
+import json
+from metrics import map_structure, structure_hash
+
+# Ideal distance between linked factors (Cytoscape pixels)
+spacing = 100.0
+
+# Force-directed iterations for a fresh layout & for a warm start from earlier positions
+# (halved above large_map factors, where every iteration is O(n^2))
+cold_iterations = 100
+warm_iterations = 30
+large_map = 500
+
+# Pull towards the centre & step size of known factors in a warm start (relative to new ones)
+gravity = 1.0
+warm_mobility = 0.02
+
+# Rows of the pairwise repulsion computed at once (bounds memory on large maps)
+block_size = 256
+
+# Number of layouts kept in memory
+cache_size = 256
+_cache = OrderedDict()
+
+# Function: Fruchterman-Reingold layout (NumPy), moving positions in place
+# Links attract, all pairs repel & a weak pull to the centre keeps unlinked
+# factors close. The step size (temperature) cools linearly; mobility scales
+# it per node (warm starts move known factors less than new ones).
+def force_layout(positions, sources, targets, iterations, temperature, mobility=1.0):
+    import numpy as np
+    n = len(positions)
+    if n < 2:
+        return positions
+    k2 = spacing * spacing
+    x, y = positions[:, 0], positions[:, 1]
+    for step in range(iterations):
+        dx_total, dy_total = np.zeros(n, dtype=positions.dtype), np.zeros(n, dtype=positions.dtype)
+        for start in range(0, n, block_size):
+            dx = x[start:start + block_size, None] - x[None, :]
+            dy = y[start:start + block_size, None] - y[None, :]
+            force = k2 / np.maximum(dx * dx + dy * dy, 0.01)
+            dx_total[start:start + block_size] = (dx * force).sum(axis=1)
+            dy_total[start:start + block_size] = (dy * force).sum(axis=1)
+        if len(sources):
+            dx, dy = x[sources] - x[targets], y[sources] - y[targets]
+            pull = np.sqrt(dx * dx + dy * dy) / spacing
+            dx_total -= np.bincount(sources, dx * pull, n) - np.bincount(targets, dx * pull, n)
+            dy_total -= np.bincount(sources, dy * pull, n) - np.bincount(targets, dy * pull, n)
+        dx_total -= x * gravity
+        dy_total -= y * gravity
+        length = np.maximum(np.sqrt(dx_total * dx_total + dy_total * dy_total), 0.01)
+        scale = np.minimum(length, temperature * (1 - step / iterations) * mobility) / length
+        x += dx_total * scale
+        y += dy_total * scale
+    return positions
+
+# Function: Node positions for a map structure, optionally starting from earlier positions
+def compute_layout(nodes, edges, seed, previous=None):
+    import numpy as np  # loaded with the first layout
+    n = len(nodes)
+    index = {node: i for i, node in enumerate(nodes)}
+    links = [(index[s], index[t]) for s, t in dict.fromkeys(edges) if s != t]
+    sources = np.array([s for s, _ in links], dtype=np.int64)
+    targets = np.array([t for _, t in links], dtype=np.int64)
+    side = spacing * np.sqrt(max(n, 1))
+    rng = np.random.default_rng(seed)
+    # float32 halves the memory traffic of the pairwise repulsion
+    positions = rng.uniform(-side / 2, side / 2, size=(n, 2)).astype(np.float32)
+    iterations = cold_iterations, warm_iterations
+    if n > large_map:
+        iterations = cold_iterations // 2, warm_iterations // 2
+
+    if not previous:
+        force_layout(positions, sources, targets, iterations[0], side / 10)
+    else:
+        # Known factors keep their place, new ones start next to their known neighbours
+        known = np.array([node in previous for node in nodes])
+        for node, i in index.items():
+            if known[i]:
+                positions[i] = previous[node]['x'], previous[node]['y']
+        for i in np.flatnonzero(~known):
+            neighbours = [j for s, t in links for j in ((t,) if s == i else (s,) if t == i else ()) if known[j]]
+            if neighbours:
+                positions[i] = positions[neighbours].mean(axis=0) + rng.normal(0, spacing / 4, 2)
+        start = positions[known].copy()
+        force_layout(positions, sources, targets, iterations[1], spacing, np.where(known, warm_mobility, 1.0))
+        # Undo the drift of the whole map, so the known factors stay where they were
+        if known.any():
+            positions -= (positions[known] - start).mean(axis=0)
+    return {node: {'x': round(float(x), 1), 'y': round(float(y), 1)} for node, (x, y) in zip(nodes, positions)}
+
+# Function: Positions of a map's factors ({node id: {'x', 'y'}}), cached per map structure
+# previous: positions shown before an edit (or of the previous timeline map); factors
+# found there keep their place. If every factor has one, they are returned unchanged.
+def map_positions(elements, previous=None):
+    nodes, edges = map_structure(elements)
+    nodes = list(dict.fromkeys(nodes))
+    version = structure_hash(nodes, edges)
+    seed_positions = {node: previous[node] for node in nodes if node in previous} if previous else {}
+    if seed_positions and len(seed_positions) == len(nodes):
+        return seed_positions
+
+    key = version
+    if seed_positions:
+        key += hashlib.blake2b(json.dumps(seed_positions, sort_keys=True).encode('utf-8'), digest_size=8).hexdigest()
+    positions = _cache.get(key)
+    if positions is not None:
+        _cache.move_to_end(key)
+        return positions
+    positions = compute_layout(nodes, edges, int(version[:8], 16), seed_positions)
+    _cache[key] = positions
+    if len(_cache) > cache_size:
+        _cache.popitem(last=False)
+    return positions
+
+# Function: Cytoscape layout placing the factors at server-side positions
+def map_layout(elements, previous=None):
+    return {'name': 'preset', 'positions': map_positions(elements, previous), 'fit': True, 'padding': 10}
+
+# Function: Positions of a Cytoscape layout (None unless it is a preset layout)
+def layout_positions(layout):
+    return (layout or {}).get('positions')
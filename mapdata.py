@@ -0,0 +1,276 @@
+# Imports
+import argparse
+import gzip
+import json
+import os
+import re
+import zlib
+from metrics import compute_metrics, degree_metrics
+from styles import StyleSheet, default_stylesheet, node_selector, edge_selector
+
+# Function: Date of a map from its file name (graph_2023-12-21_14-50-13.json)
+def date_from_filename(path):
+    match = re.search(r"(\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2})", os.path.basename(path or ''))
+    return match.group(1) if match else None
+
+# Function: Normalize a map file (any export or donation version) to plain node & edge lists
+# Returns {'date', 'nodes', 'labels', 'edges', 'edge-ids', 'classes', 'edge-classes', 'severity',
+# 'edge-data', 'annotations'} where 'edges' are (source, target) pairs between known nodes,
+# 'edge-ids' holds the Cytoscape id of each edge (None if it never had one), 'classes' the
+# Cytoscape classes of the nodes that have any & 'edge-classes' those of each edge (or None).
+def normalize_map(data, path=None):
+    if is_compact_map(data):
+        data = decode_map(data, metrics=False)
+    nodes, labels, classes = [], {}, {}
+    edges, edge_ids, edge_classes = [], [], []
+    pending = []
+    for element in data.get('elements') or []:
+        element_data = element.get('data', {}) if isinstance(element, dict) else {}
+        element_classes = element.get('classes') if isinstance(element, dict) and isinstance(element.get('classes'), str) else None
+        if 'source' in element_data and 'target' in element_data:
+            pending.append((element_data, element_classes))
+        elif 'id' in element_data and element_data['id'] not in labels:
+            nodes.append(element_data['id'])
+            labels[element_data['id']] = element_data.get('label', element_data['id'])
+            if element_classes:
+                classes[element_data['id']] = element_classes
+
+    # Keep one edge per (source, target) between existing nodes
+    seen = set()
+    for element_data, element_classes in pending:
+        edge = (element_data['source'], element_data['target'])
+        if edge[0] in labels and edge[1] in labels and edge not in seen:
+            seen.add(edge)
+            edges.append(edge)
+            edge_ids.append(element_data.get('id'))
+            edge_classes.append(element_classes or None)
+
+    severity = data.get('severity-scores') or data.get('severity') or {}
+    severity = {k: v for k, v in severity.items() if isinstance(v, (int, float)) and not isinstance(v, bool)} if isinstance(severity, dict) else {}
+    edge_data = data.get('edge-data') if isinstance(data.get('edge-data'), dict) else {}
+    annotations = data.get('annotations') if isinstance(data.get('annotations'), dict) else {}
+
+    return {
+        'date': data.get('date') or date_from_filename(path),
+        'nodes': nodes,
+        'labels': labels,
+        'edges': edges,
+        'edge-ids': edge_ids,
+        'classes': classes,
+        'edge-classes': edge_classes,
+        'severity': severity,
+        'edge-data': edge_data,
+        'annotations': annotations
+    }
+
+# Function: Cytoscape elements of a normalized map
+def map_elements(normalized):
+    classes = normalized.get('classes') or {}
+    edge_classes = normalized.get('edge-classes') or [None] * len(normalized['edges'])
+    elements = []
+    for node in normalized['nodes']:
+        element = {'data': {'id': node, 'label': normalized['labels'].get(node, node)}}
+        if classes.get(node):
+            element['classes'] = classes[node]
+        elements.append(element)
+    for (source, target), edge_id, edge_class in zip(normalized['edges'], normalized['edge-ids'], edge_classes):
+        data = {'source': source, 'target': target}
+        if edge_id is not None:
+            data['id'] = edge_id
+        elements.append({'data': data, 'classes': edge_class} if edge_class else {'data': data})
+    return elements
+
+# Compact map file format (version 2)
+# Nodes & edges are stored once as arrays; everything per node or per edge
+# (labels, severity, notes, strength, styles) is a column aligned with them,
+# edges refer to nodes by index. Columns without any value are left out.
+# The stylesheet and the degree metrics are rebuilt when a file is read.
+map_format = 'psysys-map'
+map_version = 2
+
+_element_selector = re.compile(r'^(node|edge)\[id="((?:[^"\\]|\\.)*)"\]$')
+
+# Function: Column of per-item values, or None if no item has one
+def _column(values):
+    values = list(values)
+    return values if any(value is not None for value in values) else None
+
+# Function: Encode a normalized map (see normalize_map) & its stylesheet as a version 2 map
+def encode_map(normalized, stylesheet=None):
+    nodes, edges, edge_ids = normalized['nodes'], normalized['edges'], normalized['edge-ids']
+    index = {node: i for i, node in enumerate(nodes)}
+    edge_index = {edge_id: i for i, edge_id in enumerate(edge_ids) if edge_id is not None}
+    severity = dict(normalized['severity'])
+    annotations = dict(normalized['annotations'])
+    edge_data = dict(normalized['edge-data'])
+
+    notes = [annotations.pop(node) if isinstance(annotations.get(node), str) else None for node in nodes]
+    strength, edge_notes = [None] * len(edges), [None] * len(edges)
+    for edge_id, i in edge_index.items():
+        info = edge_data.get(edge_id)
+        if isinstance(info, dict) and set(info) == {'strength', 'annotation'} and isinstance(info['annotation'], str):
+            strength[i], edge_notes[i] = info['strength'], info['annotation']
+            del edge_data[edge_id]
+
+    # Split the stylesheet into per-node & per-edge columns and the remaining (base) rules
+    node_styles, edge_styles, base = {}, {}, []
+    for selector, style in StyleSheet(stylesheet).rules.items():
+        match = _element_selector.match(selector)
+        if match is None:
+            base.append({'selector': selector, 'style': style})
+            continue
+        element_id = re.sub(r'\\(.)', r'\1', match.group(2))
+        columns, position = (node_styles, index.get(element_id)) if match.group(1) == 'node' else (edge_styles, edge_index.get(element_id))
+        if position is None:
+            continue  # rule for an element that is not in the map
+        for prop, value in style.items():
+            columns.setdefault(prop, [None] * (len(nodes) if match.group(1) == 'node' else len(edges)))[position] = value
+
+    encoded = {
+        'format': map_format,
+        'version': map_version,
+        'date': normalized['date'],
+        'nodes': nodes,
+        'labels': _column(None if normalized['labels'][node] == node else normalized['labels'][node] for node in nodes),
+        'severity': _column(severity.pop(node, None) for node in nodes),
+        'notes': _column(notes),
+        'classes': _column((normalized.get('classes') or {}).get(node) for node in nodes),
+        'edges': [[index[source], index[target]] for source, target in edges],
+        'edge-ids': _column(edge_ids),
+        'edge-classes': _column(normalized.get('edge-classes') or []),
+        'strength': _column(strength),
+        'edge-notes': _column(edge_notes),
+        'node-styles': node_styles or None,
+        'edge-styles': edge_styles or None,
+        'base-styles': base if base != StyleSheet(default_stylesheet).to_list() else None,
+        # Entries that do not belong to any node or edge of the map, kept as they were
+        'extra': {key: value for key, value in [('severity', severity), ('annotations', annotations), ('edge-data', edge_data)] if value} or None
+    }
+    return {key: value for key, value in encoded.items() if value is not None}
+
+# Function: Decode a version 2 map into the Cytoscape form the app works with
+# Returns {'date', 'elements', 'edges', 'stylesheet', 'severity-scores', 'edge-data', 'annotations'}
+# plus the degree metrics ('out-degrees', 'in-degrees', 'out-in-ratio') if metrics is set.
+def decode_map(data, metrics=True):
+    nodes = data.get('nodes') or []
+    edges = [(nodes[s], nodes[t]) for s, t in data.get('edges') or []]
+    labels = data.get('labels') or [None] * len(nodes)
+    edge_ids = data.get('edge-ids') or [None] * len(edges)
+    extra = data.get('extra') or {}
+
+    normalized = {
+        'nodes': nodes,
+        'labels': {node: node if label is None else label for node, label in zip(nodes, labels)},
+        'edges': edges,
+        'edge-ids': edge_ids,
+        'classes': {node: value for node, value in zip(nodes, data.get('classes') or []) if value},
+        'edge-classes': data.get('edge-classes') or [None] * len(edges)
+    }
+    elements = map_elements(normalized)
+
+    severity = {node: value for node, value in zip(nodes, data.get('severity') or []) if value is not None}
+    annotations = {node: note for node, note in zip(nodes, data.get('notes') or []) if note is not None}
+    edge_data = {edge_id: {'strength': strength, 'annotation': note}
+                 for edge_id, strength, note in zip(edge_ids, data.get('strength') or [None] * len(edges), data.get('edge-notes') or [])
+                 if edge_id is not None and note is not None}
+
+    sheet = StyleSheet(data['base-styles'] if data.get('base-styles') is not None else default_stylesheet)
+    for prop, values in (data.get('node-styles') or {}).items():
+        for node, value in zip(nodes, values):
+            if value is not None:
+                sheet.set(node_selector(node), {prop: value})
+    for prop, values in (data.get('edge-styles') or {}).items():
+        for edge_id, value in zip(edge_ids, values):
+            if value is not None and edge_id is not None:
+                sheet.set(edge_selector(edge_id), {prop: value})
+
+    decoded = {
+        'date': data.get('date'),
+        'elements': elements,
+        'edges': [{'data': {'source': source, 'target': target}} for source, target in edges],
+        'stylesheet': sheet.to_list(),
+        'severity-scores': {**severity, **extra.get('severity', {})},
+        'edge-data': {**edge_data, **extra.get('edge-data', {})},
+        'annotations': {**annotations, **extra.get('annotations', {})}
+    }
+    if metrics:
+        degrees = compute_metrics(elements, degree_metrics)
+        decoded.update({'out-degrees': degrees['out-degree'], 'in-degrees': degrees['in-degree'],
+                        'out-in-ratio': degrees['out-in-ratio']})
+    return decoded
+
+# Function: Check if a parsed map file is in the version 2 format
+def is_compact_map(data):
+    return isinstance(data, dict) and data.get('format') == map_format
+
+# Function: Upgrade a map file of any version to version 2
+def upgrade_map(data, path=None):
+    if is_compact_map(data):
+        return data
+    return encode_map(normalize_map(data, path), data.get('stylesheet'))
+
+# Function: Decompress gzip data, refusing to inflate beyond max_bytes
+def gunzip(raw, max_bytes=None):
+    inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    data = inflater.decompress(raw, max_bytes or 0)
+    if inflater.unconsumed_tail:
+        raise ValueError(f"Decompressed map is larger than {max_bytes} bytes.")
+    return data
+
+# Function: Serialize a map file (gzip-compressed if compress is set)
+def dump_map(data, compress=False):
+    raw = json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    return gzip.compress(raw, mtime=0) if compress else raw
+
+# Function: Parse a map file (plain or gzip-compressed JSON)
+def load_map(raw, max_bytes=None):
+    if raw[:2] == b'\x1f\x8b':
+        raw = gunzip(raw, max_bytes)
+    return json.loads(raw)
+
+# Function: Stylesheet rules that apply to a normalized map (rules for missing elements dropped)
+def _applied_rules(stylesheet, normalized):
+    existing = {('node', node) for node in normalized['nodes']} | {('edge', edge_id) for edge_id in normalized['edge-ids']}
+    rules = {}
+    for selector, style in StyleSheet(stylesheet).rules.items():
+        match = _element_selector.match(selector)
+        if match is None or (match.group(1), re.sub(r'\\(.)', r'\1', match.group(2))) in existing:
+            rules[selector] = style
+    return rules
+
+# Function: Check that an upgraded map holds everything the original file did
+def same_map(original, upgraded, path=None):
+    before = normalize_map(original, path)
+    after = normalize_map(upgraded, path)
+    if before != after:
+        return False
+    stylesheet = original.get('stylesheet') or default_stylesheet
+    return _applied_rules(stylesheet, before) == _applied_rules(decode_map(upgraded, metrics=False)['stylesheet'], after)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Upgrade map files (exports & donations) to the compact version 2 format.")
+    parser.add_argument('root', nargs='?', default='data-donation', help="directory with map files")
+    parser.add_argument('-o', '--output', required=True, help="directory for the upgraded files")
+    parser.add_argument('--gzip', action='store_true', help="write gzip-compressed files (.json.gz)")
+    args = parser.parse_args()
+
+    total_before, total_after, failed = 0, 0, 0
+    for folder, _, names in sorted(os.walk(args.root)):
+        for name in sorted(name for name in names if name.endswith('.json')):
+            path = os.path.join(folder, name)
+            with open(path, 'rb') as f:
+                raw = f.read()
+            original = load_map(raw)
+            upgraded = upgrade_map(original, path)
+            if not same_map(original, upgraded, path):
+                failed += 1
+                print(f"Not upgraded (content would change): {path}")
+                continue
+            output = dump_map(upgraded, compress=args.gzip)
+            target = os.path.join(args.output, os.path.relpath(path, args.root)) + ('.gz' if args.gzip else '')
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'wb') as f:
+                f.write(output)
+            total_before += len(raw)
+            total_after += len(output)
+    print(f"Upgraded {total_before / 1024:.0f} KB of map files to {total_after / 1024:.0f} KB ({failed} not upgraded)")
@@ -0,0 +1,250 @@
+# Imports
+from collections import OrderedDict
+import hashlib
+import json
+# numpy & scipy are imported by the functions using them: the app imports this
+# module at start, but only needs them once a map is measured
+
+# Metric names shared by export, styling and inspect
+degree_metrics = ['out-degree', 'in-degree', 'out-in-ratio']
+path_metrics = ['betweenness', 'closeness', 'eigenvector']
+
+# Number of map versions whose metrics are kept in memory
+cache_size = 128
+_cache = OrderedDict()
+
+# Function: Split Cytoscape elements into node ids & (source, target) pairs between them
+def map_structure(elements):
+    nodes = [e['data']['id'] for e in elements or [] if 'id' in e.get('data', {}) and 'source' not in e['data']]
+    known = set(nodes)
+    edges = [(e['data']['source'], e['data']['target']) for e in elements or []
+             if 'source' in e.get('data', {}) and e['data']['source'] in known and e['data'].get('target') in known]
+    return nodes, edges
+
+# Function: Hash of a map's structure (node ids & edges)
+def structure_hash(nodes, edges):
+    payload = json.dumps([nodes, edges], separators=(',', ':')).encode('utf-8')
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+# Function: Sparse adjacency matrix (row = source, column = target)
+def adjacency_matrix(nodes, edges):
+    import numpy as np
+    import scipy.sparse as sp
+    index = {node: i for i, node in enumerate(nodes)}
+    n = len(nodes)
+    if edges:
+        rows, cols = zip(*((index[s], index[t]) for s, t in set(edges)))
+    else:
+        rows, cols = (), ()
+    return sp.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(n, n))
+
+# Function: Cache entry (adjacency matrix + computed metrics) for a map version
+def _entry(elements):
+    nodes, edges = map_structure(elements)
+    key = structure_hash(nodes, edges)
+    entry = _cache.get(key)
+    if entry is None:
+        entry = {'nodes': nodes, 'matrix': adjacency_matrix(nodes, edges)}
+        _cache[key] = entry
+        if len(_cache) > cache_size:
+            _cache.popitem(last=False)
+    else:
+        _cache.move_to_end(key)
+    return entry
+
+# Function: Out-degree, in-degree & out-/in-degree ratio
+def _degrees(A):
+    import numpy as np
+    out_degree = np.asarray(A.sum(axis=1)).ravel().astype(int)
+    in_degree = np.asarray(A.sum(axis=0)).ravel().astype(int)
+    ratio = np.divide(out_degree, in_degree, out=np.zeros(len(out_degree)), where=in_degree != 0)
+    return {'out-degree': out_degree, 'in-degree': in_degree, 'out-in-ratio': ratio}
+
+# Function: Betweenness centrality (normalized as in networkx for directed graphs)
+# Brandes' algorithm: a breadth-first search per source over the adjacency lists,
+# then dependencies accumulated back along the search order, O(n·m) time & O(n + m) memory.
+def _betweenness(A):
+    import numpy as np
+    n = A.shape[0]
+    if n < 3:
+        return np.zeros(n)
+    successors = [A.indices[A.indptr[i]:A.indptr[i + 1]].tolist() for i in range(n)]
+    betweenness = [0.0] * n
+    for s in range(n):
+        sigma, dist, predecessors = [0] * n, [-1] * n, [[] for _ in range(n)]
+        sigma[s], dist[s] = 1, 0
+        order = [s]
+        for v in order:  # the order grows while it is searched (a queue)
+            step = dist[v] + 1
+            for w in successors[v]:
+                if dist[w] < 0:
+                    dist[w] = step
+                    order.append(w)
+                if dist[w] == step:
+                    sigma[w] += sigma[v]
+                    predecessors[w].append(v)
+        delta = [0.0] * n
+        for w in reversed(order):
+            share = (1 + delta[w]) / sigma[w]
+            for v in predecessors[w]:
+                delta[v] += sigma[v] * share
+            if w != s:
+                betweenness[w] += delta[w]
+    return np.array(betweenness) / ((n - 1) * (n - 2))
+
+# Function: Closeness centrality over incoming distances (Wasserman & Faust, as in networkx)
+def _closeness(A):
+    import numpy as np
+    n = A.shape[0]
+    if n < 2:
+        return np.zeros(n)
+    from scipy.sparse.csgraph import shortest_path  # loaded with the first path metric
+    D = shortest_path(A, method='D', directed=True, unweighted=True)
+    finite = np.isfinite(D)
+    reach = finite.sum(axis=0) - 1
+    total = np.where(finite, D, 0).sum(axis=0)
+    closeness = np.divide(reach, total, out=np.zeros(n), where=total > 0)
+    return closeness * reach / (n - 1)
+
+# Function: Eigenvector centrality over incoming links (shifted power iteration, as in networkx)
+def _eigenvector(A, max_iter=100, tol=1e-6):
+    import numpy as np
+    import scipy.sparse as sp
+    n = A.shape[0]
+    if n == 0:
+        return np.zeros(0)
+    M = (A + sp.identity(n, format='csr')).T.tocsr()
+    x = np.full(n, 1 / n)
+    for _ in range(max_iter):
+        previous = x
+        x = M @ x
+        norm = np.linalg.norm(x)
+        x = x / norm if norm else x
+        if np.abs(x - previous).sum() < n * tol:
+            break
+    return x
+
+_compute = {'betweenness': _betweenness, 'closeness': _closeness, 'eigenvector': _eigenvector}
+
+# Function: Metric values per node id, memoized per map structure
+def get_metric(elements, name):
+    entry = _entry(elements)
+    if name not in entry:
+        if name in degree_metrics:
+            entry.update(_degrees(entry['matrix']))
+        else:
+            entry[name] = _compute[name](entry['matrix'])
+    return {node: value.item() for node, value in zip(entry['nodes'], entry[name])}
+
+# Function: All requested metrics for a map as {metric: {node id: value}}
+def compute_metrics(elements, names=degree_metrics):
+    return {name: get_metric(elements, name) for name in names}
+
+# Class: Degree counters of a map being edited (kept in edit-map-data['degrees'])
+# Holds each node's out- & in-degree and how many nodes have each degree & ratio
+# value. An edge edit updates two nodes in O(1), and the range of a metric (to
+# normalize a scheme) comes from its few distinct values, not a recount of every edge.
+class DegreeCounter:
+
+    def __init__(self):
+        self.nodes = {}                                      # node id -> [out-degree, in-degree]
+        self.counts = {name: {} for name in degree_metrics}  # metric -> {value: number of nodes}
+        self.changed = set()                                 # nodes added or re-counted since loading
+        self.removed = set()                                 # nodes removed since loading
+
+    # Count the degrees of a Cytoscape element list (as get_metric does)
+    @classmethod
+    def from_elements(cls, elements):
+        counter = cls()
+        nodes, edges = map_structure(elements)
+        for node in nodes:
+            counter.add_node(node)
+        for source, target in set(edges):
+            counter.add_edge(source, target)
+        counter.changed.clear()
+        return counter
+
+    # Load from the JSON form (value keys are strings)
+    @classmethod
+    def from_store(cls, data):
+        counter = cls()
+        counter.nodes = {node: list(degrees) for node, degrees in data['nodes'].items()}
+        counter.counts = {name: {float(value): count for value, count in counts.items()}
+                          for name, counts in data['counts'].items()}
+        return counter
+
+    def to_store(self):
+        return {'nodes': self.nodes, 'counts': self.store_counts()}
+
+    def store_counts(self):
+        return {name: {str(value): count for value, count in counts.items()} for name, counts in self.counts.items()}
+
+    # Write the changes since loading into a Patch of the stored form
+    def store_patch(self, patch):
+        for node in self.removed - set(self.nodes):
+            del patch['nodes'][node]
+        for node in self.changed & set(self.nodes):
+            patch['nodes'][node] = self.nodes[node]
+        patch['counts'] = self.store_counts()
+
+    def __contains__(self, node):
+        return node in self.nodes
+
+    def value(self, name, node):
+        out_degree, in_degree = self.nodes[node]
+        if name == 'out-degree':
+            return out_degree
+        if name == 'in-degree':
+            return in_degree
+        return out_degree / in_degree if in_degree else 0.0
+
+    def values(self, name):
+        return {node: self.value(name, node) for node in self.nodes}
+
+    # Lowest & highest value of a metric ((0, 1) for an empty map)
+    def range(self, name):
+        counts = self.counts[name]
+        return (min(counts), max(counts)) if counts else (0, 1)
+
+    def ranges(self):
+        return {name: self.range(name) for name in degree_metrics}
+
+    def _count(self, node, step):
+        for name in degree_metrics:
+            counts, value = self.counts[name], float(self.value(name, node))
+            counts[value] = counts.get(value, 0) + step
+            if not counts[value]:
+                del counts[value]
+
+    def _shift(self, node, i, step):
+        self._count(node, -1)
+        self.nodes[node][i] += step
+        self._count(node, 1)
+        self.changed.add(node)
+
+    def add_node(self, node):
+        if node not in self.nodes:
+            self.nodes[node] = [0, 0]
+            self._count(node, 1)
+            self.changed.add(node)
+            self.removed.discard(node)
+
+    # Remove a node; its incident edges ((source, target) pairs) are removed first
+    def remove_node(self, node, edges=()):
+        for source, target in edges:
+            self.remove_edge(source, target)
+        if node in self.nodes:
+            self._count(node, -1)
+            del self.nodes[node]
+            self.removed.add(node)
+
+    # Edges to nodes that are not counted are left out (as in map_structure)
+    def add_edge(self, source, target):
+        if source in self.nodes and target in self.nodes:
+            self._shift(source, 0, 1)
+            self._shift(target, 1, 1)
+
+    def remove_edge(self, source, target):
+        if source in self.nodes and target in self.nodes:
+            self._shift(source, 0, -1)
+            self._shift(target, 1, -1)
@@ -0,0 +1,283 @@
+# Imports
+import bisect
+import functools
+import glob
+import json
+import os
+import threading
+import time
+import tracemalloc
+import flask
+from state import is_ref
+
+# Fast JSON encoder for measuring store sizes when installed (orjson), the standard library otherwise
+try:
+    import orjson
+    def json_size(value):
+        return len(orjson.dumps(value))
+except ImportError:
+    def json_size(value):
+        return len(json.dumps(value, separators=(',', ':')))
+
+# Histogram buckets: callback wall time (seconds) & payload sizes (bytes)
+duration_buckets = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+size_buckets = [256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216]
+
+# Class: Prometheus histogram with labels
+# Per label set: counts per bucket (the last one is +Inf), sum & count; the
+# buckets are made cumulative when the text format is written.
+class Histogram:
+
+    def __init__(self, name, help, labels, buckets):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self.series = {}  # label values -> [bucket counts..., sum, count]
+        self.lock = threading.Lock()
+
+    def observe(self, values, amount):
+        i = bisect.bisect_left(self.buckets, amount)
+        with self.lock:
+            series = self.series.get(values)
+            if series is None:
+                series = self.series[values] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            series[i] += 1
+            series[-2] += amount
+            series[-1] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {json.dumps(values): list(series) for values, series in self.series.items()}
+
+    # Add a snapshot (e.g. of another worker) to merged series
+    @staticmethod
+    def merge(merged, snapshot):
+        for key, series in snapshot.items():
+            total = merged.setdefault(key, [0] * len(series))
+            for i, value in enumerate(series):
+                total[i] += value
+        return merged
+
+    def text(self, merged):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        for key, series in sorted(merged.items()):
+            labels = ','.join(f'{label}="{_escape(value)}"' for label, value in zip(self.labels, json.loads(key)))
+            cumulative = 0
+            for bound, count in zip(self.buckets + ['+Inf'], series[:-2]):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{labels}}} {series[-2]}')
+            lines.append(f'{self.name}_count{{{labels}}} {series[-1]}')
+        return '\n'.join(lines)
+
+# Function: Escape a Prometheus label value
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+# Class: Latency & payload sizes of every Dash callback, served on /metrics
+# Measured around each /_dash-update-component request, so the time includes
+# Dash's own (de)serialization. Store sizes come from the request for stores
+# kept in the browser and from ServerState (via observe_store) for stores kept
+# on the server. With a directory, every gunicorn worker writes its series
+# there (at most once per flush_interval) and /metrics adds them all up; like
+# the worker files of prometheus_client, the directory is emptied on deploys.
+class CallbackMetrics:
+
+    def __init__(self, app, directory=None, flush_interval=1.0):
+        self.app = app
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.last_flush = 0.0
+        self.names = {}  # output key -> callback function name
+        self.duration = Histogram('psysys_callback_duration_seconds', 'Wall time of Dash callback requests.',
+                                  ['callback'], duration_buckets)
+        self.request_size = Histogram('psysys_callback_request_bytes', 'Size of Dash callback request bodies.',
+                                      ['callback'], size_buckets)
+        self.response_size = Histogram('psysys_callback_response_bytes', 'Size of Dash callback responses.',
+                                       ['callback'], size_buckets)
+        self.store_size = Histogram('psysys_store_bytes', 'Size of dcc.Store data read (input, state) or written (output) by callbacks.',
+                                    ['store', 'role'], size_buckets)
+        self.histograms = [self.duration, self.request_size, self.response_size, self.store_size]
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    # Register the request hooks & the /metrics route
+    def attach(self):
+        server = self.app.server
+        server.before_request(self._start)
+        server.after_request(self._finish)
+        server.add_url_rule('/metrics', 'metrics', self.expose)
+        return self
+
+    def callback_name(self, output):
+        name = self.names.get(output)
+        if name is None:
+            callback = self.app.callback_map.get(output, {}).get('callback')
+            name = self.names[output] = getattr(callback, '__name__', output)
+        return name
+
+    # Called by ServerState with the size of stored data it loads or saves
+    def observe_store(self, store_id, action, size):
+        if action == 'save':
+            self.store_size.observe((store_id, 'output'), size)
+        elif flask.has_request_context():
+            flask.g.setdefault('store_sizes', {})[store_id] = size
+
+    def _start(self):
+        if flask.request.path.endswith('/_dash-update-component'):
+            flask.g.callback_start = time.perf_counter()
+
+    def _finish(self, response):
+        start = flask.g.pop('callback_start', None)
+        if start is None:
+            return response
+        body = flask.request.get_json(silent=True) or {}
+        name = self.callback_name(body.get('output', ''))
+        self.duration.observe((name,), time.perf_counter() - start)
+        self.request_size.observe((name,), flask.request.content_length or 0)
+        self.response_size.observe((name,), response.calculate_content_length() or 0)
+
+        loaded = flask.g.get('store_sizes', {})
+        for role, key in [('input', 'inputs'), ('state', 'state')]:
+            for item in body.get(key, []):
+                # Pattern-matching (ALL) dependencies arrive as lists; stores are single components
+                if not isinstance(item, dict) or item.get('property') != 'data' or not isinstance(item.get('id'), str):
+                    continue
+                value = item.get('value')
+                if not is_ref(value):
+                    self.store_size.observe((item['id'], role), json_size(value))
+                elif item['id'] in loaded:
+                    self.store_size.observe((item['id'], role), loaded[item['id']])
+
+        if self.directory and time.time() - self.last_flush > self.flush_interval:
+            self.flush()
+        return response
+
+    # Write this worker's series to the shared directory
+    def flush(self):
+        self.last_flush = time.time()
+        path = os.path.join(self.directory, f'metrics-{os.getpid()}.json')
+        tmp = f'{path}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({h.name: h.snapshot() for h in self.histograms}, f)
+        os.replace(tmp, path)
+
+    def expose(self):
+        merged = {h.name: {} for h in self.histograms}
+        if self.directory:
+            self.flush()
+            for path in glob.glob(os.path.join(self.directory, 'metrics-*.json')):
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        snapshot = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                for h in self.histograms:
+                    Histogram.merge(merged[h.name], snapshot.get(h.name, {}))
+        else:
+            for h in self.histograms:
+                Histogram.merge(merged[h.name], h.snapshot())
+        text = '\n'.join(h.text(merged[h.name]) for h in self.histograms) + '\n'
+        return flask.Response(text, mimetype='text/plain; version=0.0.4')
+
+# Traceback depth recorded per allocation & allocation sites listed per callback
+traceback_frames = 10
+top_sites = 10
+
+# Class: Allocation profile of selected callbacks (tracemalloc)
+# Every call of a selected callback runs between two snapshots: the difference
+# is the memory still held when it returns (including its response, freed
+# after the request) and the allocation sites it grew, summed per callback.
+# Leaks show up as a traced total that keeps growing between reports. Calls are serialized, since
+# tracemalloc traces the whole process. Snapshots are dumped to the directory
+# every interval seconds (load them with tracemalloc.Snapshot.load to compare).
+class AllocationProfiler:
+
+    def __init__(self, app, names, directory=None, interval=60.0):
+        self.app = app
+        self.names = names  # callback function names, or None for all callbacks
+        self.directory = directory
+        self.interval = interval
+        self.last_dump = 0.0
+        self.calls = {}  # callback -> {'calls', 'retained', 'peak', 'sites': {(file, line): [bytes, blocks]}}
+        self.lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    # Wrap the selected callbacks (call after all callbacks are registered) & add the /allocations report
+    def attach(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(traceback_frames)
+        for callback in self.app.callback_map.values():
+            func = callback.get('callback')
+            if func is not None and (self.names is None or func.__name__ in self.names):
+                callback['callback'] = self.profiled(func)
+        self.app.server.add_url_rule('/allocations', 'allocations', self.expose)
+        return self
+
+    def profiled(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.lock:
+                before = _snapshot()
+                tracemalloc.reset_peak()
+                start = tracemalloc.get_traced_memory()[0]
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    current, peak = tracemalloc.get_traced_memory()
+                    after = _snapshot()
+                    self.record(func.__name__, before, after, current - start, peak - start)
+        return wrapper
+
+    def record(self, name, before, after, retained, peak):
+        stats = self.calls.setdefault(name, {'calls': 0, 'retained': 0, 'peak': 0, 'sites': {}})
+        stats['calls'] += 1
+        stats['retained'] += retained
+        stats['peak'] = max(stats['peak'], peak)
+        for stat in after.compare_to(before, 'lineno'):
+            if stat.size_diff:
+                frame = stat.traceback[0]
+                site = stats['sites'].setdefault((frame.filename, frame.lineno), [0, 0])
+                site[0] += stat.size_diff
+                site[1] += stat.count_diff
+        if self.directory and time.time() - self.last_dump > self.interval:
+            self.last_dump = time.time()
+            after.dump(os.path.join(self.directory, f'tracemalloc-{os.getpid()}-{int(self.last_dump)}.snapshot'))
+
+    def report(self):
+        lines = [f'Traced: {tracemalloc.get_traced_memory()[0] / 1024:.1f} KB']
+        with self.lock:
+            for name, stats in sorted(self.calls.items(), key=lambda item: -item[1]['retained']):
+                lines.append(f"{name}: {stats['calls']} calls, {stats['retained'] / stats['calls'] / 1024:.1f} KB retained per call, "
+                             f"{stats['peak'] / 1024:.1f} KB peak")
+                sites = sorted(stats['sites'].items(), key=lambda item: -abs(item[1][0]))[:top_sites]
+                for (filename, lineno), (size, count) in sites:
+                    lines.append(f"  {size / 1024:+10.1f} KB {count:+8d} blocks  {filename}:{lineno}")
+        return '\n'.join(lines) + '\n'
+
+    def expose(self):
+        return flask.Response(self.report(), mimetype='text/plain')
+
+# Function: Snapshot without tracemalloc's & the import system's own allocations
+def _snapshot():
+    return tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__),
+                                                      tracemalloc.Filter(False, '<frozen importlib._bootstrap*>'),
+                                                      tracemalloc.Filter(False, '<unknown>')])
+
+# Function: Allocation profiler selected by PSYSYS_TRACEMALLOC (comma-separated callback names or 'all')
+# Snapshots go to PSYSYS_TRACEMALLOC_DIR every PSYSYS_TRACEMALLOC_INTERVAL seconds (default 60).
+def profiler_from_env(app):
+    selected = os.environ.get('PSYSYS_TRACEMALLOC', '').strip()
+    if not selected:
+        return None
+    names = None if selected == 'all' else {name.strip() for name in selected.split(',') if name.strip()}
+    return AllocationProfiler(app, names, os.environ.get('PSYSYS_TRACEMALLOC_DIR') or None,
+                              float(os.environ.get('PSYSYS_TRACEMALLOC_INTERVAL', '60'))).attach()
+
+# Function: Callback metrics selected by PSYSYS_METRICS (1 enables /metrics; none are recorded otherwise)
+def metrics_from_env(app):
+    if os.environ.get('PSYSYS_METRICS', '0') != '1':
+        return None
+    return CallbackMetrics(app, os.environ.get('PSYSYS_METRICS_DIR') or None).attach()
@@ -0,0 +1,236 @@
+# Server-side map images (matplotlib Agg, no browser)
+# render_map returns cached image bytes; submit_render queues a render in a bounded
+# pool (e.g. donation thumbnails, timeline previews) and returns a Future.
+# Usage: python render.py [data-donation] [-o renders] [--format png] [--workers 2]
+#        [--color-scheme Severity] [--sizing-scheme Severity] [--width 1200]
+# Renders every map file under the folder (any depth) to <output>/<relative path>.<format>.
+
+# Imports
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import hashlib
+import io
+import json
+import os
+import re
+import sys
+import threading
+import numpy as np
+from layouts import map_positions
+from mapdata import normalize_map, map_elements, decode_map, is_compact_map
+from styles import StyleSheet, default_stylesheet, node_selector, edge_selector
+
+# Output formats & image size (pixels at dpi; the height follows the map's aspect ratio)
+image_formats = ['png', 'svg']
+default_width = 1200
+dpi = 100
+
+# Cytoscape defaults for properties a stylesheet leaves out (px & CSS colors)
+node_defaults = {'background-color': '#999999', 'width': 30, 'height': 30, 'border-width': 0,
+                 'border-color': '#000000', 'font-size': 16, 'color': '#000000'}
+edge_defaults = {'line-color': '#999999', 'target-arrow-color': '#999999', 'width': 3, 'opacity': 1}
+arrow_scale = 3  # arrowhead length & width relative to the edge width
+
+# Maps rendered at once (PSYSYS_RENDER_WORKERS) & images kept in memory
+render_workers = int(os.environ.get('PSYSYS_RENDER_WORKERS', '2'))
+cache_size = 128
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_executor = None
+
+_rgb = re.compile(r'^rgba?\(\s*([\d.]+)\s*,\s*([\d.]+)\s*,\s*([\d.]+)\s*(?:,\s*([\d.]+)\s*)?\)$')
+
+# Function: CSS color (name, #hex, rgb() or rgba()) as an RGBA tuple
+def css_color(value, default):
+    from matplotlib.colors import to_rgba
+    match = _rgb.match(str(value).strip())
+    if match:
+        r, g, b, a = match.groups()
+        return int(float(r)) / 255, int(float(g)) / 255, int(float(b)) / 255, float(a) if a else 1.0
+    try:
+        return to_rgba(value)
+    except ValueError:
+        return to_rgba(default)
+
+# Function: Length in px (25, '25px' or '25')
+def css_px(value, default):
+    try:
+        return float(str(value).strip().removesuffix('px'))
+    except ValueError:
+        return float(default)
+
+# Function: Resolved style of an element (the kind's rule, its class rules, then its own rule)
+def element_style(sheet, kind, element_id, defaults, classes=''):
+    style = dict(defaults)
+    style.update(sheet.rules.get(kind, {}))
+    for name in classes.split():
+        style.update(sheet.rules.get(f'{kind}.{name}', {}))
+    if element_id is not None:
+        selector = node_selector(element_id) if kind == 'node' else edge_selector(element_id)
+        style.update(sheet.rules.get(selector, {}))
+    return style
+
+# Function: Draw a map to PNG or SVG bytes
+# Nodes are circles sized by their width (px, as in Cytoscape), edges straight
+# lines with triangle heads, self-loops small circles above the node.
+def draw_map(elements, stylesheet, fmt='png', width=default_width, positions=None):
+    from matplotlib.figure import Figure
+    from matplotlib.collections import EllipseCollection, LineCollection, PolyCollection
+
+    positions = positions or map_positions(elements)
+    sheet = StyleSheet(stylesheet if stylesheet is not None else default_stylesheet)
+    node_elements = [e for e in elements if 'source' not in e['data'] and e['data'].get('id') in positions]
+    nodes = [e['data'] for e in node_elements]
+    edges = [e['data'] for e in elements if 'source' in e['data']]
+    index = {node['id']: i for i, node in enumerate(nodes)}
+    node_styles = [element_style(sheet, 'node', e['data']['id'], node_defaults, e.get('classes', '')) for e in node_elements]
+    xy = np.array([[positions[node['id']]['x'], -positions[node['id']]['y']] for node in nodes]).reshape(-1, 2)
+    size = np.array([css_px(style['width'], 30) for style in node_styles])
+
+    # Frame the map with room for the largest node & its label
+    margin = (size.max() if len(size) else 30) + 40
+    low = xy.min(axis=0) - margin if len(xy) else np.array([-100.0, -100.0])
+    high = xy.max(axis=0) + margin if len(xy) else np.array([100.0, 100.0])
+    extent = high - low
+    height = max(1, round(width * extent[1] / extent[0]))
+    figure = Figure(figsize=(width / dpi, height / dpi), dpi=dpi)
+    ax = figure.add_axes([0, 0, 1, 1])
+    ax.set_xlim(low[0], high[0])
+    ax.set_ylim(low[1], high[1])
+    ax.set_aspect('equal')
+    ax.axis('off')
+    points_per_px = width / extent[0] * 72 / dpi
+
+    # Edges between two nodes (lines & arrowheads) and self-loops
+    links = [(index[e['source']], index[e['target']], element_style(sheet, 'edge', e.get('id'), edge_defaults))
+             for e in edges if e['source'] in index and e['target'] in index]
+    pairs = [(s, t, style) for s, t, style in links if s != t]
+    loops = [(s, style) for s, t, style in links if s == t]
+    if pairs:
+        source = xy[[s for s, _, _ in pairs]]
+        target = xy[[t for _, t, _ in pairs]]
+        line_width = np.array([css_px(style['width'], 3) for _, _, style in pairs])
+        opacity = np.array([float(style.get('opacity', 1)) for _, _, style in pairs])
+        line_color = np.array([css_color(style['line-color'], '#999999') for _, _, style in pairs])
+        arrow_color = np.array([css_color(style['target-arrow-color'], '#999999') for _, _, style in pairs])
+        line_color[:, 3] *= opacity
+        arrow_color[:, 3] *= opacity
+        direction = target - source
+        length = np.maximum(np.hypot(direction[:, 0], direction[:, 1]), 1e-9)[:, None]
+        unit = direction / length
+        normal = np.column_stack([-unit[:, 1], unit[:, 0]])
+        tip = target - unit * (size[[t for _, t, _ in pairs]][:, None] / 2)
+        base = tip - unit * (line_width[:, None] * arrow_scale)
+        side = normal * (line_width[:, None] * arrow_scale / 2)
+        ax.add_collection(LineCollection(np.stack([source, base], axis=1), colors=line_color,
+                                         linewidths=line_width * points_per_px, zorder=1))
+        ax.add_collection(PolyCollection(np.stack([tip, base + side, base - side], axis=1), facecolors=arrow_color,
+                                         edgecolors='none', zorder=1))
+    if loops:
+        radius = np.array([size[s] / 3 for s, _ in loops])
+        centres = xy[[s for s, _ in loops]] + np.column_stack([np.zeros(len(loops)), size[[s for s, _ in loops]] / 2])
+        colors = [css_color(style['line-color'], '#999999')[:3] + (float(style.get('opacity', 1)),) for _, style in loops]
+        ax.add_collection(EllipseCollection(radius * 2, radius * 2, np.zeros(len(loops)), units='xy', offsets=centres,
+                                            offset_transform=ax.transData, facecolors='none', edgecolors=colors,
+                                            linewidths=[css_px(style['width'], 3) * points_per_px for _, style in loops],
+                                            zorder=1))
+
+    # Nodes & their labels
+    if nodes:
+        ax.add_collection(EllipseCollection(size, size, np.zeros(len(nodes)), units='xy', offsets=xy,
+                                            offset_transform=ax.transData,
+                                            facecolors=[css_color(style['background-color'], '#999999') for style in node_styles],
+                                            edgecolors=[css_color(style['border-color'], '#000000') for style in node_styles],
+                                            linewidths=[css_px(style['border-width'], 0) * points_per_px for style in node_styles],
+                                            zorder=2))
+        for node, (x, y), style, diameter in zip(nodes, xy, node_styles, size):
+            if str(style.get('label', '')).startswith('data('):
+                ax.text(x, y + diameter / 2 + 4, node.get('label', node['id']), ha='center', va='bottom', zorder=3,
+                        fontsize=css_px(style['font-size'], 16) * points_per_px, color=css_color(style['color'], '#000000'))
+
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format=fmt, dpi=dpi)
+    return buffer.getvalue()
+
+# Function: Elements & stylesheet of a map file (any export, donation or version 2 map)
+# With a color or sizing scheme, the scheme is applied as in the editing tab.
+def map_scene(data, color_scheme=None, sizing_scheme=None, path=None):
+    if is_compact_map(data):
+        data = decode_map(data, metrics=False)
+    normalized = normalize_map(data, path)
+    graph_data = {'elements': map_elements(normalized), 'stylesheet': data.get('stylesheet') or default_stylesheet}
+    if color_scheme or sizing_scheme:
+        import functions
+        if color_scheme:
+            graph_data = functions.color_scheme(color_scheme, graph_data, normalized['severity'])
+        if sizing_scheme:
+            graph_data = functions.node_sizing(sizing_scheme, graph_data, normalized['severity'])
+    return graph_data['elements'], graph_data['stylesheet']
+
+# Function: Image of a map (bytes), cached by map content, scheme & format
+def render_map(data, fmt='png', color_scheme=None, sizing_scheme=None, width=default_width):
+    if fmt not in image_formats:
+        raise ValueError(f"Unsupported image format: {fmt}")
+    content = json.dumps(data, sort_keys=True, separators=(',', ':'), default=str).encode('utf-8')
+    key = (hashlib.blake2b(content, digest_size=16).hexdigest(), color_scheme, sizing_scheme, fmt, width)
+    with _cache_lock:
+        image = _cache.get(key)
+        if image is not None:
+            _cache.move_to_end(key)
+            return image
+    elements, stylesheet = map_scene(data, color_scheme, sizing_scheme)
+    image = draw_map(elements, stylesheet, fmt, width)
+    with _cache_lock:
+        _cache[key] = image
+        if len(_cache) > cache_size:
+            _cache.popitem(last=False)
+    return image
+
+# Function: Render a map in the background pool (returns a Future of the image bytes)
+# At most render_workers maps are drawn at once; further requests wait in the queue.
+def submit_render(data, fmt='png', color_scheme=None, sizing_scheme=None, width=default_width):
+    global _executor
+    with _cache_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=render_workers, thread_name_prefix='render')
+    return _executor.submit(render_map, data, fmt, color_scheme, sizing_scheme, width)
+
+# Function: Render one map file to the output folder (bulk mode)
+def render_file(path, root, output, fmt, color_scheme, sizing_scheme, width):
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    elements, stylesheet = map_scene(data, color_scheme, sizing_scheme, path)
+    target = os.path.join(output, os.path.splitext(os.path.relpath(path, root))[0] + f'.{fmt}')
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(target, 'wb') as f:
+        f.write(draw_map(elements, stylesheet, fmt, width))
+    return target
+
+if __name__ == '__main__':
+    from analytics import iter_donations, bounded_map
+    parser = argparse.ArgumentParser(description="Render map files to images on the server.")
+    parser.add_argument('root', nargs='?', default='data-donation', help="folder of map files")
+    parser.add_argument('-o', '--output', default='renders', help="image folder")
+    parser.add_argument('--format', default='png', choices=image_formats)
+    parser.add_argument('--workers', type=int, default=render_workers, help="maps rendered at once")
+    parser.add_argument('--color-scheme', default=None, help="re-color the maps (e.g. Severity, Out-degree)")
+    parser.add_argument('--sizing-scheme', default=None, help="re-size the nodes (e.g. Severity, In-degree)")
+    parser.add_argument('--width', type=int, default=default_width, help="image width in pixels")
+    args = parser.parse_args()
+
+    def render(path):
+        try:
+            return render_file(path, args.root, args.output, args.format, args.color_scheme, args.sizing_scheme, args.width), None
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as error:
+            return None, f"{path}: {error}"
+
+    rendered, failed = 0, 0
+    with ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix='render') as executor:
+        for target, error in bounded_map(executor, render, iter_donations(args.root), args.workers * 4):
+            if error:
+                failed += 1
+                print(f"Skipped {error}", file=sys.stderr)
+            else:
+                rendered += 1
+    print(f"Rendered {rendered} maps ({failed} skipped) into {args.output}")
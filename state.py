@@ -0,0 +1,280 @@
+# Imports
+from collections import OrderedDict
+import copy
+import functools
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dash import dcc, Patch
+from dash._callback import NoUpdate
+from dash.dependencies import Input, Output, State
+from background import background_job
+
+# Class: In-process LRU tier (one worker)
+class MemoryBackend:
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # (token, store id) -> (version, json text)
+        self.lock = threading.Lock()
+
+    def get(self, token, store_id, version=None):
+        with self.lock:
+            entry = self.entries.get((token, store_id))
+            if entry is None:
+                return None
+            self.entries.move_to_end((token, store_id))
+            return entry
+
+    def put(self, token, store_id, version, text):
+        with self.lock:
+            self.entries[(token, store_id)] = (version, text)
+            self.entries.move_to_end((token, store_id))
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def set(self, token, store_id, text):
+        with self.lock:
+            previous = self.entries.get((token, store_id))
+        version = (previous[0] if previous else 0) + 1
+        self.put(token, store_id, version, text)
+        return version
+
+# Class: On-disk SQLite tier (shared by all gunicorn workers on a machine)
+class SQLiteBackend:
+
+    def __init__(self, path, max_age=7 * 24 * 3600):
+        self.path = path
+        self.local = threading.local()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = self._connection()
+        conn.execute('CREATE TABLE IF NOT EXISTS state (token TEXT, store TEXT, version INTEGER, data TEXT, '
+                     'updated REAL, PRIMARY KEY (token, store))')
+        # Forget sessions nobody has touched for a while
+        conn.execute('DELETE FROM state WHERE updated < ?', (time.time() - max_age,))
+
+    def _connection(self):
+        conn = getattr(self.local, 'conn', None)
+        # A forked process (e.g. a background callback job) must not reuse its parent's connection
+        if conn is None or self.local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self.local.conn = conn
+            self.local.pid = os.getpid()
+        return conn
+
+    def get(self, token, store_id, version=None):
+        row = self._connection().execute('SELECT version, data FROM state WHERE token = ? AND store = ?',
+                                         (token, store_id)).fetchone()
+        return tuple(row) if row else None
+
+    def set(self, token, store_id, text):
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT version FROM state WHERE token = ? AND store = ?', (token, store_id)).fetchone()
+            version = (row[0] if row else 0) + 1
+            conn.execute('INSERT OR REPLACE INTO state VALUES (?, ?, ?, ?, ?)',
+                         (token, store_id, version, text, time.time()))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return version
+
+# Class: LRU in front of SQLite; the version in the browser tells whether the cached copy is current
+class TieredBackend:
+
+    def __init__(self, memory, disk):
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, token, store_id, version=None):
+        entry = self.memory.get(token, store_id)
+        if entry is not None and (version is None or entry[0] == version):
+            return entry
+        entry = self.disk.get(token, store_id)
+        if entry is not None:
+            self.memory.put(token, store_id, *entry)
+        return entry
+
+    def set(self, token, store_id, text):
+        version = self.disk.set(token, store_id, text)
+        self.memory.put(token, store_id, version, text)
+        return version
+
+# Function: Backend selected by PSYSYS_STATE_BACKEND (browser, memory, sqlite or tiered)
+def backend_from_env():
+    kind = os.environ.get('PSYSYS_STATE_BACKEND', 'tiered').lower()
+    path = os.environ.get('PSYSYS_STATE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'state', 'psysys-state.sqlite3'))
+    max_entries = int(os.environ.get('PSYSYS_STATE_CACHE', 1024))
+    if kind == 'browser':
+        return None
+    if kind == 'memory':
+        return MemoryBackend(max_entries)
+    if kind == 'sqlite':
+        return SQLiteBackend(path)
+    return TieredBackend(MemoryBackend(max_entries), SQLiteBackend(path))
+
+# Function: Apply the operations of a dash.Patch to a value (as the Dash renderer does)
+def apply_patch(value, patch):
+    value = copy.deepcopy(value)
+    for op in patch.to_plotly_json()['operations']:
+        *path, key = op['location'] or [None]
+        params = op['params']
+        parent = value
+        for step in path:
+            parent = parent[step]
+        if key is None:
+            target, parent, key = value, None, None
+        else:
+            target = parent[key] if not isinstance(parent, dict) or key in parent else None
+        name = op['operation']
+        if name == 'Assign':
+            parent[key] = params['value']
+            continue
+        if name == 'Delete':
+            del parent[key]
+            continue
+        if name == 'Merge':
+            result = {**target, **params['value']}
+        elif name == 'Extend':
+            result = target + list(params['value'])
+        elif name == 'Append':
+            result = target + [params['value']]
+        elif name == 'Prepend':
+            result = [params['value']] + target
+        elif name == 'Insert':
+            result = target[:params['index']] + [params['value']] + target[params['index']:]
+        elif name == 'Remove':
+            result = [item for item in target if item != params['value']]
+        elif name == 'Clear':
+            result = type(target)()
+        elif name == 'Reverse':
+            result = target[::-1]
+        elif name == 'Add':
+            result = target + params['value']
+        elif name == 'Sub':
+            result = target - params['value']
+        elif name == 'Mul':
+            result = target * params['value']
+        elif name == 'Div':
+            result = target / params['value']
+        else:
+            raise ValueError(f"Invalid patch operation {name}")
+        if parent is None:
+            value = result
+        else:
+            parent[key] = result
+    return value
+
+# Function: Check if a store value is a server-side reference
+def is_ref(value):
+    return isinstance(value, dict) and set(value) == {'token', 'version'}
+
+# Class: Server-side dcc.Store contents
+# Registered stores hold only {'token', 'version'} in the browser; callbacks
+# registered through ServerState.callback receive and return the full data as
+# before. Without a backend every store keeps its data in the browser.
+class ServerState:
+
+    def __init__(self, app, backend=None):
+        self.app = app
+        self.backend = backend
+        self.defaults = {}
+        self.observer = None  # called with (store id, 'load' or 'save', size in bytes), e.g. for metrics
+
+    @property
+    def enabled(self):
+        return self.backend is not None
+
+    def new_token(self):
+        return uuid.uuid4().hex
+
+    # Register a store kept on the server & its initial data
+    def register(self, store_id, data):
+        self.defaults[store_id] = data
+
+    # Layout component for a registered store
+    def store(self, store_id, token, **kwargs):
+        data = {'token': token, 'version': 0} if self.enabled else copy.deepcopy(self.defaults[store_id])
+        return dcc.Store(id=store_id, data=data, **kwargs)
+
+    def load(self, store_id, value):
+        if not is_ref(value):
+            return value
+        entry = self.backend.get(value['token'], store_id, value['version'])
+        if entry is None:
+            return copy.deepcopy(self.defaults[store_id])
+        if self.observer:
+            self.observer(store_id, 'load', len(entry[1]))
+        return json.loads(entry[1])
+
+    def save(self, store_id, value, current):
+        if isinstance(value, NoUpdate):
+            return value
+        if isinstance(value, Patch):
+            value = apply_patch(self.load(store_id, current), value)
+        token = current['token'] if is_ref(current) else self.new_token()
+        text = json.dumps(value)
+        if self.observer:
+            self.observer(store_id, 'save', len(text))
+        version = self.backend.set(token, store_id, text)
+        return {'token': token, 'version': version}
+
+    # Drop-in replacement for app.callback
+    # Background callbacks run inside background_job; with progress outputs, Dash
+    # passes set_progress first, which the callback reaches through report_progress.
+    def callback(self, *args, **kwargs):
+        background = kwargs.get('background', False)
+        progress = background and kwargs.get('progress') is not None
+
+        def job(func):
+            @functools.wraps(func)
+            def wrapper(*values):
+                with background_job(values[0] if progress else None):
+                    return func(*(values[1:] if progress else values))
+            return wrapper if background else func
+
+        if not self.enabled:
+            return lambda func: self.app.callback(*args, **kwargs)(job(func))
+
+        outputs, deps = [], []
+        for arg in args:
+            for dep in (arg if isinstance(arg, (list, tuple)) else [arg]):
+                if isinstance(dep, Output):
+                    outputs.append(dep)
+                elif isinstance(dep, (Input, State)):
+                    deps.append(dep)
+        multi = isinstance(args[0], (list, tuple)) or len(outputs) > 1
+
+        def stored(dep):
+            return isinstance(dep.component_id, str) and dep.component_id in self.defaults and dep.component_property == 'data'
+
+        loads = [dep.component_id if stored(dep) else None for dep in deps]
+        saves = [dep.component_id if stored(dep) else None for dep in outputs]
+        # Hidden State per stored output the callback does not read, so its token is always known
+        hidden = [State(store_id, 'data') for store_id in dict.fromkeys(saves) if store_id and store_id not in loads]
+
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*values):
+                raw = dict(zip(loads + [dep.component_id for dep in hidden], values))
+                values = values[:len(deps)]
+                values = [self.load(store_id, value) if store_id else value for store_id, value in zip(loads, values)]
+                result = func(*values)
+                if isinstance(result, NoUpdate) or not any(saves):
+                    return result
+                results = list(result) if multi else [result]
+                for i, store_id in enumerate(saves):
+                    if store_id:
+                        results[i] = self.save(store_id, results[i], raw.get(store_id))
+                return results if multi else results[0]
+
+            return self.app.callback(*args, *hidden, **kwargs)(job(wrapper))
+        return decorator
@@ -0,0 +1,87 @@
+# Imports
+import re
+
+# Default node & edge rules every map starts from
+default_stylesheet = [{'selector': 'node', 'style': {'background-color': 'blue', 'label': 'data(label)'}},
+                      {'selector': 'edge', 'style': {'curve-style': 'bezier', 'target-arrow-shape': 'triangle'}}]
+
+# Function: Canonicalize a selector (node[id = "x"] -> node[id="x"])
+def canonical_selector(selector):
+    return re.sub(r'\[\s*([\w-]+)\s*([\^$*!]?=)\s*', r'[\1\2', selector.strip())
+
+# Function: Quote a value for use in a selector
+def selector_value(value):
+    value = str(value).replace('\\', '\\\\').replace('"', '\\"')
+    return f'"{value}"'
+
+# Function: Selector for a single node
+def node_selector(node_id):
+    return f'node[id={selector_value(node_id)}]'
+
+# Function: Selector for a single edge
+def edge_selector(edge_id):
+    return f'edge[id={selector_value(edge_id)}]'
+
+# Function: Selector for all edges leaving a node
+def source_selector(node_id):
+    return f'edge[source={selector_value(node_id)}]'
+
+# Function: Selector for all edges entering a node
+def target_selector(node_id):
+    return f'edge[target={selector_value(node_id)}]'
+
+# Class: Stylesheet keyed by (selector, property)
+# Setting a property that already exists replaces it in place, so re-applying a
+# scheme never grows the stylesheet. Rules keep the order in which their
+# selector was first seen, which is the order Cytoscape cascades them in.
+class StyleSheet:
+
+    def __init__(self, stylesheet=None):
+        self.rules = {}
+        for rule in stylesheet or []:
+            self.set(rule.get('selector', ''), rule.get('style', {}))
+
+    def __len__(self):
+        return len(self.rules)
+
+    def get(self, selector, prop, default=None):
+        return self.rules.get(canonical_selector(selector), {}).get(prop, default)
+
+    # Set (or replace) the properties of a selector
+    def set(self, selector, style):
+        selector = canonical_selector(selector)
+        if not selector:
+            return self
+        self.rules.setdefault(selector, {}).update(style)
+        return self
+
+    # Remove properties from a selector, or from all per-element selectors of a kind
+    def drop(self, *props, selector=None, kind=None):
+        if selector is not None:
+            selectors = [canonical_selector(selector)]
+        else:
+            selectors = [s for s in self.rules if kind is None or s.startswith(f'{kind}[')]
+        for s in selectors:
+            style = self.rules.get(s)
+            if style is None:
+                continue
+            for prop in props:
+                style.pop(prop, None)
+            if not style:
+                del self.rules[s]
+        return self
+
+    # Remove a value from every selector carrying it (e.g. a red target border)
+    def drop_value(self, prop, value):
+        for s in [s for s, style in self.rules.items() if style.get(prop) == value]:
+            del self.rules[s][prop]
+            if not self.rules[s]:
+                del self.rules[s]
+        return self
+
+    def to_list(self):
+        return [{'selector': s, 'style': dict(style)} for s, style in self.rules.items() if style]
+
+# Function: Collapse a (possibly bloated) stylesheet to one rule per selector
+def compact_stylesheet(stylesheet):
+    return StyleSheet(stylesheet).to_list()
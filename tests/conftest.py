@@ -0,0 +1,24 @@
+# Imports
+import os
+import sys
+
+# The app modules live at the repository root; sessions are kept in memory while testing
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('PSYSYS_STATE_BACKEND', 'memory')
+os.environ.setdefault('PSYSYS_BACKGROUND', '0')
+os.environ.setdefault('PSYSYS_IMAGE_DERIVATIVES', '0')
+
+import inspect
+import pytest
+
+# Fixture: Undecorated app callback by function name (called with plain store values)
+@pytest.fixture(scope='session')
+def app_callback():
+    import app_ver02
+    callbacks = {}
+    for spec in app_ver02.app.callback_map.values():
+        if 'callback' not in spec:
+            continue  # clientside
+        func = inspect.unwrap(spec['callback'])
+        callbacks[func.__name__] = func
+    return callbacks.__getitem__
@@ -0,0 +1,34 @@
+# Imports
+import copy
+import os
+import sys
+import tracemalloc
+import pytest
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+from bench_allocations import allocation_steps, check_step, module_defaults, mutated_defaults
+from bench_hotpaths import synthetic_session
+
+steps = allocation_steps()
+
+@pytest.fixture(scope='module')
+def defaults_before():
+    return copy.deepcopy(module_defaults())
+
+@pytest.fixture
+def traced():
+    tracemalloc.start()
+    yield
+    tracemalloc.stop()
+
+# Repeating a step on the same session data neither grows its stylesheet nor keeps memory
+@pytest.mark.parametrize('name', list(steps))
+def test_step_does_not_grow(name, defaults_before, traced):
+    problems, _, _ = check_step(steps[name], 60, 8, 64 * 1024)
+    assert not problems, f"{name}: {'; '.join(problems)}"
+
+# Runs after the steps (tests run in file order): none of them changed a module-level default
+def test_steps_leave_defaults_unchanged(defaults_before):
+    for step in steps.values():
+        session_data, severity = synthetic_session(20)
+        step(session_data, severity)
+    assert mutated_defaults(defaults_before) == []
@@ -0,0 +1,81 @@
+# Imports
+import pytest
+from diff import diff_elements, map_diff, timeline_diffs
+from metrics import degree_metrics, get_metric, map_structure
+from test_history import timeline
+
+# Function: Diff of two maps computed directly from their node & edge sets
+def expected_diff(before, after, metrics):
+    (elements_a, severity_a), (elements_b, severity_b) = before, after
+    nodes_a, edges_a = map_structure(elements_a)
+    nodes_b, edges_b = map_structure(elements_b)
+    both = set(nodes_a) & set(nodes_b)
+    severity = {node: severity_b[node] - severity_a[node] for node in both
+                if node in severity_a and node in severity_b and severity_b[node] != severity_a[node]}
+    centrality = {}
+    for name in metrics:
+        values_a, values_b = get_metric(elements_a, name), get_metric(elements_b, name)
+        centrality[name] = {node: values_b[node] - values_a[node] for node in both if values_b[node] != values_a[node]}
+    return {'added-nodes': set(nodes_b) - set(nodes_a), 'removed-nodes': set(nodes_a) - set(nodes_b),
+            'added-edges': set(edges_b) - set(edges_a), 'removed-edges': set(edges_a) - set(edges_b),
+            'severity': severity, 'centrality': centrality}
+
+def comparable(diff):
+    return dict(diff, **{key: set(diff[key]) for key in ('added-nodes', 'removed-nodes')},
+                **{key: {tuple(edge) for edge in diff[key]} for key in ('added-edges', 'removed-edges')})
+
+@pytest.mark.parametrize('seed', range(5))
+def test_timeline_diffs_match_pairwise_diffs(seed):
+    metrics = degree_metrics + ['betweenness']
+    snapshots = [(elements, severity) for _, elements, severity in timeline(12, seed)]
+    diffs = timeline_diffs(snapshots, metrics)
+    assert len(diffs) == len(snapshots) - 1
+    for pair, diff in enumerate(diffs):
+        expected, actual = expected_diff(snapshots[pair], snapshots[pair + 1], metrics), comparable(diff)
+        for key in ('added-nodes', 'removed-nodes', 'added-edges', 'removed-edges'):
+            assert actual[key] == expected[key], key
+        assert diff['severity'] == expected['severity']
+        for name in metrics:
+            assert diff['centrality'][name] == pytest.approx(expected['centrality'][name]), name
+        assert comparable(map_diff(*snapshots[pair], *snapshots[pair + 1], metrics)) == actual
+
+@pytest.mark.parametrize('snapshots', [[], [([], {})]])
+def test_short_timelines_have_no_diffs(snapshots):
+    assert timeline_diffs(snapshots) == []
+
+def test_diff_of_two_maps():
+    before = [{'data': {'id': 'a'}}, {'data': {'id': 'b'}}, {'data': {'source': 'a', 'target': 'b'}}]
+    after = [{'data': {'id': 'a'}}, {'data': {'id': 'c'}}, {'data': {'source': 'a', 'target': 'c'}}]
+    diff = map_diff(before, {'a': 4, 'b': 2}, after, {'a': 6})
+    assert diff['added-nodes'] == ['c'] and diff['removed-nodes'] == ['b']
+    assert diff['added-edges'] == [['a', 'c']] and diff['removed-edges'] == [['a', 'b']]
+    assert diff['severity'] == {'a': 2}
+    assert diff['centrality']['out-degree'] == {}
+
+def test_diff_elements_mark_the_later_map():
+    before = [{'data': {'id': 'a'}}, {'data': {'id': 'b'}}, {'data': {'id': 'd'}},
+              {'data': {'source': 'a', 'target': 'b'}}, {'data': {'source': 'a', 'target': 'd'}}]
+    after = [{'data': {'id': 'a'}, 'classes': 'selected'}, {'data': {'id': 'c'}}, {'data': {'id': 'd'}},
+             {'data': {'source': 'a', 'target': 'c'}}, {'data': {'source': 'a', 'target': 'd'}}]
+    diff = map_diff(before, {'a': 4, 'd': 5}, after, {'a': 6, 'd': 1})
+    marked = diff_elements(after, before, diff)
+    classes = [(element['data'].get('id') or (element['data']['source'], element['data']['target']), element.get('classes'))
+               for element in marked]
+    assert classes == [('a', 'selected diff-worse'), ('c', 'diff-added'), ('d', 'diff-better'),
+                       (('a', 'c'), 'diff-added'), (('a', 'd'), None),
+                       ('b', 'diff-removed'), (('a', 'b'), 'diff-removed')]
+    assert after[0]['classes'] == 'selected'  # the map itself is not changed
+
+# Every element of both maps shows up once: the later map as it is, removed ones as faded copies
+@pytest.mark.parametrize('seed', range(5))
+def test_diff_elements_keep_every_element_once(seed):
+    maps = timeline(6, seed)
+    for (_, elements_a, severity_a), (_, elements_b, severity_b) in zip(maps, maps[1:]):
+        diff = map_diff(elements_a, severity_a, elements_b, severity_b)
+        marked = diff_elements(elements_b, elements_a, diff)
+        assert [dict(e, classes=None) for e in marked[:len(elements_b)]] == [dict(e, classes=None) for e in elements_b]
+        removed = marked[len(elements_b):]
+        assert all(e['classes'] == 'diff-removed' for e in removed)
+        nodes = {e['data']['id'] for e in removed if 'source' not in e['data']}
+        edges = {(e['data']['source'], e['data']['target']) for e in removed if 'source' in e['data']}
+        assert nodes == set(diff['removed-nodes']) and edges == {tuple(edge) for edge in diff['removed-edges']}
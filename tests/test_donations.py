@@ -0,0 +1,99 @@
+# Imports
+import json
+import logging
+import os
+import donations
+from donations import DonationQueue, LocalSink, sink_from_env
+
+class FailingSink:
+
+    def __init__(self):
+        self.calls = 0
+
+    def send(self, key, data):
+        self.calls += 1
+        raise OSError('unreachable')
+
+def donation(n=0):
+    return {'elements': [{'data': {'id': f'Factor {n}'}}], 'date': '2026-01-01'}
+
+def test_donations_reach_the_sink(tmp_path):
+    queue = DonationQueue(str(tmp_path / 'spool'), LocalSink(str(tmp_path / 'out')))
+    for n in range(3):
+        queue.submit(donation(n), send=False)
+    queue.drain_once()
+    assert queue.pending() == 0 and len(os.listdir(tmp_path / 'out')) == 3
+
+# The backoff is kept in the spool, so another process (or a restart) waits as well
+def test_retry_state_is_shared_through_the_spool(tmp_path, caplog):
+    spool = str(tmp_path / 'spool')
+    sink = FailingSink()
+    key = DonationQueue(spool, sink).submit(donation(), send=False)
+    with caplog.at_level(logging.WARNING, logger='donations'):
+        DonationQueue(spool, sink).drain_once()
+    assert 'attempt 1' in caplog.text
+    [name] = os.listdir(os.path.join(spool, 'pending'))
+    assert donations.parse_name(name)[:2] == (key, 1)
+    DonationQueue(spool, sink).drain_once()
+    assert sink.calls == 1
+
+def test_donations_fail_after_max_attempts(tmp_path, caplog):
+    spool = str(tmp_path / 'spool')
+    sink = FailingSink()
+    queue = DonationQueue(spool, sink, base_delay=0, max_attempts=3)
+    key = queue.submit(donation(), send=False)
+    with caplog.at_level(logging.ERROR, logger='donations'):
+        for _ in range(5):
+            queue.drain_once()
+    assert sink.calls == 3 and queue.pending() == 0
+    assert os.listdir(os.path.join(spool, 'failed')) == [f'{key}.json']
+    with open(os.path.join(spool, 'failed', f'{key}.json'), encoding='utf-8') as f:
+        assert json.load(f) == donation()
+    assert 'failed 3 times' in caplog.text
+
+def test_stale_claims_keep_their_attempts(tmp_path):
+    spool = str(tmp_path / 'spool')
+    queue = DonationQueue(spool, FailingSink())
+    key = queue.submit(donation(), send=False)
+    os.replace(os.path.join(spool, 'pending', f'{key}.json'), os.path.join(spool, 'inflight', f'{key}.4.123.json'))
+    queue.recover(max_age=-1)
+    [name] = os.listdir(os.path.join(spool, 'pending'))
+    assert donations.parse_name(name) == (key, 4, 0)
+
+def test_github_sink_without_token_falls_back_to_local(tmp_path, monkeypatch, caplog):
+    monkeypatch.setenv('PSYSYS_DONATION_SINK', 'github')
+    monkeypatch.delenv('PSYSYS_GITHUB_TOKEN', raising=False)
+    monkeypatch.setenv('PSYSYS_DONATION_DIR', str(tmp_path / 'out'))
+    with caplog.at_level(logging.WARNING, logger='donations'):
+        assert isinstance(sink_from_env(), LocalSink)
+    assert 'PSYSYS_GITHUB_TOKEN' in caplog.text
+
+# A donation waiting for a retry, in flight or failed is not spooled a second time
+def test_resubmits_are_not_spooled_again(tmp_path):
+    spool = str(tmp_path / 'spool')
+    queue = DonationQueue(spool, FailingSink(), base_delay=60, max_attempts=2)
+    key = queue.submit(donation(), send=False)
+    queue.drain_once()
+    queue.submit(donation(), send=False)
+    [name] = os.listdir(os.path.join(spool, 'pending'))
+    assert donations.parse_name(name)[:2] == (key, 1)
+    os.replace(os.path.join(spool, 'pending', name), os.path.join(spool, 'inflight', f'{key}.1.123.json'))
+    queue.submit(donation(), send=False)
+    assert queue.pending() == 0
+    os.replace(os.path.join(spool, 'inflight', f'{key}.1.123.json'), os.path.join(spool, 'failed', f'{key}.json'))
+    queue.submit(donation(), send=False)
+    assert queue.pending() == 0
+    queue.submit(donation(1), send=False)
+    assert queue.pending() == 1
+
+def test_default_folders_do_not_depend_on_the_working_directory(tmp_path, monkeypatch):
+    assert donations.root == os.path.dirname(os.path.abspath(donations.__file__))
+    monkeypatch.setattr(donations, 'root', str(tmp_path / 'app'))
+    for name in ['PSYSYS_DONATION_SPOOL', 'PSYSYS_DONATION_DIR', 'PSYSYS_DONATION_SINK', 'PSYSYS_GITHUB_TOKEN']:
+        monkeypatch.delenv(name, raising=False)
+    (tmp_path / 'elsewhere').mkdir()
+    monkeypatch.chdir(tmp_path / 'elsewhere')
+    queue = donations.queue_from_env()
+    assert queue.spool == str(tmp_path / 'app' / 'donation-spool')
+    assert queue.sink.directory == str(tmp_path / 'app' / 'data-donation')
+    assert os.listdir(tmp_path / 'elsewhere') == []
@@ -0,0 +1,83 @@
+# Imports
+import copy
+import pytest
+import dash
+from dash import Patch
+import functions
+from layouts import map_positions
+from state import apply_patch
+
+def edit_map():
+    elements = [{'data': {'id': name, 'label': name}} for name in ['Worry', 'Sleep', 'Stress', 'Rumination']]
+    elements += [{'data': {'id': f'{s}->{t}', 'source': s, 'target': t}}
+                 for s, t in [('Worry', 'Sleep'), ('Stress', 'Worry'), ('Rumination', 'Worry')]]
+    data = {'elements': elements, 'stylesheet': copy.deepcopy(functions.default_stylesheet), 'edges': []}
+    return functions.node_sizing('In-degree', functions.color_scheme('Out-degree', data, {}), {})
+
+# Edits reach the map through their own outputs; only navigation & loading a map rebuild the tab
+def test_edits_do_not_rebuild_the_map_tab():
+    import app_ver02
+    [spec] = [spec for key, spec in app_ver02.app.callback_map.items() if 'page-content.children' in key]
+    inputs = {(i['id'], i['property']) for i in spec['inputs']}
+    assert ('edit-map-data', 'data') not in inputs
+    assert {('url', 'pathname'), ('map-loaded', 'data')} <= inputs
+
+def test_loading_the_session_map_rebuilds_the_map_tab(app_callback):
+    data, loaded = app_callback('load_session_graph')(1, edit_map())
+    assert data['elements'] and loaded
+    assert app_callback('load_session_graph')(None, edit_map()) is dash.no_update
+
+# The shown layout only receives the positions that moved
+def test_adding_an_edge_between_placed_factors_keeps_the_layout(app_callback):
+    data = edit_map()
+    data['positions'] = map_positions(data['elements'])
+    result = app_callback('add_edge_output')(1, ['Sleep', 'Stress'], data, 'Out-degree', 'In-degree')
+    assert result[-1] is dash.no_update
+
+def test_a_new_factor_is_placed_through_the_layout(app_callback):
+    data = edit_map()
+    shown = map_positions(data['elements'])
+    layout = {'name': 'preset', 'positions': shown}
+    result = app_callback('map_add_node')(1, 'Fatigue', data, 'Out-degree', 'In-degree')
+    layout_patch, edit = result[-1], apply_patch(data, result[2])
+    assert isinstance(layout_patch, Patch)
+    locations = {op['location'][1] for op in layout_patch.to_plotly_json()['operations']}
+    assert 'Fatigue' in locations and locations <= set(edit['positions'])
+    assert apply_patch(layout, layout_patch)['positions'] == edit['positions']
+
+@pytest.mark.parametrize('name, args', [
+    ('delete_node', lambda data: (1, 'Worry', data, {}, {}, {}, 'Out-degree', 'In-degree')),
+    ('delete_edge_output', lambda data: (1, ['Worry', 'Sleep'], data, {}, 'Out-degree', 'In-degree')),
+])
+def test_removals_keep_the_shown_layout_in_sync(app_callback, name, args):
+    data = edit_map()
+    layout = {'name': 'preset', 'positions': map_positions(data['elements'])}
+    result = app_callback(name)(*args(data))
+    edit = apply_patch(data, result[2] if name == 'delete_node' else result[1])
+    if result[-1] is not dash.no_update:
+        layout = apply_patch(layout, result[-1])
+    assert all(layout['positions'][node] == position for node, position in edit['positions'].items())
+
+def dropdown_options(elements):
+    tab = functions.create_mental_health_map_tab({'elements': elements, 'stylesheet': []}, None, None)
+    def find(component):
+        if getattr(component, 'id', None) == 'edit-edge':
+            return component.options
+        children = getattr(component, 'children', None)
+        for child in children if isinstance(children, list) else [children] if children is not None else []:
+            found = find(child)
+            if found is not None:
+                return found
+    return find(tab)
+
+# A rename patches the dropdown option of that node, also after nodes without a label
+def test_rename_updates_its_own_dropdown_option(app_callback):
+    data = edit_map()
+    data['elements'].insert(0, {'data': {'id': 'Unlabeled'}})
+    options = dropdown_options(data['elements'])
+    assert [option['value'] for option in options] == ['Unlabeled', 'Worry', 'Sleep', 'Stress', 'Rumination']
+    result = app_callback('save_node_changes')(1, 'Insomnia', 6, data, {'id': 'Sleep', 'label': 'Sleep'}, {})
+    options = apply_patch(options, result[3])
+    assert {option['value']: option['label'] for option in options}['Sleep'] == 'Insomnia'
+    assert [option['label'] for option in options] == ['Unlabeled', 'Worry', 'Insomnia', 'Stress', 'Rumination']
+    assert apply_patch(data, result[2])['elements'][2]['data']['label'] == 'Insomnia'
@@ -0,0 +1,73 @@
+# Imports
+import copy
+import highlight
+from highlight import highlight_overlay, highlight_stylesheet, neighbourhood, neighbourhood_index
+from styles import default_stylesheet, node_selector, source_selector, target_selector
+
+# Worry -> Sleep -> Fatigue -> Worry (a cycle), Stress -> Worry, plus a duplicate edge & an isolated factor
+def chain_map():
+    elements = [{'data': {'id': name, 'label': name}} for name in ['Worry', 'Sleep', 'Fatigue', 'Stress', 'Alone']]
+    elements += [{'data': {'id': f'{s}->{t}{n}', 'source': s, 'target': t}}
+                 for n, (s, t) in enumerate([('Worry', 'Sleep'), ('Sleep', 'Fatigue'), ('Fatigue', 'Worry'),
+                                             ('Stress', 'Worry'), ('Worry', 'Sleep')])]
+    return elements
+
+def selected(overlay, opacity='1'):
+    return {part for rule in overlay if rule['style']['opacity'] == opacity for part in rule['selector'].split(',')}
+
+def test_index_lists_each_link_once():
+    _, index = neighbourhood_index(chain_map())
+    assert index['successors'] == {'Worry': ['Sleep'], 'Sleep': ['Fatigue'], 'Fatigue': ['Worry'],
+                                   'Stress': ['Worry'], 'Alone': []}
+    assert index['predecessors']['Worry'] == ['Fatigue', 'Stress']
+
+def test_neighbourhood_layers_stop_at_visited_nodes():
+    _, index = neighbourhood_index(chain_map())
+    assert neighbourhood(index, 'Worry') == [['Worry'], ['Sleep']]
+    assert neighbourhood(index, 'Worry', hops=5) == [['Worry'], ['Sleep'], ['Fatigue']]
+    assert neighbourhood(index, 'Worry', hops=2, direction='predecessors') == [['Worry'], ['Fatigue', 'Stress'], ['Sleep']]
+    assert neighbourhood(index, 'Alone', hops=3) == [['Alone']]
+
+# The tapped node, its direct effects & the edges leading there stay visible
+def test_overlay_shows_the_direct_effects():
+    overlay = highlight_overlay(chain_map(), 'Worry')
+    assert overlay[0] == {'selector': 'node, edge', 'style': {'opacity': highlight.dim_opacity}}
+    assert selected(overlay) == {node_selector('Worry'), node_selector('Sleep'), source_selector('Worry')}
+
+def test_overlay_follows_k_hops_upstream():
+    overlay = highlight_overlay(chain_map(), 'Worry', hops=2, direction='predecessors')
+    nodes = {node_selector(node) for node in ['Worry', 'Fatigue', 'Stress', 'Sleep']}
+    edges = {target_selector(node) for node in ['Worry', 'Fatigue']}
+    assert selected(overlay) == nodes | edges
+
+def test_unknown_or_isolated_nodes():
+    assert highlight_overlay(chain_map(), 'Missing') == []
+    assert selected(highlight_overlay(chain_map(), 'Alone')) == {node_selector('Alone')}
+
+def test_overlays_are_cached_per_map_version():
+    elements = chain_map()
+    version, index = neighbourhood_index(elements)
+    assert neighbourhood_index(copy.deepcopy(elements)) == (version, index)
+    overlay = highlight_overlay(elements, 'Stress')
+    assert highlight_overlay(copy.deepcopy(elements), 'Stress') is overlay
+    # An edit is a new version, with its own index & overlay
+    elements.append({'data': {'id': 'Stress->Sleep', 'source': 'Stress', 'target': 'Sleep'}})
+    assert neighbourhood_index(elements)[0] != version
+    assert selected(highlight_overlay(elements, 'Stress')) == {
+        node_selector('Stress'), node_selector('Worry'), node_selector('Sleep'), source_selector('Stress')}
+
+def test_highlighting_leaves_the_map_stylesheet_alone():
+    stylesheet = copy.deepcopy(default_stylesheet)
+    before = copy.deepcopy(stylesheet)
+    shown = highlight_stylesheet(stylesheet, chain_map(), 'Worry')
+    assert stylesheet == before
+    assert shown[:len(stylesheet)] == stylesheet and shown[len(stylesheet):] == highlight_overlay(chain_map(), 'Worry')
+
+def test_inspect_callback_keeps_the_stored_stylesheet(app_callback):
+    data = {'elements': chain_map(), 'stylesheet': copy.deepcopy(default_stylesheet)}
+    stored = copy.deepcopy(data)
+    update_stylesheet = app_callback('update_stylesheet')
+    shown = update_stylesheet({'id': 'Worry'}, [0], data)
+    assert shown[-1]['style'] == {'opacity': '1'} and data == stored
+    assert update_stylesheet({'id': 'Worry'}, [], data) == stored['stylesheet']
+    assert update_stylesheet(None, [0], data) == stored['stylesheet']
@@ -0,0 +1,104 @@
+# Imports
+import json
+import random
+import pytest
+from history import SnapshotHistory, snapshot_state
+
+# Function: A map evolving over a timeline; factors & links are added, renamed, re-scored and deleted
+def timeline(length, seed):
+    rng = random.Random(seed)
+    nodes, edges, severity, maps = {}, {}, {}, []
+    for step in range(length):
+        for _ in range(rng.randint(0, 3)):
+            node = f'Factor {rng.randrange(12)}'
+            nodes[node] = rng.choice([node, node.upper()])
+        for node in rng.sample(sorted(nodes), min(len(nodes), rng.randint(0, 2))):
+            del nodes[node]
+            edges = {edge: edge_id for edge, edge_id in edges.items() if node not in edge}
+            severity.pop(node, None)
+        for _ in range(rng.randint(0, 4)):
+            if nodes:
+                edge = (rng.choice(sorted(nodes)), rng.choice(sorted(nodes)))
+                edges[edge] = rng.choice([None, f'link {step}'])
+        for edge in rng.sample(sorted(edges), min(len(edges), rng.randint(0, 2))):
+            del edges[edge]
+        for node in rng.sample(sorted(nodes), min(len(nodes), rng.randint(0, 2))):
+            severity[node] = rng.randint(0, 10)
+        elements = [{'data': {'id': node, 'label': label}} for node, label in nodes.items()]
+        elements += [{'data': dict({'source': s, 'target': t}, **({'id': i} if i else {}))} for (s, t), i in edges.items()]
+        maps.append((f'map {step}', elements, dict(severity)))
+    return maps
+
+def unordered(elements):
+    return sorted(json.dumps(element, sort_keys=True) for element in elements)
+
+def build(maps, checkpoint_every=8):
+    history = SnapshotHistory(checkpoint_every)
+    for label, elements, severity in maps:
+        history.add(label, elements, severity)
+    return history
+
+def assert_restores(history, maps):
+    assert history.labels == [label for label, _, _ in maps]
+    for position, (label, elements, severity) in enumerate(maps):
+        assert history.state(position) == snapshot_state(elements, severity), label
+        restored, restored_severity = history.get(label)
+        assert unordered(restored) == unordered(elements) and restored_severity == severity, label
+
+# Lengths on both sides of the checkpoints (every 8th snapshot)
+@pytest.mark.parametrize('length', [1, 7, 8, 9, 16, 17, 30])
+@pytest.mark.parametrize('seed', range(4))
+def test_every_snapshot_is_restored(length, seed):
+    maps = timeline(length, seed)
+    history = build(maps)
+    assert_restores(history, maps)
+    assert [i for i, entry in enumerate(history.entries) if 'checkpoint' in entry] == list(range(0, length, 8))
+
+def test_snapshots_survive_the_store():
+    maps = timeline(20, 5)
+    stored = json.loads(json.dumps(build(maps).to_store()))
+    assert_restores(SnapshotHistory.from_store(stored), maps)
+
+# Removing a snapshot re-encodes the later ones, which moves them across checkpoints
+@pytest.mark.parametrize('position', [0, 3, 7, 8, 9, 15, 19])
+def test_snapshots_are_restored_after_a_removal(position):
+    maps = timeline(20, position)
+    history = build(maps)
+    history.remove(maps[position][0])
+    del maps[position]
+    assert_restores(history, maps)
+    assert all(('checkpoint' in entry) == (i % 8 == 0) for i, entry in enumerate(history.entries))
+
+def test_snapshots_are_restored_after_many_removals():
+    rng = random.Random(0)
+    maps = timeline(25, 9)
+    history = build(maps, checkpoint_every=4)
+    while maps:
+        label = rng.choice(maps)[0]
+        history.remove(label)
+        maps = [entry for entry in maps if entry[0] != label]
+        assert_restores(history, maps)
+
+def test_adding_a_label_again_replaces_it():
+    maps = timeline(12, 2)
+    history = build(maps)
+    _, elements, severity = maps[3]
+    history.add('map 3', elements[:1], {})
+    maps = maps[:3] + maps[4:] + [('map 3', elements[:1], {})]
+    assert_restores(history, maps)
+
+def test_live_entries_carry_no_data():
+    history = build(timeline(3, 0))
+    history.add_live('PsySys map')
+    assert 'PsySys map' in history and history.is_live('PsySys map') and len(history) == 3
+    history.remove('PsySys map')
+    assert 'PsySys map' not in history
+
+# Sessions from before the timeline stored every map in full
+def test_old_comparison_stores_are_read():
+    maps = timeline(10, 3)
+    old = {label: {'elements': elements, 'stylesheet': []} for label, elements, _ in maps}
+    old['PsySys map'] = {}
+    history = SnapshotHistory.from_store(old)
+    assert_restores(history, [(label, elements, {}) for label, elements, _ in maps])
+    assert history.is_live('PsySys map')
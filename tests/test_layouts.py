@@ -0,0 +1,89 @@
+# Imports
+import math
+import layouts
+from layouts import layout_positions, map_layout, map_positions
+from test_history import build
+
+def chain(names, links=None):
+    elements = [{'data': {'id': name, 'label': name}} for name in names]
+    links = links if links is not None else list(zip(names, names[1:]))
+    return elements + [{'data': {'id': f'{s}->{t}', 'source': s, 'target': t}} for s, t in links]
+
+def distance(a, b):
+    return math.hypot(a['x'] - b['x'], a['y'] - b['y'])
+
+# Known factors may settle a little in a warm start, well under the distance between linked factors
+drift = layouts.spacing / 2
+
+def test_layouts_are_deterministic_and_cached(monkeypatch):
+    elements = chain([f'Factor {n}' for n in range(12)])
+    positions = map_positions(elements)
+    assert set(positions) == {f'Factor {n}' for n in range(12)}
+    # The same structure is served from the cache, a fresh computation gives the same layout
+    assert map_positions(chain([f'Factor {n}' for n in range(12)])) is positions
+    monkeypatch.setattr(layouts, '_cache', type(layouts._cache)())
+    assert map_positions(elements) == positions
+
+def test_structure_changes_are_laid_out_again(monkeypatch):
+    calls = []
+    compute = layouts.compute_layout
+    monkeypatch.setattr(layouts, 'compute_layout', lambda *args: calls.append(args) or compute(*args))
+    monkeypatch.setattr(layouts, '_cache', type(layouts._cache)())
+    names = ['Worry', 'Sleep', 'Stress']
+    map_positions(chain(names))
+    map_positions(chain(names))
+    # Labels & styling do not change the structure, links do
+    relabelled = chain(names)
+    relabelled[0]['data']['label'] = 'Worrying'
+    map_positions(relabelled)
+    map_positions(chain(names, [('Worry', 'Stress')]))
+    assert len(calls) == 2
+
+def test_factors_are_spread_out_and_links_pull_together():
+    names = [f'Factor {n}' for n in range(20)]
+    positions = map_positions(chain(names, [(names[0], names[1])]))
+    pairs = [(a, b) for i, a in enumerate(names) for b in names[i + 1:]]
+    assert min(distance(positions[a], positions[b]) for a, b in pairs) > layouts.spacing / 4
+    average = sum(distance(positions[a], positions[b]) for a, b in pairs) / len(pairs)
+    assert distance(positions[names[0]], positions[names[1]]) < average
+
+def test_warm_start_keeps_known_factors_in_place():
+    names = [f'Factor {n}' for n in range(10)]
+    shown = map_positions(chain(names))
+    positions = map_positions(chain(names + ['New'], list(zip(names, names[1:])) + [('Factor 3', 'New')]), shown)
+    assert max(distance(positions[name], shown[name]) for name in names) < drift
+    others = [distance(positions['New'], shown[name]) for name in names if name != 'Factor 3']
+    assert distance(positions['New'], shown['Factor 3']) < sum(others) / len(others)
+
+# Removing a factor or link moves nothing
+def test_known_positions_are_returned_unchanged():
+    names = ['Worry', 'Sleep', 'Stress', 'Rumination']
+    shown = map_positions(chain(names))
+    assert map_positions(chain(names[:3]), shown) == {name: shown[name] for name in names[:3]}
+    assert map_positions(chain(names, []), shown) == shown
+
+def test_small_and_dangling_maps():
+    assert map_positions([]) == {}
+    assert list(map_positions(chain(['Alone']))) == ['Alone']
+    elements = chain(['Worry', 'Sleep']) + [{'data': {'source': 'Worry', 'target': 'Missing'}}]
+    assert set(map_positions(elements)) == {'Worry', 'Sleep'}
+
+def test_map_layout_is_a_preset_layout():
+    elements = chain(['Worry', 'Sleep'])
+    layout = map_layout(elements)
+    assert layout['name'] == 'preset' and layout_positions(layout) == map_positions(elements)
+    assert layout_positions(None) is None and layout_positions({'name': 'cose'}) is None
+
+# Factors shared by timeline snapshots keep their place when moving along the timeline
+def test_timeline_snapshots_keep_shared_factors_in_place(app_callback):
+    first = chain(['Worry', 'Sleep', 'Stress', 'Rumination'])
+    second = chain(['Worry', 'Sleep', 'Stress', 'Fatigue'], [('Worry', 'Sleep'), ('Sleep', 'Fatigue')])
+    comparison = build([('map 1', first, {}), ('map 2', second, {})]).to_store()
+    marks = {'0': 'map 1', '1': 'map 2'}
+    session = {'elements': [], 'stylesheet': []}
+    update = app_callback('update_cytoscape_elements')
+    _, _, layout = update(0, [], marks, comparison, session, {}, None)
+    elements, _, moved = update(1, [], marks, comparison, session, {}, layout)
+    assert {e['data']['id'] for e in elements if 'source' not in e['data']} == set(moved['positions'])
+    shared = ['Worry', 'Sleep', 'Stress']
+    assert max(distance(moved['positions'][name], layout['positions'][name]) for name in shared) < drift
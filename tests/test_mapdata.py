@@ -0,0 +1,104 @@
+# Imports
+import json
+import pytest
+from mapdata import (decode_map, dump_map, encode_map, is_compact_map, load_map, map_version, normalize_map,
+                     same_map, upgrade_map)
+from styles import default_stylesheet, edge_selector, node_selector
+from uploads import parse_upload
+from test_uploads import upload, valid_map
+
+# Function: A version 1 export with everything a map can carry
+def full_map():
+    return {
+        'date': '2024-03-01_10-00-00',
+        'elements': [
+            {'data': {'id': 'Worry', 'label': 'Worry'}, 'classes': 'color-3 size-7'},
+            {'data': {'id': 'Sleep', 'label': 'Bad sleep'}},
+            {'data': {'id': 'Stress', 'label': 'Stress'}, 'classes': 'color-9'},
+            {'data': {'id': 'Worry->Sleep', 'source': 'Worry', 'target': 'Sleep'}, 'classes': 'diff-added'},
+            {'data': {'id': 'Stress->Worry', 'source': 'Stress', 'target': 'Worry'}},
+            {'data': {'source': 'Sleep', 'target': 'Stress'}}
+        ],
+        'stylesheet': default_stylesheet + [
+            {'selector': node_selector('Worry'), 'style': {'background-color': 'red', 'width': 40}},
+            {'selector': edge_selector('Stress->Worry'), 'style': {'line-color': 'blue'}}
+        ],
+        'severity-scores': {'Worry': 7, 'Sleep': 3, 'Gone': 5},
+        'edge-data': {'Worry->Sleep': {'strength': 4, 'annotation': 'most nights'},
+                      'Stress->Worry': {'strength': 2, 'annotation': ''},
+                      'Elsewhere': {'strength': 1, 'annotation': 'old'}},
+        'annotations': {'Worry': 'at night', 'Gone': 'removed factor'}
+    }
+
+def compact(data):
+    return encode_map(normalize_map(data), data.get('stylesheet'))
+
+def test_version_2_keeps_elements_and_their_data():
+    data = full_map()
+    encoded = json.loads(json.dumps(compact(data)))  # as written to & read from a file
+    assert is_compact_map(encoded) and encoded['version'] == map_version
+    decoded = decode_map(encoded)
+    assert decoded['elements'] == data['elements']
+    assert decoded['edge-data'] == data['edge-data']
+    assert decoded['severity-scores'] == data['severity-scores']
+    assert decoded['annotations'] == data['annotations']
+    assert decoded['date'] == data['date']
+    assert decoded['out-degrees'] == {'Worry': 1, 'Sleep': 1, 'Stress': 1}
+    assert same_map(data, encoded)
+
+def test_version_2_keeps_per_element_styles():
+    stylesheet = decode_map(compact(full_map()), metrics=False)['stylesheet']
+    rules = {rule['selector']: rule['style'] for rule in stylesheet}
+    assert rules[node_selector('Worry')] == {'background-color': 'red', 'width': 40}
+    assert rules[edge_selector('Stress->Worry')] == {'line-color': 'blue'}
+
+def test_version_2_leaves_out_empty_columns():
+    data = {'elements': [{'data': {'id': 'a'}}, {'data': {'id': 'b'}}, {'data': {'source': 'a', 'target': 'b'}}]}
+    encoded = encode_map(normalize_map(data), default_stylesheet)
+    assert set(encoded) == {'format', 'version', 'nodes', 'edges'}
+    assert decode_map(encoded, metrics=False)['elements'] == [{'data': {'id': 'a', 'label': 'a'}}, {'data': {'id': 'b', 'label': 'b'}},
+                                                               {'data': {'source': 'a', 'target': 'b'}}]
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_map_files_are_read_back(compress):
+    encoded = compact(full_map())
+    assert load_map(dump_map(encoded, compress=compress)) == encoded
+
+def test_upgrading_is_idempotent():
+    upgraded = upgrade_map(full_map())
+    assert upgrade_map(upgraded) is upgraded
+    assert upgrade_map(json.loads(json.dumps(upgraded))) == upgraded
+    assert upgrade_map(decode_map(upgraded, metrics=False)) == upgraded
+
+def test_upgrading_does_not_change_the_original():
+    data = full_map()
+    upgrade_map(data)
+    assert data == full_map()
+
+def test_upgrading_an_old_donation_uses_the_file_date():
+    data = full_map()
+    del data['date']
+    assert upgrade_map(data, 'data-donation/graph_2023-12-21_14-50-13.json')['date'] == '2023-12-21_14-50-13'
+
+# Both formats of the same map load into the same app state
+def test_version_1_and_2_uploads_load_alike():
+    data = full_map()
+    v1 = parse_upload(upload(data), 'map.json')
+    v2 = parse_upload(upload(compact(data)), 'map.json')
+    assert v1['version'] == 1 and v2['version'] == 2
+    for key in ('elements', 'edges', 'stylesheet', 'severity-scores', 'annotations', 'date'):
+        assert v1[key] == v2[key], key
+    # Edge data of the map's links loads alike; v1 gives an id to the link that had none
+    assert {k: v for k, v in v1['edge-data'].items() if k != 'Sleep->Stress'} == v2['edge-data']
+    assert [e.get('classes') for e in v1['elements']] == ['color-3 size-7', None, 'color-9', 'diff-added', None, None]
+
+def test_version_1_uploads_still_load():
+    data = parse_upload(upload(valid_map()), 'map.json')
+    assert data['version'] == 1 and [e['data']['id'] for e in data['elements']] == ['Worry', 'Sleep', 'e1']
+
+def test_malformed_class_columns_are_rejected():
+    from uploads import UploadError
+    encoded = compact(full_map())
+    encoded['edge-classes'] = encoded['edge-classes'][:1]
+    with pytest.raises(UploadError, match='edge-classes'):
+        parse_upload(upload(encoded))
@@ -0,0 +1,117 @@
+# Imports
+import copy
+import json
+import os
+import random
+import sys
+import pytest
+import networkx as nx
+import dash
+from dash import Patch
+from metrics import DegreeCounter, degree_metrics, get_metric
+from state import apply_patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+# Function: Cytoscape elements & the same graph in networkx (random edges, self-loops & duplicates included)
+def random_map(n, m, seed):
+    rng = random.Random(seed)
+    nodes = [f'Factor {i}' for i in range(n)]
+    edges = [(rng.choice(nodes), rng.choice(nodes)) for _ in range(m)]
+    elements = [{'data': {'id': node, 'label': node}} for node in nodes]
+    elements += [{'data': {'id': f'e{i}', 'source': s, 'target': t}} for i, (s, t) in enumerate(edges)]
+    graph = nx.DiGraph()
+    graph.add_nodes_from(nodes)
+    graph.add_edges_from(edges)
+    return elements, graph
+
+graphs = [(n, m, seed) for seed in range(10) for n, m in [(1, 0), (2, 1), (3, 2), (12, 20), (40, 100), (80, 150)]]
+
+@pytest.mark.parametrize('n, m, seed', graphs)
+def test_betweenness_matches_networkx(n, m, seed):
+    elements, graph = random_map(n, m, seed)
+    expected = nx.betweenness_centrality(graph)
+    assert get_metric(elements, 'betweenness') == pytest.approx(expected, abs=1e-9)
+
+@pytest.mark.parametrize('n, m, seed', graphs)
+def test_closeness_matches_networkx(n, m, seed):
+    elements, graph = random_map(n, m, seed)
+    expected = nx.closeness_centrality(graph)
+    assert get_metric(elements, 'closeness') == pytest.approx(expected, abs=1e-9)
+
+@pytest.mark.parametrize('n, m, seed', graphs)
+def test_degrees_match_networkx(n, m, seed):
+    elements, graph = random_map(n, m, seed)
+    assert get_metric(elements, 'out-degree') == dict(graph.out_degree())
+    assert get_metric(elements, 'in-degree') == dict(graph.in_degree())
+
+def test_betweenness_of_a_chain():
+    elements = [{'data': {'id': node}} for node in 'abcd']
+    elements += [{'data': {'source': s, 'target': t}} for s, t in ['ab', 'bc', 'cd']]
+    # b lies on a->c & a->d, c on a->d & b->d, out of (n - 1)(n - 2) = 6 ordered pairs
+    assert get_metric(elements, 'betweenness') == pytest.approx({'a': 0, 'b': 2 / 6, 'c': 2 / 6, 'd': 0})
+
+# Random edits; the stored counter (updated through store_patch) always equals a recount of the elements
+def test_degree_counter_patches_match_a_recount():
+    rng = random.Random(0)
+    elements = [{'data': {'id': f'Factor {i}'}} for i in range(6)]
+    stored = DegreeCounter.from_elements(elements).to_store()
+    for step in range(400):
+        nodes = [e['data']['id'] for e in elements if 'source' not in e['data']]
+        edges = [(e['data']['source'], e['data']['target']) for e in elements if 'source' in e['data']]
+        counter = DegreeCounter.from_store(stored)
+        operation = rng.choice(['add node', 'delete node', 'add edge', 'add edge', 'delete edge'])
+        if operation == 'add node':
+            elements.append({'data': {'id': f'New {step}'}})
+            counter.add_node(f'New {step}')
+        elif operation == 'delete node' and nodes:
+            node = rng.choice(nodes)
+            incident = [edge for edge in edges if node in edge]
+            elements = [e for e in elements if e['data'].get('id') != node and node not in (e['data'].get('source'), e['data'].get('target'))]
+            counter.remove_node(node, incident)
+        elif operation == 'add edge' and nodes:
+            edge = (rng.choice(nodes), rng.choice(nodes))
+            if edge not in edges:
+                elements.append({'data': {'source': edge[0], 'target': edge[1]}})
+                counter.add_edge(*edge)
+        elif operation == 'delete edge' and edges:
+            edge = rng.choice(edges)
+            elements = [e for e in elements if (e['data'].get('source'), e['data'].get('target')) != edge]
+            counter.remove_edge(*edge)
+        patch = Patch()
+        counter.store_patch(patch)
+        stored = apply_patch(stored, patch)
+        assert stored == json.loads(json.dumps(DegreeCounter.from_elements(elements).to_store())), (step, operation)
+        for name in degree_metrics:
+            assert DegreeCounter.from_store(stored).values(name) == pytest.approx(get_metric(elements, name)), name
+
+# The same through the app's editing callbacks, which keep the counter in edit-map-data
+@pytest.mark.parametrize('quantized', [False, True])
+def test_edit_callbacks_keep_degrees_current(quantized, app_callback, monkeypatch):
+    import functions
+    from bench_hotpaths import synthetic_session
+    monkeypatch.setattr(functions, 'quantized_styles', quantized)
+    session, severity = synthetic_session(30)
+    data = {key: copy.deepcopy(session[key]) for key in ('elements', 'stylesheet', 'edges')}
+    data = functions.node_sizing('In-degree', functions.color_scheme('Out-degree', data, severity), severity)
+    rng = random.Random(1)
+    for step in range(80):
+        nodes = [e['data']['id'] for e in data['elements'] if 'source' not in e['data']]
+        edges = [[e['data']['source'], e['data']['target']] for e in data['elements'] if 'source' in e['data']]
+        operation = rng.choice(['add node', 'delete node', 'add edge', 'add edge', 'delete edge'])
+        if operation == 'add node':
+            result = app_callback('map_add_node')(1, f'New {step}', data, 'Out-degree', 'In-degree')[2]
+        elif operation == 'delete node':
+            result = app_callback('delete_node')(1, rng.choice(nodes), data, {}, {}, {}, 'Out-degree', 'In-degree')[2]
+        elif operation == 'add edge':
+            result = app_callback('add_edge_output')(1, rng.sample(nodes, 2), data, 'Out-degree', 'In-degree')
+            result = result if result is dash.no_update else result[1]
+        elif edges:
+            result = app_callback('delete_edge_output')(1, rng.choice(edges), data, {}, 'Out-degree', 'In-degree')
+            result = result if result is dash.no_update else result[1]
+        else:
+            continue
+        if result is not dash.no_update:
+            data = apply_patch(data, result) if isinstance(result, Patch) else result
+        counter, recount = DegreeCounter.from_store(data['degrees']), DegreeCounter.from_elements(data['elements'])
+        assert (counter.nodes, counter.counts) == (recount.nodes, recount.counts), (step, operation)
@@ -0,0 +1,90 @@
+# Imports
+import json
+import os
+import re
+import dash
+from dash import Input, Output, State, dcc, html
+from monitoring import CallbackMetrics, Histogram, json_size, metrics_from_env
+from state import MemoryBackend, ServerState
+
+# A two-store app: 'notes' is kept on the server, 'draft' in the browser
+def notes_app():
+    app = dash.Dash(__name__)
+    server_state = ServerState(app, MemoryBackend())
+    server_state.register('notes', [])
+    app.layout = html.Div([server_state.store('notes', 'session'), dcc.Store(id='draft'), html.Div(id='count')])
+
+    @server_state.callback([Output('notes', 'data'), Output('count', 'children')], Input('draft', 'data'), State('notes', 'data'))
+    def add_note(draft, notes):
+        notes = notes + [draft]
+        return notes, len(notes)
+
+    return app, server_state
+
+def update(client, draft, notes):
+    body = {'output': '..notes.data...count.children..',
+            'outputs': [{'id': 'notes', 'property': 'data'}, {'id': 'count', 'property': 'children'}],
+            'inputs': [{'id': 'draft', 'property': 'data', 'value': draft}],
+            'state': [{'id': 'notes', 'property': 'data', 'value': notes}],
+            'changedPropIds': ['draft.data']}
+    response = client.post('/_dash-update-component', json=body)
+    assert response.status_code == 200
+    return response.get_json()['response']['notes']['data']
+
+# {(metric name, labels): value} of the Prometheus text format
+def samples(text):
+    values = {}
+    for line in text.splitlines():
+        if not line.startswith('#'):
+            name, labels, value = re.fullmatch(r'(\w+)\{(.*)\} (\S+)', line).groups()
+            values[name, labels] = float(value)
+    return values
+
+def test_histogram_text_is_cumulative():
+    histogram = Histogram('psysys_test', 'Test.', ['callback'], [1, 10])
+    for amount in [0.5, 1, 5, 50]:
+        histogram.observe(('a "b"',), amount)
+    values = samples(histogram.text(Histogram.merge({}, histogram.snapshot())))
+    labels = 'callback="a \\"b\\""'
+    assert [values['psysys_test_bucket', f'{labels},le="{bound}"'] for bound in [1, 10, '+Inf']] == [2, 3, 4]
+    assert values['psysys_test_sum', labels] == 56.5 and values['psysys_test_count', labels] == 4
+
+def test_callbacks_and_stores_are_measured():
+    app, server_state = notes_app()
+    metrics = CallbackMetrics(app).attach()
+    server_state.observer = metrics.observe_store
+    client = app.server.test_client()
+    notes = update(client, 'first', {'token': 'session', 'version': 0})
+    update(client, 'second', notes)
+    values = samples(client.get('/metrics').get_data(as_text=True))
+
+    assert values['psysys_callback_duration_seconds_count', 'callback="add_note"'] == 2
+    assert values['psysys_callback_request_bytes_count', 'callback="add_note"'] == 2
+    assert values['psysys_callback_response_bytes_sum', 'callback="add_note"'] > 0
+    # Browser stores are sized from the request, server stores when they are loaded & saved
+    assert values['psysys_store_bytes_sum', 'store="draft",role="input"'] == json_size('first') + json_size('second')
+    assert values['psysys_store_bytes_sum', 'store="notes",role="state"'] == len(json.dumps(['first']))
+    assert values['psysys_store_bytes_sum', 'store="notes",role="output"'] == len(json.dumps(['first'])) + len(json.dumps(['first', 'second']))
+
+def test_workers_are_added_up(tmp_path):
+    directory = str(tmp_path / 'metrics')
+    metrics = CallbackMetrics(notes_app()[0], directory)
+    metrics.duration.observe(('add_note',), 0.2)
+    metrics.flush()
+    os.replace(os.path.join(directory, f'metrics-{os.getpid()}.json'), os.path.join(directory, 'metrics-1.json'))
+    metrics.duration.observe(('add_note',), 0.3)
+    with metrics.app.server.test_request_context():
+        values = samples(metrics.expose().get_data(as_text=True))
+    # The other worker's observation & both of this worker's (its file is rewritten)
+    assert values['psysys_callback_duration_seconds_count', 'callback="add_note"'] == 3
+
+def test_metrics_are_off_unless_enabled(monkeypatch):
+    monkeypatch.delenv('PSYSYS_METRICS', raising=False)
+    app, _ = notes_app()
+    assert metrics_from_env(app) is None
+    assert 'metrics' not in app.server.view_functions
+    monkeypatch.setenv('PSYSYS_METRICS', '1')
+    monkeypatch.delenv('PSYSYS_METRICS_DIR', raising=False)
+    app, _ = notes_app()
+    assert isinstance(metrics_from_env(app), CallbackMetrics)
+    assert app.server.test_client().get('/metrics').status_code == 200
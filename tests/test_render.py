@@ -0,0 +1,74 @@
+# Imports
+from collections import OrderedDict
+import threading
+import time
+import pytest
+import render
+
+def small_map(n=3):
+    elements = [{'data': {'id': f'Factor {i}', 'label': f'Factor {i}'}} for i in range(n)]
+    elements += [{'data': {'id': f'e{i}', 'source': f'Factor {i}', 'target': f'Factor {(i + 1) % n}'}} for i in range(n)]
+    return {'elements': elements, 'severity-scores': {'Factor 0': 8}}
+
+@pytest.fixture
+def drawn(monkeypatch):
+    monkeypatch.setattr(render, '_cache', OrderedDict())
+    calls = []
+    def draw_map(elements, stylesheet, fmt='png', width=render.default_width, positions=None):
+        calls.append((len(elements), fmt, width))
+        return f'{len(calls)}'.encode('ascii')
+    monkeypatch.setattr(render, 'draw_map', draw_map)
+    return calls
+
+def test_the_same_map_and_scheme_is_drawn_once(drawn):
+    first = render.render_map(small_map(), color_scheme='Severity', sizing_scheme='Out-degree')
+    second = render.render_map(small_map(), color_scheme='Severity', sizing_scheme='Out-degree')
+    assert first == second and len(drawn) == 1
+
+@pytest.mark.parametrize('change', [{'color_scheme': 'Uniform'}, {'sizing_scheme': 'In-degree'}, {'fmt': 'svg'}, {'width': 400}])
+def test_a_scheme_or_format_change_is_drawn_again(drawn, change):
+    options = {'color_scheme': 'Severity', 'sizing_scheme': 'Out-degree'}
+    render.render_map(small_map(), **options)
+    render.render_map(small_map(), **dict(options, **change))
+    assert len(drawn) == 2
+
+def test_a_changed_map_is_drawn_again(drawn):
+    render.render_map(small_map(3))
+    render.render_map(small_map(4))
+    assert len(drawn) == 2
+
+def test_the_cache_keeps_the_most_recent_images(drawn, monkeypatch):
+    monkeypatch.setattr(render, 'cache_size', 2)
+    for n in (2, 3, 4):
+        render.render_map(small_map(n))
+    render.render_map(small_map(4))
+    render.render_map(small_map(2))
+    assert len(drawn) == 4 and len(render._cache) == 2
+
+def test_unknown_formats_are_rejected():
+    with pytest.raises(ValueError):
+        render.render_map(small_map(), fmt='gif')
+
+def test_the_pool_bounds_concurrent_renders(drawn, monkeypatch):
+    monkeypatch.setattr(render, 'render_workers', 2)
+    monkeypatch.setattr(render, '_executor', None)
+    running, peak, lock = [0], [0], threading.Lock()
+    def slow_scene(data, color_scheme=None, sizing_scheme=None, path=None):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        return data['elements'], []
+    monkeypatch.setattr(render, 'map_scene', slow_scene)
+    futures = [render.submit_render(small_map(n)) for n in range(2, 10)]
+    assert len([future.result(timeout=10) for future in futures]) == 8 and len(drawn) == 8
+    assert peak[0] == 2
+    render._executor.shutdown()
+
+def test_maps_are_drawn_to_images(monkeypatch):
+    monkeypatch.setattr(render, '_cache', OrderedDict())
+    png = render.render_map(small_map(), color_scheme='Severity', width=300)
+    svg = render.render_map(small_map(), fmt='svg', width=300)
+    assert png.startswith(b'\x89PNG') and b'<svg' in svg
@@ -0,0 +1,20 @@
+# Imports
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+from bench_startup import cold_start, over_budget
+
+# A cold worker start stays within the budget of bench_startup.py (best of up to 3, as timings vary)
+def test_cold_start_within_budget():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    for _ in range(3):
+        over = over_budget(cold_start('app_ver02', root))
+        if not over:
+            break
+    assert not over, '; '.join(over)
+
+# Heavy packages loaded at start fail the budget whatever the timing
+def test_deferred_packages_are_over_budget():
+    profile = {'seconds': 1.0, 'rss': 50 * 2 ** 20, 'modules': {'metrics': [0.1, 0], 'scipy.sparse': [0.4, 0]}}
+    assert over_budget(profile) == ['imported at start: scipy']
+    assert over_budget(dict(profile, modules={'metrics': [0.1, 0]})) == []
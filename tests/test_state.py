@@ -0,0 +1,156 @@
+# Imports
+import json
+import os
+import shutil
+import subprocess
+import pytest
+import dash
+from dash import Patch
+from state import MemoryBackend, SQLiteBackend, TieredBackend, apply_patch, backend_from_env
+
+# Loads handlePatch from Dash's own renderer bundle & applies each [value, patch] read from stdin
+renderer_js = r'''
+const fs = require('fs');
+let src = fs.readFileSync(process.argv[2], 'utf8');
+src = src.slice(0, src.lastIndexOf('// This entry needs to be wrapped in an IIFE')) +
+      'globalThis.dashRequire = __webpack_require__;\n' + src.slice(src.lastIndexOf('/******/ })()'));
+globalThis.window = globalThis;
+globalThis.self = globalThis;
+new Function(src)();
+const patch = globalThis.dashRequire('./src/actions/patch.ts');
+const cases = JSON.parse(fs.readFileSync(0, 'utf8'));
+console.log(JSON.stringify(cases.map(([value, update]) => patch.handlePatch(value, update))));
+'''
+
+def store():
+    return {'elements': [{'data': {'id': 'a'}}, {'data': {'id': 'b'}}, {'data': {'source': 'a', 'target': 'b'}}],
+            'scores': {'a': 3, 'b': 7}, 'tags': ['x', 'y', 'x'], 'count': 4, 'nested': {'list': [1, 2, 3]}}
+
+# Function: One Patch per operation (at the top level, nested & with negative indices)
+def patches():
+    def patch(edit):
+        p = Patch()
+        edit(p)
+        return p
+    return {
+        'assign': patch(lambda p: p.__setitem__('count', 9)),
+        'assign-nested': patch(lambda p: p['elements'][1]['data'].__setitem__('label', 'B')),
+        'assign-negative': patch(lambda p: p['tags'].__setitem__(-1, 'z')),
+        'assign-new-key': patch(lambda p: p['scores'].__setitem__('c', 1)),
+        'delete': patch(lambda p: p.__delitem__('scores')),
+        'delete-item': patch(lambda p: p['elements'].__delitem__(0)),
+        'delete-negative': patch(lambda p: p['tags'].__delitem__(-1)),
+        'merge': patch(lambda p: p['scores'].update({'b': 1, 'c': 2})),
+        'merge-top': patch(lambda p: p.update({'count': 0, 'new': True})),
+        'merge-or': patch(lambda p: p['scores'].__ior__({'a': 0})),
+        'merge-nested-item': patch(lambda p: p['elements'][-1]['data'].update({'id': 'e'})),
+        'extend': patch(lambda p: p['tags'].extend(['w', 'v'])),
+        'extend-iadd': patch(lambda p: p['nested']['list'].__iadd__([4])),
+        'append': patch(lambda p: p['elements'].append({'data': {'id': 'c'}})),
+        'prepend': patch(lambda p: p['tags'].prepend('first')),
+        'insert': patch(lambda p: p['tags'].insert(1, 'i')),
+        'insert-negative': patch(lambda p: p['tags'].insert(-1, 'i')),
+        'remove': patch(lambda p: p['tags'].remove('x')),
+        'remove-dict': patch(lambda p: p['elements'].remove({'data': {'id': 'a'}})),
+        'clear-list': patch(lambda p: p['tags'].clear()),
+        'clear-dict': patch(lambda p: p['scores'].clear()),
+        'reverse': patch(lambda p: p['nested']['list'].reverse()),
+        'add': patch(lambda p: p.__setitem__('count', p['count'].__iadd__(2))),
+        'sub': patch(lambda p: p['scores'].__setitem__('a', p['scores']['a'].__isub__(1))),
+        'mul': patch(lambda p: p.__setitem__('count', p['count'].__imul__(3))),
+        'div': patch(lambda p: p.__setitem__('count', p['count'].__itruediv__(8))),
+        'sequence': patch(lambda p: (p['tags'].append('q'), p['tags'].__delitem__(0), p['tags'].insert(0, 'r'),
+                                     p['scores'].update({'d': 5}), p['scores'].__delitem__('a'))),
+    }
+
+def test_patch_operations_are_applied():
+    results = {name: apply_patch(store(), patch) for name, patch in patches().items()}
+    assert results['insert']['tags'] == ['x', 'i', 'y', 'x']
+    assert results['remove']['tags'] == ['y']
+    assert results['div']['count'] == 0.5
+    assert results['sequence']['tags'] == ['r', 'y', 'x', 'q']
+    assert results['sequence']['scores'] == {'b': 7, 'd': 5}
+
+def test_patches_do_not_change_their_input():
+    value = store()
+    for patch in patches().values():
+        apply_patch(value, patch)
+    assert value == store()
+
+def test_unknown_operations_are_rejected():
+    patch = Patch()
+    patch._operations.append({'operation': 'Sort', 'location': ['tags'], 'params': {}})
+    with pytest.raises(ValueError, match='Sort'):
+        apply_patch(store(), patch)
+
+# Every operation gives the same store as Dash's renderer does in the browser
+@pytest.mark.skipif(shutil.which('node') is None, reason='needs node to run the Dash renderer')
+def test_patches_match_the_dash_renderer(tmp_path):
+    bundle = os.path.join(os.path.dirname(dash.__file__), 'dash-renderer', 'build', 'dash_renderer.dev.js')
+    script = tmp_path / 'patch.js'
+    script.write_text(renderer_js)
+    named = patches()
+    cases = json.dumps([[store(), patch.to_plotly_json()] for patch in named.values()])
+    output = subprocess.run(['node', str(script), bundle], input=cases, capture_output=True, text=True, check=True).stdout
+    for name, expected in zip(named, json.loads(output)):
+        assert apply_patch(store(), named[name]) == expected, name
+
+def test_memory_backend_evicts_the_least_recently_used():
+    backend = MemoryBackend(max_entries=2)
+    backend.set('t1', 'map', '1')
+    backend.set('t2', 'map', '2')
+    backend.get('t1', 'map')  # t1 is now the most recent
+    backend.set('t3', 'map', '3')
+    assert backend.get('t2', 'map') is None
+    assert backend.get('t1', 'map') == (1, '1') and backend.get('t3', 'map') == (1, '3')
+    assert list(backend.entries) == [('t1', 'map'), ('t3', 'map')]
+
+def test_memory_backend_counts_versions():
+    backend = MemoryBackend()
+    assert [backend.set('t', 'map', text) for text in 'abc'] == [1, 2, 3]
+    assert backend.get('t', 'map') == (3, 'c')
+
+def test_sqlite_backend_keeps_sessions_across_workers(tmp_path):
+    path = str(tmp_path / 'state.sqlite3')
+    assert SQLiteBackend(path).set('t', 'map', 'a') == 1
+    other = SQLiteBackend(path)
+    assert other.get('t', 'map') == (1, 'a')
+    assert other.set('t', 'map', 'b') == 2
+    assert SQLiteBackend(path).get('t', 'map') == (2, 'b')
+    assert other.get('t', 'other') is None
+
+# The memory tier answers only for the version the browser holds; otherwise SQLite does
+def test_tiered_backend_falls_back_to_sqlite(tmp_path):
+    path = str(tmp_path / 'state.sqlite3')
+    worker1 = TieredBackend(MemoryBackend(), SQLiteBackend(path))
+    worker2 = TieredBackend(MemoryBackend(), SQLiteBackend(path))
+    assert worker1.set('t', 'map', 'a') == 1
+    assert worker2.get('t', 'map', 1) == (1, 'a')  # not cached yet
+    assert worker2.set('t', 'map', 'b') == 2
+    assert worker1.get('t', 'map', 1) == (1, 'a')  # cached & current for this browser
+    assert worker1.get('t', 'map', 2) == (2, 'b')  # stale cache
+    assert worker1.memory.get('t', 'map') == (2, 'b')
+
+def test_tiered_backend_survives_eviction(tmp_path):
+    backend = TieredBackend(MemoryBackend(max_entries=1), SQLiteBackend(str(tmp_path / 'state.sqlite3')))
+    backend.set('t1', 'map', 'a')
+    backend.set('t2', 'map', 'b')
+    assert backend.memory.get('t1', 'map') is None
+    assert backend.get('t1', 'map', 1) == (1, 'a')
+
+@pytest.mark.parametrize('kind, expected', [('browser', type(None)), ('memory', MemoryBackend), ('MEMORY', MemoryBackend),
+                                            ('sqlite', SQLiteBackend), ('tiered', TieredBackend), (None, TieredBackend)])
+def test_backend_from_env(kind, expected, tmp_path, monkeypatch):
+    if kind is None:
+        monkeypatch.delenv('PSYSYS_STATE_BACKEND', raising=False)
+    else:
+        monkeypatch.setenv('PSYSYS_STATE_BACKEND', kind)
+    monkeypatch.setenv('PSYSYS_STATE_PATH', str(tmp_path / 'nested' / 'state.sqlite3'))
+    monkeypatch.setenv('PSYSYS_STATE_CACHE', '3')
+    backend = backend_from_env()
+    assert type(backend) is expected
+    if expected is TieredBackend:
+        assert backend.memory.max_entries == 3 and backend.disk.path == str(tmp_path / 'nested' / 'state.sqlite3')
+    if expected is not type(None):
+        backend.set('t', 'map', 'a')
+        assert backend.get('t', 'map') == (1, 'a')
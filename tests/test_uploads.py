@@ -0,0 +1,122 @@
+# Imports
+import base64
+import gzip
+import json
+import random
+import pytest
+import dash
+from uploads import UploadError, parse_upload
+
+# Function: dcc.Upload contents of raw bytes
+def contents(raw):
+    return 'data:application/json;base64,' + base64.b64encode(raw).decode('ascii')
+
+# Function: dcc.Upload contents of a map (JSON-encoded)
+def upload(data):
+    return contents(json.dumps(data).encode('utf-8'))
+
+def valid_map():
+    return {
+        'elements': [{'data': {'id': 'Worry', 'label': 'Worry'}}, {'data': {'id': 'Sleep', 'label': 'Sleep'}},
+                     {'data': {'id': 'e1', 'source': 'Worry', 'target': 'Sleep'}}],
+        'stylesheet': [{'selector': 'node', 'style': {'background-color': 'blue'}}],
+        'severity-scores': {'Worry': 7},
+        'edge-data': {'e1': {'strength': 3, 'annotation': 'often'}},
+        'annotations': {'Worry': 'mostly at night'}
+    }
+
+def test_valid_map_is_read():
+    data = parse_upload(upload(valid_map()), 'map.json')
+    assert [e['data']['id'] for e in data['elements']] == ['Worry', 'Sleep', 'e1']
+    assert data['edge-data'] == {'e1': {'strength': 3, 'annotation': 'often'}}
+
+def test_edges_get_stable_ids():
+    data = valid_map()
+    data['elements'][2]['data'].pop('id')
+    assert parse_upload(upload(data))['elements'][2]['data']['id'] == 'Worry->Sleep'
+
+@pytest.mark.parametrize('raw', [b'', b'not json', b'{"elements": [', b'\x1f\x8b broken gzip', b'[1, 2, 3]', b'"map"'])
+def test_malformed_files_are_rejected(raw):
+    with pytest.raises(UploadError):
+        parse_upload(contents(raw))
+
+@pytest.mark.parametrize('value', ['no comma', None, 42, 'data:application/json;base64,@@@@'])
+def test_unreadable_contents_are_rejected(value):
+    with pytest.raises(UploadError):
+        parse_upload(value)
+
+@pytest.mark.parametrize('field, value', [
+    ('elements', {'a': 1}),
+    ('elements', [5]),
+    ('elements', [{'data': {'id': 5}}]),
+    ('elements', [{'data': {'source': 'a', 'target': ['b']}}]),
+    ('severity-scores', {'Worry': 'high'}),
+    ('severity-scores', {'Worry': 11}),
+    ('severity-scores', {'Worry': True}),
+    ('edge-data', {'e1': 5}),
+    ('edge-data', {'e1': [1]}),
+    ('edge-data', {'e1': 'strong'}),
+    ('edge-data', {'e1': {'strength': 'high'}}),
+    ('edge-data', {'e1': {'strength': 9}}),
+    ('edge-data', {'e1': {'strength': 3, 'annotation': 5}}),
+    ('edge-data', [1]),
+    ('annotations', {'Worry': 5}),
+    ('stylesheet', [{'selector': 5}]),
+    ('stylesheet', [{'selector': 'node', 'style': 'red'}]),
+    ('version', 7),
+    ('date', 5)
+])
+def test_wrong_types_are_rejected(field, value):
+    data = valid_map()
+    data[field] = value
+    with pytest.raises(UploadError):
+        parse_upload(upload(data))
+
+def test_malformed_version_2_maps_are_rejected():
+    data = {'format': 'psysys-map', 'version': 2, 'nodes': ['a', 'b'], 'edges': [[0, 5]]}
+    with pytest.raises(UploadError):
+        parse_upload(upload(data))
+
+def test_oversized_uploads_are_rejected():
+    raw = json.dumps(valid_map()).encode('utf-8')
+    with pytest.raises(UploadError, match='larger than'):
+        parse_upload(contents(raw), max_bytes=len(raw) - 1)
+
+def test_gzip_bombs_are_rejected():
+    raw = gzip.compress(b' ' * 200000 + json.dumps(valid_map()).encode('utf-8'))
+    with pytest.raises(UploadError, match='unpacked file is larger'):
+        parse_upload(contents(raw), max_bytes=100000)
+
+def test_too_many_elements_are_rejected(monkeypatch):
+    import uploads
+    monkeypatch.setattr(uploads, 'max_elements', 2)
+    with pytest.raises(UploadError, match='more than 2 elements'):
+        parse_upload(upload(valid_map()))
+
+# Random values in every field fail as an UploadError (which the app shows), never another exception
+def test_random_fields_only_raise_upload_errors():
+    rng = random.Random(0)
+    values = [None, 0, -1, 2.5, True, '', 'x', [], [1], ['a'], {}, {'a': 1}, {'a': [1]}, {'a': {'b': 'c'}},
+              [{'data': 1}], [{'data': {'id': None}}], [{'data': {'source': 'a'}}]]
+    for _ in range(2000):
+        data = valid_map()
+        for field in rng.sample(sorted(data), rng.randint(1, 3)):
+            data[field] = rng.choice(values)
+        try:
+            parse_upload(upload(data))
+        except UploadError:
+            pass
+
+# A rejected upload is explained to the user, not only logged
+def test_rejected_upload_shows_an_alert(app_callback):
+    data, message, is_open, loaded = app_callback('upload_graph')(contents(b'not json'), 'map.json')
+    assert is_open and 'map.json' in message and 'invalid JSON' in message
+    assert loaded is dash.no_update  # the map tab is not rebuilt
+
+def test_accepted_upload_rebuilds_the_map_tab(app_callback):
+    data, message, is_open, loaded = app_callback('upload_graph')(upload(valid_map()), 'map.json')
+    assert data['elements'] and not is_open and loaded
+
+def test_rejected_tracking_upload_shows_an_alert(app_callback):
+    result = app_callback('upload_tracking_graph')(contents(b'{"severity-scores": 5}'), {}, 0, 0, [], {}, {}, 'old.json', None)
+    assert result[-1] is True and 'severity-scores' in result[-2]
@@ -0,0 +1,210 @@
+# Imports
+import base64
+import binascii
+import json
+import os
+import zlib
+from graph import edge_id
+from mapdata import date_from_filename, decode_map, gunzip
+from styles import compact_stylesheet
+
+# Fast JSON parser when installed (orjson), the standard library otherwise
+try:
+    import orjson
+    json_backend = 'orjson'
+    _loads = orjson.loads
+except ImportError:
+    json_backend = 'json'
+    _loads = json.loads
+
+# Limits for uploaded map files
+max_upload_bytes = int(os.environ.get('PSYSYS_MAX_UPLOAD_BYTES', 5 * 1024 * 1024))
+max_elements = int(os.environ.get('PSYSYS_MAX_UPLOAD_ELEMENTS', 20000))
+max_text = 10000  # characters per label, note or selector
+
+# Class: Rejected upload (the message is safe to show to the user)
+class UploadError(ValueError):
+    pass
+
+# Function: Decode a dcc.Upload contents string, checking its size before decoding
+def decode_upload(contents, max_bytes=None):
+    max_bytes = max_upload_bytes if max_bytes is None else max_bytes
+    if not isinstance(contents, str) or ',' not in contents:
+        raise UploadError("The upload could not be read.")
+    header, encoded = contents.split(',', 1)
+    # 4 base64 characters carry 3 bytes
+    if len(encoded) // 4 * 3 > max_bytes + 2:
+        raise UploadError(f"The file is larger than {max_bytes / (1024 * 1024):.1f} MB.")
+    try:
+        decoded = base64.b64decode(encoded, validate=True)
+    except (binascii.Error, ValueError):
+        raise UploadError("The upload is not valid base64.")
+    if len(decoded) > max_bytes:
+        raise UploadError(f"The file is larger than {max_bytes / (1024 * 1024):.1f} MB.")
+    return decoded
+
+# Function: Parse JSON bytes (plain or gzip-compressed) with the fastest available backend
+def parse_json(raw, max_bytes=None):
+    max_bytes = max_upload_bytes if max_bytes is None else max_bytes
+    if raw[:2] == b'\x1f\x8b':
+        try:
+            raw = gunzip(raw, max_bytes)
+        except zlib.error:
+            raise UploadError("The file is not a valid gzip file.")
+        except ValueError:
+            raise UploadError(f"The unpacked file is larger than {max_bytes / (1024 * 1024):.1f} MB.")
+    try:
+        return _loads(raw)
+    except ValueError:  # json.JSONDecodeError & orjson.JSONDecodeError are ValueErrors
+        raise UploadError("The file is not a valid map (invalid JSON).")
+
+# Function: Reject a field of an uploaded map
+def _invalid(field, problem='has the wrong type'):
+    raise UploadError(f"Invalid map file: '{field}' {problem}.")
+
+# Function: Check a value against a type, raising an UploadError naming the field
+def _expect(value, kinds, field):
+    if isinstance(value, bool) or not isinstance(value, kinds):
+        _invalid(field)
+    if isinstance(value, str) and len(value) > max_text:
+        _invalid(field, 'is too long')
+    return value
+
+# Function: Check if a value is a string of acceptable length
+def _is_text(value):
+    return type(value) is str and len(value) <= max_text
+
+# Function: Check if a value is a number (not a bool)
+def _is_number(value):
+    return type(value) is int or type(value) is float
+
+# Function: Validate & normalize the elements (nodes with an id, edges between known nodes)
+# Returns (node elements, edge elements); duplicate nodes & edges keep their first occurrence.
+def _elements(elements):
+    _expect(elements, list, 'elements')
+    if len(elements) > max_elements:
+        raise UploadError(f"Invalid map file: more than {max_elements} elements.")
+    nodes, links = {}, []
+    for i, element in enumerate(elements):
+        data = element.get('data') if type(element) is dict else None
+        if type(data) is not dict:
+            _invalid(f'elements[{i}].data')
+        if 'source' in data or 'target' in data:
+            source, target, link_id = data.get('source'), data.get('target'), data.get('id', '')
+            if not (_is_text(source) and _is_text(target) and _is_text(link_id)):
+                _invalid(f'elements[{i}].data')
+            links.append(element)
+        else:
+            node_id = data.get('id')
+            label = data.get('label', node_id)
+            if not (_is_text(node_id) and _is_text(label)):
+                _invalid(f'elements[{i}].data')
+            if node_id not in nodes:
+                nodes[node_id] = {'data': {'id': node_id, 'label': label}}
+                if _is_text(element.get('classes')) and element['classes']:
+                    nodes[node_id]['classes'] = element['classes']  # e.g. quantized scheme bins
+
+    # Edges to factors that are not in the map would break Cytoscape; drop them
+    # Edges without an id get a stable one (else Cytoscape draws a new one per load)
+    edges = {}
+    for element in links:
+        data = element['data']
+        key = (data['source'], data['target'])
+        if key not in edges and key[0] in nodes and key[1] in nodes:
+            edges[key] = {'data': {'id': data.get('id') or edge_id(*key), 'source': key[0], 'target': key[1]}}
+            if _is_text(element.get('classes')) and element['classes']:
+                edges[key]['classes'] = element['classes']
+    return list(nodes.values()), edges
+
+# Function: Validate severity scores ({factor: 0-10}; missing scores are dropped)
+def _severity(scores):
+    scores = _expect(scores or {}, dict, 'severity-scores')
+    valid = {}
+    for factor, score in scores.items():
+        if score is None:
+            continue
+        if not _is_number(score):
+            _invalid(f'severity-scores.{factor}')
+        if not 0 <= score <= 10:
+            _invalid(f'severity-scores.{factor}', 'is outside 0-10')
+        valid[factor] = score
+    return valid
+
+# Function: Validate edge data ({edge id: {'strength': 1-5, 'annotation': text}})
+def _edge_data(edge_data):
+    edge_data = _expect(edge_data or {}, dict, 'edge-data')
+    valid = {}
+    for edge_id, info in edge_data.items():
+        if type(info) is not dict:
+            _invalid(f'edge-data.{edge_id}')
+        strength = info.get('strength')
+        annotation = info.get('annotation') or ''
+        if not (strength is None or _is_number(strength)) or not _is_text(annotation):
+            _invalid(f'edge-data.{edge_id}')
+        if strength is not None and not 1 <= strength <= 5:
+            _invalid(f'edge-data.{edge_id}.strength', 'is outside 1-5')
+        valid[edge_id] = {'strength': strength, 'annotation': annotation}
+    return valid
+
+# Function: Validate annotations ({node id: note}; older files store a list)
+def _annotations(annotations):
+    if isinstance(annotations, list) and not annotations:
+        return {}
+    annotations = _expect(annotations or {}, dict, 'annotations')
+    return {node: _expect(note or '', str, f'annotations.{node}') for node, note in annotations.items()}
+
+# Function: Validate the stylesheet (list of {'selector', 'style'}), collapsed to one rule per selector
+def _stylesheet(stylesheet):
+    stylesheet = _expect(stylesheet or [], list, 'stylesheet')
+    for i, rule in enumerate(stylesheet):
+        _expect(_expect(rule, dict, f'stylesheet[{i}]').get('selector'), str, f'stylesheet[{i}].selector')
+        _expect(rule.get('style', {}), dict, f'stylesheet[{i}].style')
+    return compact_stylesheet(stylesheet)
+
+# Function: Version 1 map files (app exports & data donations)
+def _read_v1(data, filename=None):
+    nodes, edges = _elements(data.get('elements') or [])
+    date = data.get('date')
+    return {
+        'version': 1,
+        'date': _expect(date, str, 'date') if date is not None else date_from_filename(filename),
+        'elements': nodes + list(edges.values()),
+        'edges': [{'data': {'source': source, 'target': target}} for source, target in edges],
+        'stylesheet': _stylesheet(data.get('stylesheet')),
+        'severity-scores': _severity(data.get('severity-scores')),
+        'edge-data': _edge_data(data.get('edge-data')),
+        'annotations': _annotations(data.get('annotations'))
+    }
+
+# Function: Version 2 map files (compact arrays), checked after expanding them to version 1
+def _read_v2(data, filename=None):
+    nodes, edges = _expect(data.get('nodes') or [], list, 'nodes'), _expect(data.get('edges') or [], list, 'edges')
+    if len(nodes) + len(edges) > max_elements:
+        raise UploadError(f"Invalid map file: more than {max_elements} elements.")
+    for key in ['labels', 'severity', 'notes', 'classes', 'edge-ids', 'strength', 'edge-notes', 'edge-classes']:
+        column = _expect(data.get(key) or [], list, key)
+        if column and len(column) != len(edges if key.startswith('edge-') or key == 'strength' else nodes):
+            _invalid(key, 'does not match the nodes or edges')
+    for i, edge in enumerate(edges):
+        if not (type(edge) is list and len(edge) == 2 and all(type(n) is int and 0 <= n < len(nodes) for n in edge)):
+            _invalid(f'edges[{i}]')
+    try:
+        expanded = decode_map(data, metrics=False)
+    except (TypeError, ValueError, AttributeError, KeyError):
+        raise UploadError("Invalid map file: the version 2 data could not be read.")
+    return dict(_read_v1(expanded, filename), version=2)
+
+# Readers per map file schema version
+schema_readers = {1: _read_v1, 2: _read_v2}
+
+# Function: Validated & normalized map from a parsed map file
+def read_map(data, filename=None):
+    _expect(data, dict, 'map')
+    version = data.get('version', 1)
+    if version not in schema_readers:
+        raise UploadError(f"Unsupported map file version: {version}.")
+    return schema_readers[version](data, filename)
+
+# Function: Validated & normalized map from dcc.Upload contents
+def parse_upload(contents, filename=None, max_bytes=None):
+    return read_map(parse_json(decode_upload(contents, max_bytes), max_bytes), filename)